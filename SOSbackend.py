@@ -0,0 +1,374 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSbackend.py
+# Description   :   Hardware backends for the SOS (real Raspberry Pi, or a simulated GPIO/ADC rig)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: the control script only ever talks to a backend through these names:
+#        backend.GPIO        --> an object with the RPi.GPIO interface (setmode, setup, output, PWM, cleanup, ...)
+#        backend.ADCDevice   --> the ADCDevice class (used for detectI2C)
+#        backend.ADS7830     --> the ADS7830 class (used for analogRead)
+#        backend.clock       --> the clock all timing goes through (see SOSclock.py)
+#      the 'pi' backend hands out the real libraries and wall time, the 'sim' backend hands out stand-ins
+#      that drive two virtual motors, compute ADC values from a configurable sun model and run on
+#      a discrete-event clock, so that simulated hours pass in a fraction of a second.
+
+#####################################################################################################
+#####################################################################################################
+
+import datetime
+import math
+import random
+
+import SOSclock
+import SOSsolar
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            REAL PI BACKEND             ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class PiBackend:          # real hardware: RPi.GPIO and the Freenove ADCDevice library
+
+    name = 'pi'
+
+    def __init__(self):
+        import RPi.GPIO                                  # imported here so the sim backend runs on any Linux box
+        import ADCDevice
+        self.GPIO = RPi.GPIO
+        self.ADCDevice = ADCDevice.ADCDevice
+        self.ADS7830 = ADCDevice.ADS7830
+        self.clock = SOSclock.WallClock()
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================              SUN MODEL                 ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+# NOTE on the geometry used by the simulation:
+#   - yaw   angle = rotation of the device around the vertical axis, 0° = yaw origin of the SOS
+#   - pitch angle = head-over-head rotation of the cell, 0° = cell facing straight up (zenith)
+#   - the sun is given by azimuth (measured in the yaw frame of the SOS) and elevation above the horizon
+#   --> the best position is therefore yaw = azimuth, pitch = 90° - elevation
+
+
+class SunModel:          # irradiance model that turns a cell orientation into an ADC value (0-255)
+
+    def __init__(self, azimuth=60.0, elevation=40.0,
+                 azimuth_rate=0.0, elevation_rate=0.0,
+                 direct=200.0, diffuse=15.0, noise=0.0,
+                 clouds=(), seed=None):
+        self.azimuth = azimuth                  # sun azimuth at t = 0 (degrees, in the yaw frame of the SOS)
+        self.elevation = elevation              # sun elevation at t = 0 (degrees above horizon)
+        self.azimuth_rate = azimuth_rate        # change of azimuth   (degrees per second)
+        self.elevation_rate = elevation_rate    # change of elevation (degrees per second)
+        self.direct = direct                    # ADC value produced by direct light hitting the cell head-on
+        self.diffuse = diffuse                  # ADC value produced by diffuse sky light on a cell facing up
+        self.noise = noise                      # standard deviation of the gaussian read noise (ADC counts)
+        self.clouds = list(clouds)              # list of (t_start, t_end, transmission) tuples, transmission 0..1
+        self.random = random.Random(seed)
+        self.cache_seconds = 1.0                # irradiance is re-used for reads at the same orientation within this time
+        self.cache = (None, None, None, None)   # (yaw, pitch, t, irradiance) of the last computation
+
+    def sun_position(self, t):          # returns (azimuth, elevation) in degrees at time t
+        return (self.azimuth + self.azimuth_rate * t,
+                self.elevation + self.elevation_rate * t)
+
+    def optimum(self, t):          # returns the (yaw, pitch) orientation in degrees that faces the sun at time t
+        azimuth, elevation = self.sun_position(t)
+        return azimuth, 90.0 - elevation
+
+    def transmission(self, t):          # fraction of direct light getting through the clouds at time t
+        trans = 1.0
+        for (t_start, t_end, cloud_trans) in self.clouds:
+            if t_start <= t < t_end:
+                trans = min(trans, cloud_trans)
+        return trans
+
+    def cos_incidence(self, yaw_deg, pitch_deg, t):          # cos(angle between the cell normal and the sun vector)
+        azimuth, elevation = self.sun_position(t)
+        yaw, pitch = math.radians(yaw_deg), math.radians(pitch_deg)
+        azi, ele = math.radians(azimuth), math.radians(elevation)
+        return (math.sin(pitch) * math.cos(yaw) * math.cos(ele) * math.cos(azi)
+              + math.sin(pitch) * math.sin(yaw) * math.cos(ele) * math.sin(azi)
+              + math.cos(pitch) * math.sin(ele))
+
+    def incidence_angle(self, yaw_deg, pitch_deg, t):          # pointing error of the cell in degrees (0° = facing the sun)
+        return math.degrees(math.acos(max(-1.0, min(1.0, self.cos_incidence(yaw_deg, pitch_deg, t)))))
+
+    def irradiance(self, yaw_deg, pitch_deg, t):          # noise-free ADC value for a cell orientation at time t
+        azimuth, elevation = self.sun_position(t)
+        if elevation <= 0:                              # sun below horizon --> only diffuse light
+            direct = 0.0
+        else:
+            direct = self.direct * max(0.0, self.cos_incidence(yaw_deg, pitch_deg, t)) * self.transmission(t)
+        diffuse = self.diffuse * (1 + math.cos(math.radians(pitch_deg))) / 2     # isotropic sky seen by the cell
+        return direct + diffuse
+
+    def adc_value(self, yaw_deg, pitch_deg, t):          # 8-bit ADC reading incl. noise and quantisation
+        c_yaw, c_pitch, c_t, value = self.cache
+        if not (yaw_deg == c_yaw and pitch_deg == c_pitch and 0 <= t - c_t < self.cache_seconds):
+            value = self.irradiance(yaw_deg, pitch_deg, t)
+            self.cache = (yaw_deg, pitch_deg, t, value)
+        if self.noise:
+            value = value + self.random.gauss(0.0, self.noise)
+        return min(255, max(0, int(round(value))))
+
+
+
+class EphemerisSunModel(SunModel):          # sun that follows its real path across the sky (see SOSsolar.py)
+
+    def __init__(self, latitude=48.21, longitude=16.37, yaw_origin_azimuth=180.0, start=None, **kwargs):
+        SunModel.__init__(self, **kwargs)
+        self.latitude = latitude                        # site latitude (degrees north)
+        self.longitude = longitude                      # site longitude (degrees east)
+        self.yaw_origin_azimuth = yaw_origin_azimuth    # compass azimuth the simulated SOS faces at yaw 0°
+        self.start = start                              # date/time at t = 0, None = taken from the backend clock
+
+    def sun_position(self, t):
+        azimuth, elevation = SOSsolar.sun_position(self.start + datetime.timedelta(seconds=t),
+                                                   self.latitude, self.longitude)
+        return azimuth - self.yaw_origin_azimuth, elevation
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================           SIMULATED HARDWARE           ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class SimMotor:          # virtual DC motor: integrates its angle while its polarity pins are driven
+
+    # NOTE: with dead_time, coast_time and backlash the output shaft does not follow the pins exactly:
+    #       after switching on it starts moving dead_time seconds later (plus the time to turn through
+    #       backlash degrees of gear slack after a reversal), and after switching off it slows down
+    #       linearly to a stop over coast_time seconds. All three are 0 by default (an ideal motor).
+    #       Below stall_dc the motor does not turn at all; above it the speed grows linearly up to 100%
+    #       (stall_dc = 0: speed proportional to the duty cycle).
+
+    def __init__(self, pin1, pin2, enable_pin, t_rev, now, dead_time=0.0, coast_time=0.0, backlash=0.0, stall_dc=0.0):
+        self.pin1 = pin1
+        self.pin2 = pin2
+        self.enable_pin = enable_pin
+        self.t_rev = t_rev                      # true time for one revolution at 100% duty cycle
+        self.now = now                          # time source (function returning seconds)
+        self.dead_time = dead_time              # seconds between switching on and the output starting to move
+        self.coast_time = coast_time            # seconds the output takes to stop after switching off
+        self.backlash = backlash                # degrees of gear slack taken up (without output motion) after a reversal
+        self.stall_dc = stall_dc                # duty cycle (%) below which the motor cannot overcome its friction
+        self.angle = 0.0                        # true angle of the axis in degrees (unbounded, not wrapped)
+        self.pin_levels = {pin1: 0, pin2: 0}
+        self.dc = 0                             # current PWM duty cycle on the enable pin
+        self.rate = 0.0                         # current commanded angular speed in degrees per second (signed)
+        self.engage_at = 0.0                    # time at which the output follows the commanded speed
+        self.coast = None                       # (time switched off, speed at that moment) while coasting
+        self.last_direction = 0                 # direction of the last output motion (for the backlash)
+        self.last_update = now()
+        self.on_time = 0.0                      # accumulated motor-ON seconds (for benchmarks)
+
+    def direction(self):          # +1, -1 or 0, derived from the polarity pins
+        return self.pin_levels[self.pin1] - self.pin_levels[self.pin2]
+
+    def speed(self):          # degrees per second at the current duty cycle and polarity
+        return self.direction() * max(self.dc - self.stall_dc, 0.0) / (100.0 - self.stall_dc) * 360.0 / self.t_rev
+
+    def update(self):          # bring the angle up to date before anything about the motor changes
+        t = self.now()
+        if self.rate:                                   # a stopped motor only needs its timestamp moved on
+            elapsed = t - self.last_update
+            self.on_time = self.on_time + elapsed
+            self.angle = self.angle + self.rate * max(t - max(self.last_update, self.engage_at), 0.0)
+        elif self.coast is not None:                    # v(u) = v0 * (1 - u / coast_time), integrated from the last update
+            t_off, speed = self.coast
+            u_a = self.last_update - t_off
+            u_b = min(t - t_off, self.coast_time)
+            if u_b > u_a:
+                self.angle = self.angle + speed * ((u_b - u_a) - (u_b * u_b - u_a * u_a) / (2 * self.coast_time))
+            if t - t_off >= self.coast_time:
+                self.coast = None
+        self.last_update = t
+
+    def set_drive(self, pin=None, level=None, dc=None):          # change a polarity pin and/or the duty cycle
+        self.update()
+        if pin is not None:
+            self.pin_levels[pin] = level
+        if dc is not None:
+            self.dc = dc
+        old_rate, self.rate = self.rate, self.speed()
+        t = self.last_update
+        old_sign = (old_rate > 0) - (old_rate < 0)
+        new_sign = (self.rate > 0) - (self.rate < 0)
+        if (old_sign != 0) and (new_sign != old_sign) and (t >= self.engage_at):    # switched off (or reversed) while moving
+            self.last_direction = old_sign
+            if (new_sign == 0) and self.coast_time:
+                self.coast = (t, old_rate)
+        if (new_sign != 0) and (new_sign != old_sign):  # switched on (or reversed)
+            coasting = (self.coast is not None) and (t - self.coast[0] < self.coast_time - 1e-9)
+            if coasting and (new_sign == self.last_direction):
+                self.engage_at = t                      # still turning that way: no dead time
+            else:
+                slack = self.backlash if (self.last_direction and new_sign != self.last_direction) else 0.0
+                self.engage_at = t + self.dead_time + slack / abs(self.rate)
+            self.coast = None
+
+    def angle_now(self):
+        if self.rate or (self.coast is not None):
+            self.update()
+        return self.angle
+
+
+class SimPWM:          # stand-in for RPi.GPIO.PWM
+
+    def __init__(self, motor, frequency):
+        self.motor = motor
+        self.frequency = frequency
+
+    def start(self, dc):
+        self.ChangeDutyCycle(dc)
+
+    def ChangeDutyCycle(self, dc):
+        if self.motor is not None:
+            self.motor.set_drive(dc=dc)
+
+    def stop(self):
+        self.ChangeDutyCycle(0)
+
+
+class SimGPIO:          # stand-in for the RPi.GPIO module, routing pin changes to the virtual motors
+
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+
+    def __init__(self, motors):
+        self.motors = motors
+        self.pin_modes = {}
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, mode):
+        self.pin_modes[pin] = mode
+
+    def output(self, pin, level):
+        for motor in self.motors:
+            if pin in motor.pin_levels:
+                motor.set_drive(pin, 1 if level else 0)
+
+    def PWM(self, pin, frequency):
+        for motor in self.motors:
+            if motor.enable_pin == pin:
+                return SimPWM(motor, frequency)
+        return SimPWM(None, frequency)
+
+    def cleanup(self):
+        for motor in self.motors:
+            for pin in motor.pin_levels:
+                motor.set_drive(pin, 0)
+
+
+class SimADCDevice:          # stand-in for ADCDevice.ADCDevice
+
+    address = 0x4b
+
+    def detectI2C(self, addr):
+        return addr == self.address
+
+
+class SimADS7830(SimADCDevice):          # stand-in for ADCDevice.ADS7830, channel 0 sees the solar cell
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def analogRead(self, chn):
+        if chn != 0:
+            return 0
+        backend = self.backend
+        backend.adc_reads = backend.adc_reads + 1
+        return backend.sun.adc_value(backend.yaw.angle_now(), backend.pitch.angle_now(),
+                                     backend.now() - backend.t_start)
+
+    def close(self):
+        pass
+
+
+class SimBackend:          # simulated rig: two virtual motors and an ADS7830 looking at a SunModel
+
+    name = 'sim'
+
+    def __init__(self, sun=None,
+                 yaw_pins=(13, 15, 11), pitch_pins=(18, 22, 16),
+                 t_rev_yaw=18.63, t_rev_pitch=127.44,
+                 yaw_angle=0.0, pitch_angle=0.0,
+                 yaw_motion=(0.0, 0.0, 0.0), pitch_motion=(0.0, 0.0, 0.0),
+                 yaw_stall_dc=0.0, pitch_stall_dc=0.0,
+                 clock=None):
+        # yaw_motion / pitch_motion: (dead_time, coast_time, backlash) of the virtual motors, see SimMotor
+        self.sun = sun if sun is not None else SunModel()
+        self.clock = clock if clock is not None else SOSclock.SimClock()
+        self.now = now = self.clock.now
+        self.t_start = now()                    # simulated sun time is measured from backend creation
+        if getattr(self.sun, 'start', False) is None:
+            self.sun.start = self.clock.datetime()  # ephemeris sun starts at the date/time of the clock
+        self.adc_reads = 0                      # number of analogRead calls on channel 0 (for benchmarks)
+        self.yaw = SimMotor(*yaw_pins, t_rev=t_rev_yaw, now=now,
+                            dead_time=yaw_motion[0], coast_time=yaw_motion[1], backlash=yaw_motion[2], stall_dc=yaw_stall_dc)
+        self.pitch = SimMotor(*pitch_pins, t_rev=t_rev_pitch, now=now,
+                              dead_time=pitch_motion[0], coast_time=pitch_motion[1], backlash=pitch_motion[2],
+                              stall_dc=pitch_stall_dc)
+        self.yaw.angle = yaw_angle
+        self.pitch.angle = pitch_angle
+        self.GPIO = SimGPIO([self.yaw, self.pitch])
+        backend = self
+
+        class ADS7830(SimADS7830):          # bound to this backend, so the control script can call ADS7830()
+            def __init__(self):
+                SimADS7830.__init__(self, backend)
+
+        self.ADCDevice = SimADCDevice
+        self.ADS7830 = ADS7830
+
+    def sun_time(self):          # seconds since the backend was created (the time axis of the SunModel)
+        return self.now() - self.t_start
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================           BACKEND SELECTION            ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def make_backend(name='pi', **kwargs):          # returns a backend object by name ('pi' or 'sim')
+    if name == 'pi':
+        return PiBackend()
+    elif name == 'sim':
+        return SimBackend(**kwargs)
+    else:
+        raise ValueError("unknown SOS backend '%s' (expected 'pi' or 'sim')" % name)
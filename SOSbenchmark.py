@@ -0,0 +1,272 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSbenchmark.py
+# Description   :   Convergence benchmark for the SOS optimization (runs on the simulated rig)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: every benchmark run loads a fresh copy of the control script, puts the simulated rig at a
+#      known offset from the true optimum of a synthetic sun, runs one optimize() with the chosen
+#      adj_strategy ('hillclimb' = yaw_adj() then pitch_adj()) and records:
+#        moves, measurements, ADC reads, motor-ON seconds, simulated seconds, wall seconds,
+#        final pointing error (degrees) and the ADC value reached as a fraction of the best reachable one.
+#      The reference is the true maximum of the irradiance (best_orientation()), not the sun direction:
+#      with a strong diffuse share the cell collects most by tilting towards the zenith.
+#      The control script runs with its own defaults (e.g. measure_mode = 'adaptive'); --measure-mode overrides it.
+#      The report is written as JSON, and can be compared against an earlier report (the baseline):
+#
+#        python3 SOSbenchmark.py --output bench.json
+#        python3 SOSbenchmark.py --baseline bench.json
+#        python3 SOSbenchmark.py --measure-mode fixed --baseline bench.json
+
+#####################################################################################################
+#####################################################################################################
+
+import argparse
+import importlib.util
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+
+import SOSbackend
+
+CONTROL_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'SOScontrol_v11.4.py')
+
+max_moves = 400             # a run that needs more moves than this is counted as 'not converged'
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================          SYNTHETIC SCENARIOS           ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+# every scenario is a set of SunModel parameters, the sun sits at azimuth 60°, elevation 40°
+# --> the sun is at yaw 60°, pitch 50° (in degrees of the simulated rig), the optimum tilts towards
+#     the zenith the more diffuse light a scenario has
+
+SCENARIOS = {
+    'clear':   dict(direct=200.0, diffuse=15.0, noise=0.0),                         # clear sky, noise-free ADC
+    'noise':   dict(direct=200.0, diffuse=15.0, noise=4.0),                         # clear sky, noisy ADC
+    'clouds':  dict(direct=200.0, diffuse=15.0, noise=1.0,                          # passing clouds: 20 s of 30 % light every 90 s
+                    clouds=[(t, t + 20, 0.3) for t in range(45, 3600, 90)]),
+    'diffuse': dict(direct=40.0, diffuse=60.0, noise=2.0),                          # overcast sky, mostly diffuse light
+    'moving':  dict(direct=200.0, diffuse=15.0, noise=1.0,                          # sun moving 20x faster than in reality
+                    azimuth_rate=20 * 15 / 3600.0, elevation_rate=20 * 5 / 3600.0),
+}
+
+STRATEGIES = ('hillclimb', 'linesearch', 'joint')          # values of adj_strategy in the control script
+
+
+class BudgetExceeded(Exception):          # raised when a run needs more than max_moves moves
+    pass
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================              SINGLE RUN                ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def load_controller():          # loads a fresh copy of the control script (its file name is not importable)
+    spec = importlib.util.spec_from_file_location('SOScontrol', CONTROL_SCRIPT)
+    ctl = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(ctl)
+    return ctl
+
+
+def count_calls(ctl, name, counter, limit=None):          # wraps ctl.<name> so that every call is counted
+    original = getattr(ctl, name)
+
+    def counted(*args, **kwargs):
+        counter[name] = counter[name] + 1
+        if limit is not None and counter[name] > limit:
+            raise BudgetExceeded(name)
+        return original(*args, **kwargs)
+
+    setattr(ctl, name, counted)
+
+
+def best_orientation(sun, t, grid_step=5.0, tolerance=0.001):          # (yaw, pitch) in degrees of the highest irradiance at time t
+    
+    # coarse grid over every orientation of the cell, then a pattern search around the best grid point
+    candidates = [(-180.0 + i * grid_step, j * grid_step)
+                  for i in range(int(360 / grid_step)) for j in range(int(180 / grid_step) + 1)]
+    yaw, pitch = max(candidates, key=lambda orientation: sun.irradiance(orientation[0], orientation[1], t))
+    best = sun.irradiance(yaw, pitch, t)
+    step = grid_step / 2
+    while step > tolerance:
+        improved = False
+        for d_yaw, d_pitch in ((step, 0), (-step, 0), (0, step), (0, -step)):
+            value = sun.irradiance(yaw + d_yaw, pitch + d_pitch, t)
+            if value > best:
+                yaw, pitch, best = yaw + d_yaw, pitch + d_pitch, value
+                improved = True
+        if not improved:
+            step = step / 2
+    return yaw, pitch
+
+
+def angle_between(yaw_a, pitch_a, yaw_b, pitch_b):          # angle in degrees between two cell orientations
+    
+    def normal(yaw, pitch):
+        yaw, pitch = math.radians(yaw), math.radians(pitch)
+        return (math.sin(pitch) * math.cos(yaw), math.sin(pitch) * math.sin(yaw), math.cos(pitch))
+    
+    cos_angle = sum(a * b for a, b in zip(normal(yaw_a, pitch_a), normal(yaw_b, pitch_b)))
+    return math.degrees(math.acos(max(-1.0, min(1.0, cos_angle))))
+
+
+def run_once(scenario, strategy, seed, yaw_offset, pitch_offset, measure_mode=None):          # one optimization from a known start, returns metrics
+    sun = SOSbackend.SunModel(azimuth=60.0, elevation=40.0, seed=seed, **SCENARIOS[scenario])
+    yaw_opt, pitch_opt = sun.optimum(0)
+
+    ctl = load_controller()
+    sim = SOSbackend.make_backend('sim', sun=sun,
+                                  yaw_pins=(ctl.yaw_motor_pin1, ctl.yaw_motor_pin2, ctl.yaw_enable_pin),
+                                  pitch_pins=(ctl.pitch_motor_pin1, ctl.pitch_motor_pin2, ctl.pitch_enable_pin),
+                                  t_rev_yaw=ctl.t_rev_yaw, t_rev_pitch=ctl.t_rev_pitch,
+                                  yaw_angle=yaw_opt + yaw_offset, pitch_angle=pitch_opt + pitch_offset)
+
+    counter = {'yaw_move': 0, 'pitch_move': 0, 'move_both': 0, 'measure_volt': 0}
+    count_calls(ctl, 'yaw_move', counter, max_moves)
+    count_calls(ctl, 'pitch_move', counter, max_moves)
+    count_calls(ctl, 'move_both', counter, max_moves)
+    count_calls(ctl, 'measure_volt', counter)
+
+    converged = True
+    ctl.log_level = 'WARNING'                       # no console output from the control script
+    ctl.start_logging()
+    ctl.select_backend(sim)
+    ctl.setup()
+    t_sim_start = sim.clock.now()
+    wall_start = time.perf_counter()
+    try:
+        ctl.adj_strategy = strategy
+        if measure_mode is not None:            # None --> the default of the control script
+            ctl.measure_mode = measure_mode
+        ctl.optimize()
+    except BudgetExceeded:
+        converged = False
+    wall_time = time.perf_counter() - wall_start
+
+    t_sun = sim.sun_time()
+    yaw_deg, pitch_deg = sim.yaw.angle_now(), sim.pitch.angle_now()
+    yaw_best, pitch_best = best_orientation(sun, t_sun)
+    best = sun.irradiance(yaw_best, pitch_best, t_sun)
+
+    return {
+        'scenario': scenario,
+        'measure_mode': ctl.measure_mode,
+        'seed': seed,
+        'start_offset_deg': [yaw_offset, pitch_offset],
+        'converged': converged,
+        'moves': counter['yaw_move'] + counter['pitch_move'] + counter['move_both'],
+        'measurements': counter['measure_volt'],
+        'adc_reads': sim.adc_reads,
+        'motor_on_s': round(sim.yaw.on_time + sim.pitch.on_time, 3),
+        'sim_time_s': round(sim.clock.now() - t_sim_start, 3),
+        'wall_time_s': round(wall_time, 6),
+        'error_deg': round(angle_between(yaw_deg, pitch_deg, yaw_best, pitch_best), 3),
+        'yield_fraction': round(sun.irradiance(yaw_deg, pitch_deg, t_sun) / best, 4),
+    }
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================           BENCHMARK SUITE              ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+METRICS = ('moves', 'measurements', 'adc_reads', 'motor_on_s', 'sim_time_s', 'wall_time_s', 'error_deg', 'yield_fraction')
+
+
+def summarize(runs):          # mean of every metric plus the share of converged runs
+    summary = {metric: round(statistics.mean(run[metric] for run in runs), 4) for metric in METRICS}
+    summary['converged'] = round(sum(run['converged'] for run in runs) / len(runs), 4)
+    summary['runs'] = len(runs)
+    return summary
+
+
+def run_suite(strategy='hillclimb', scenarios=None, runs_per_scenario=8, seed=1, measure_mode=None):          # runs all scenarios, returns the report
+    scenarios = list(scenarios or SCENARIOS)
+    offsets = random.Random(seed)                   # same start offsets for every strategy --> comparable reports
+    starts = [(round(offsets.uniform(-60, 60), 1), round(offsets.uniform(-30, 30), 1)) for _ in range(runs_per_scenario)]
+
+    report = {'strategy': strategy, 'runs_per_scenario': runs_per_scenario, 'seed': seed, 'scenarios': {}}
+    all_runs = []
+    for scenario in scenarios:
+        runs = [run_once(scenario, strategy, seed + i, *starts[i], measure_mode=measure_mode) for i in range(runs_per_scenario)]
+        report['scenarios'][scenario] = {'summary': summarize(runs), 'runs': runs}
+        all_runs.extend(runs)
+    report['overall'] = summarize(all_runs)
+    report['measure_mode'] = all_runs[0]['measure_mode']
+    return report
+
+
+def compare(report, baseline):          # relative change of every summary metric against a baseline report
+    comparison = {}
+    for scenario, result in report['scenarios'].items():
+        if scenario not in baseline['scenarios']:
+            continue
+        base = baseline['scenarios'][scenario]['summary']
+        comparison[scenario] = {}
+        for metric in METRICS + ('converged',):
+            old, new = base[metric], result['summary'][metric]
+            comparison[scenario][metric] = {'baseline': old, 'current': new,
+                                            'change': round((new - old) / old, 4) if old else None}
+    return comparison
+
+
+def print_table(report):          # short human readable summary on the console
+    print('strategy:', report['strategy'], ' measure_mode:', report['measure_mode'])
+    print('%-10s' % 'scenario' + ''.join('%15s' % metric for metric in METRICS + ('converged',)))
+    for scenario, result in list(report['scenarios'].items()) + [('OVERALL', {'summary': report['overall']})]:
+        summary = result['summary']
+        print('%-10s' % scenario + ''.join('%15s' % summary[metric] for metric in METRICS + ('converged',)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convergence benchmark for the SOS optimization strategies')
+    parser.add_argument('--strategy', default='hillclimb', choices=STRATEGIES)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('--runs', type=int, default=8, help='runs per scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--measure-mode', choices=('adaptive', 'fixed'),
+                        help="measure_mode of the control script (default: the script's own)")
+    parser.add_argument('--output', help='write the JSON report to this file (default: stdout)')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.strategy, args.scenario, args.runs, args.seed, args.measure_mode)
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['comparison'] = compare(report, json.load(baseline_file))
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+        print_table(report)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOScalibrate.py
+# Description   :   Calibration of the revolution times (t_rev) of the SOS motors, per axis and duty cycle
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: every conversion between degrees and motor time uses t_rev_yaw / t_rev_pitch, but the real speed of
+#      the motors changes with the battery voltage, the temperature and wear.
+#      While an axis turns continuously, the voltage of the solar cell repeats itself once per revolution.
+#      revolution_time() finds that period: it resamples the (time, adc value) samples onto an even grid and
+#      looks for the lag with the highest autocorrelation near the expected revolution time (the shortest one
+#      of equally good lags: two revolutions correlate as well as one).
+#      The sun moves on while the axis turns, so the voltage pattern drifts along the axis: turning with the
+#      drift, the voltage repeats a little later than once per revolution, turning against it a little earlier.
+#      two_way_revolution_time() combines one measurement in each direction into the period of the motor itself.
+#
+#      CalibrationTable keeps the measured t_rev per axis and duty cycle in a small JSON file (calibration.json):
+#        {"yaw": {"100": {"t_rev": 18.71, "correlation": 0.97, "time": "2026-06-01T12:00:00"}, ...}, "pitch": {...}}
+#      t_rev(axis, dc) interpolates between calibrated duty cycles in speed (1 / t_rev); with a single
+#      calibrated duty cycle the speed is taken as proportional to the duty cycle.
+
+#####################################################################################################
+#####################################################################################################
+
+import json
+import math
+import os
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================       PERIOD OF THE VOLTAGE            ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def resample(times, values, dt):          # linear interpolation of (times, values) onto an even grid, dt apart
+    grid = []
+    j = 0
+    for i in range(int((times[-1] - times[0]) / dt) + 1):
+        t = times[0] + i * dt
+        while (j < len(times) - 2) and (times[j + 1] < t):
+            j = j + 1
+        span = times[j + 1] - times[j]
+        fraction = min(max((t - times[j]) / span, 0.0), 1.0) if span > 0 else 0.0
+        grid.append(values[j] + fraction * (values[j + 1] - values[j]))
+    return grid
+
+
+def correlation(x, lag):          # Pearson correlation of the signal x with itself, shifted by lag samples
+    a, b = x[:len(x) - lag], x[lag:]
+    n = len(a)
+    mean_a, mean_b = sum(a) / n, sum(b) / n
+    cov = var_a = var_b = 0.0
+    for u, v in zip(a, b):
+        u, v = u - mean_a, v - mean_b
+        cov = cov + u * v
+        var_a = var_a + u * u
+        var_b = var_b + v * v
+    if (var_a == 0) or (var_b == 0):            # flat signal: no periodicity to be found
+        return 0.0
+    return cov / math.sqrt(var_a * var_b)
+
+
+def revolution_time(times, values, t_guess, search=(0.7, 1.4), min_correlation=0.6, min_overlap=0.4, harmonic_tolerance=0.02):
+    # period of values (sampled at times, seconds) between search[0] and search[1] times t_guess
+    # returns (t_rev, correlation at that lag), or None if the voltage does not repeat clearly enough
+    # (e.g. clouds, night, or a cell facing the zenith while yaw turns)
+    # of the peaks within harmonic_tolerance of the best correlation the shortest lag is the period, the others its multiples
+    if len(times) < 3:
+        return None
+    dt = (times[-1] - times[0]) / (len(times) - 1)
+    x = resample(times, values, dt)
+    first = max(int(search[0] * t_guess / dt), 1)
+    last = min(int(search[1] * t_guess / dt) + 1, int(len(x) - min_overlap * t_guess / dt))
+    if last <= first + 2:
+        return None
+    r = [correlation(x, lag) for lag in range(first, last + 1)]
+    best = max(r[1:-1])
+    if best < min_correlation:
+        return None
+    k = min(i for i in range(1, len(r) - 1) if (r[i] >= r[i - 1]) and (r[i] >= r[i + 1]) and (r[i] >= best - harmonic_tolerance))
+    # parabolic interpolation between the neighbouring lags
+    denominator = r[k - 1] - 2 * r[k] + r[k + 1]
+    offset = 0.5 * (r[k - 1] - r[k + 1]) / denominator if denominator < 0 else 0.0
+    return (first + k + offset) * dt, r[k]
+
+
+def two_way_revolution_time(forward, backward):          # t_rev from the periods measured turning forward and backward
+    # the drift of the voltage pattern adds to the speed of the axis one way and subtracts from it the other way:
+    # 1 / t_forward + 1 / t_backward = 2 / t_rev (exact for a steady drift)
+    return 2.0 / (1.0 / forward + 1.0 / backward)
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================        CALIBRATION TABLE               ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class CalibrationTable:          # measured t_rev per axis and duty cycle
+
+    def __init__(self):
+        self.entries = {'yaw': {}, 'pitch': {}}         # axis --> {dc: {'t_rev', 'correlation', 'time'}}
+
+    def set(self, axis, dc, t_rev, correlation, time):
+        self.entries[axis][dc] = {'t_rev': t_rev, 'correlation': round(correlation, 4), 'time': time}
+
+    def t_rev(self, axis, dc, default=None, default_dc=100):          # revolution time of axis at duty cycle dc
+        # default (measured at default_dc) is used, scaled with the duty cycle, when the axis was never calibrated
+        points = sorted((point_dc, 1.0 / entry['t_rev']) for point_dc, entry in self.entries[axis].items())
+        if not points:
+            return None if default is None else default * default_dc / dc
+        if len(points) == 1:
+            return 1.0 / (points[0][1] * dc / points[0][0])
+        for (dc1, speed1), (dc2, speed2) in zip(points, points[1:]):
+            if dc <= dc2:                       # the first pair reaching dc (beyond the end points: the outermost pair)
+                break
+        speed = speed1 + (dc - dc1) * (speed2 - speed1) / (dc2 - dc1)
+        return 1.0 / speed if speed > 0 else None
+
+    def save(self, path):          # temp file + rename, never half written
+        data = {axis: {str(dc): entry for dc, entry in sorted(table.items())} for axis, table in self.entries.items()}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as calibration_file:
+            json.dump(data, calibration_file, indent=1)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        with open(path) as calibration_file:
+            data = json.load(calibration_file)
+        for axis in self.entries:
+            self.entries[axis] = {float(dc): entry for dc, entry in data.get(axis, {}).items()}
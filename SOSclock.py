@@ -0,0 +1,262 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSclock.py
+# Description   :   Clocks for the SOS (wall time on hardware, discrete-event time in simulation)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: every timing decision of the control script goes through a clock object:
+#        clock.now()                  --> current time in seconds
+#        clock.datetime()             --> current date and time (UTC), e.g. for the solar ephemeris
+#        clock.sleep(seconds)         --> wait (motor pulses, measurement intervals, rest countdown)
+#        clock.call_later(delay, fn)  --> run fn once after delay seconds, returns a handle with cancel()
+#        clock.every(interval, fn)    --> run fn every interval seconds until the returned handle is cancelled
+#        clock.wait(event, timeout)   --> wait until a threading.Event is set or timeout seconds have passed
+#        clock.new_event_loop()       --> an asyncio event loop whose timers run on this clock
+#        clock.threaded               --> True if blocking work should go to a worker thread in asyncio
+#        clock.ticks()                --> high-resolution time in seconds (for motor pulses)
+#        clock.sleep_until(deadline)  --> wait until ticks() reaches deadline, as exactly as possible
+#        clock.pulse(on, off, seconds)--> on(), wait seconds, off(), returns the measured on-time
+#      WallClock does this with real time. SimClock never waits: sleep() jumps the time forward and
+#      runs all scheduled events that fall into the skipped interval, in time order.
+#
+#      Motor pulses: time.sleep() alone wakes up late by a scheduler-dependent amount (often 0.1 - 10 ms),
+#      and every late wake-up moves the motor further than the position is told. WallClock.sleep_until()
+#      sleeps coarsely until spin_seconds before the deadline and busy-waits on perf_counter for the rest.
+#      The lateness that remains (e.g. a preemption during the spin) is learnt as `overshoot` and aimed off
+#      on the next deadline, and pulse() returns the real on-time so that the position uses what happened.
+
+#####################################################################################################
+#####################################################################################################
+
+import asyncio
+import datetime
+import heapq
+import itertools
+import selectors
+import threading
+import time
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================               WALL CLOCK               ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class WallClock:          # real time, used on the Raspberry Pi
+
+    name = 'wall'
+    threaded = True                             # motor moves really block --> run them off the event loop
+
+    def __init__(self, spin_seconds=0.002):
+        self.spin_seconds = spin_seconds        # the last part of sleep_until() is busy-waited
+        self.overshoot = 0.0                    # learnt lateness of sleep_until(), subtracted from the next deadline
+
+    def now(self):
+        return time.monotonic()
+
+    def ticks(self):
+        return time.perf_counter()
+
+    def sleep_until(self, deadline):          # coarse sleep, then a spin on perf_counter for the final milliseconds
+        target = deadline - self.overshoot
+        coarse = target - time.perf_counter() - self.spin_seconds
+        if coarse > 0:
+            time.sleep(coarse)
+        while time.perf_counter() < target:
+            pass
+        late = time.perf_counter() - deadline
+        self.overshoot = min(max(self.overshoot + 0.1 * late, 0.0), self.spin_seconds)
+
+    def pulse(self, on, off, seconds):          # on() ... off() for seconds, returns the measured time between them
+        on()
+        t_on = time.perf_counter()
+        self.sleep_until(t_on + seconds)
+        t_off = time.perf_counter()
+        off()
+        return t_off - t_on
+
+    def datetime(self):
+        return datetime.datetime.now(datetime.timezone.utc)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout):          # returns True if the event was set before the timeout
+        return event.wait(timeout)
+
+    def call_later(self, delay, fn):          # runs fn on a timer thread after delay seconds
+        timer = threading.Timer(max(0.0, delay), fn)
+        timer.daemon = True
+        timer.start()
+        return timer                                # threading.Timer already has cancel()
+
+    def new_event_loop(self):
+        return asyncio.new_event_loop()
+
+    def every(self, interval, fn):          # runs fn on a background thread every interval seconds
+        repeater = _WallRepeater(interval, fn)
+        repeater.start()
+        return repeater
+
+
+class _WallRepeater(threading.Thread):          # background thread behind WallClock.every
+
+    def __init__(self, interval, fn):
+        threading.Thread.__init__(self, daemon=True)
+        self.interval = interval
+        self.fn = fn
+        self.stopped = threading.Event()
+
+    def run(self):
+        next_time = time.monotonic() + self.interval
+        while not self.stopped.wait(max(0.0, next_time - time.monotonic())):   # wait() returns True once cancelled
+            self.fn()
+            next_time = next_time + self.interval   # fixed rate, a slow fn does not shift the following calls
+
+    def cancel(self):
+        self.stopped.set()
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================         DISCRETE-EVENT CLOCK           ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class _SimEvent:          # handle returned by SimClock.call_later
+
+    __slots__ = ('time', 'fn', 'cancelled')
+
+    def __init__(self, t, fn):
+        self.time = t
+        self.fn = fn
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class _SimRepeater:          # handle returned by SimClock.every
+
+    def __init__(self, clock, interval, fn):
+        self.clock = clock
+        self.interval = interval
+        self.fn = fn
+        self.cancelled = False
+        self.event = clock.call_later(interval, self.tick)
+
+    def tick(self):
+        if not self.cancelled:
+            self.event = self.clock.call_later(self.interval, self.tick)   # scheduled first, so fn may cancel it
+            self.fn()
+
+    def cancel(self):
+        self.cancelled = True
+        self.event.cancel()
+
+
+class _SimSelector:          # selector for the simulated event loop: 'waiting' for I/O jumps the clock forward
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        if timeout is not None and timeout > 0:
+            self.clock.advance_to(self.clock.t + timeout)   # the loop's next timer is due after exactly this time
+        return self.selector.select(0)
+
+    def __getattr__(self, name):                    # register, unregister, get_map, close, ... of the real selector
+        return getattr(self.selector, name)
+
+
+class _SimEventLoop(asyncio.SelectorEventLoop):          # asyncio event loop whose time() is the simulated clock
+
+    def __init__(self, clock):
+        asyncio.SelectorEventLoop.__init__(self, selector=_SimSelector(clock))
+        self.clock = clock
+
+    def time(self):
+        return self.clock.t
+
+
+class SimClock:          # simulated time that jumps forward instead of waiting
+
+    name = 'sim'
+    threaded = False                            # sleep() only jumps the time --> blocking work can run on the event loop
+
+    def __init__(self, start=0.0, epoch=None):
+        self.t = float(start)                   # current simulated time in seconds
+        if epoch is None:                       # date and time at simulated time 0 (default: midnight UTC, 21 June 2021)
+            epoch = datetime.datetime(2021, 6, 21, tzinfo=datetime.timezone.utc)
+        self.epoch = epoch
+        self.events = []                        # heap of (time, sequence number, event)
+        self.sequence = itertools.count()       # keeps events with equal times in scheduling order
+        self.slept = 0.0                        # total simulated seconds skipped by sleep() (for benchmarks)
+
+    def now(self):
+        return self.t
+
+    def ticks(self):
+        return self.t
+
+    def datetime(self):
+        return self.epoch + datetime.timedelta(seconds=self.t)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.slept = self.slept + seconds
+            self.advance_to(self.t + seconds)
+
+    def sleep_until(self, deadline):          # exact: the simulated time simply jumps to the deadline
+        self.sleep(deadline - self.t)
+
+    def pulse(self, on, off, seconds):          # on() ... off() for seconds, returns the on-time (exactly seconds)
+        on()
+        self.sleep(seconds)
+        off()
+        return seconds
+
+    def advance_to(self, t_end):          # runs due events in time order, then sets the time to t_end
+        events = self.events
+        while events and events[0][0] <= t_end:
+            t_event, _, event = heapq.heappop(events)
+            if event.cancelled:
+                continue
+            if t_event > self.t:
+                self.t = t_event
+            event.fn()                              # the event may itself sleep or schedule further events
+        if t_end > self.t:
+            self.t = t_end
+
+    def wait(self, event, timeout):          # runs scheduled events until one of them sets the event, or the timeout
+        t_end = self.t + max(0.0, timeout)
+        events = self.events
+        while not event.is_set() and events and events[0][0] <= t_end:
+            self.advance_to(events[0][0])
+        if not event.is_set():
+            self.advance_to(t_end)
+        return event.is_set()
+
+    def call_later(self, delay, fn):
+        event = _SimEvent(self.t + max(0.0, delay), fn)
+        heapq.heappush(self.events, (event.time, next(self.sequence), event))
+        return event
+
+    def every(self, interval, fn):
+        return _SimRepeater(self, interval, fn)
+
+    def new_event_loop(self):
+        return _SimEventLoop(self)
@@ -23,10 +23,26 @@
 #====================================================================================================
 #####################################################################################################
 
-import RPi.GPIO as GPIO
+import os
+import math
 import time
+import signal
+import asyncio
+import concurrent.futures
+import logging
+import threading
 import datetime
-from ADCDevice import *
+import SOSbackend           # hardware backends: real Pi (RPi.GPIO + ADCDevice) or simulated rig
+import SOSsolar             # solar position (azimuth, elevation) from date, time and location
+import SOSpredict           # predictions of the optimum position (learned lookup table)
+import SOStelemetry         # fixed-size in-memory record of ADC samples, measurements and moves
+import SOSlog               # append-only binary log of measurements, moves and optimizations (one file per day)
+import SOSinstrument        # per-phase timing and counters (wall time, motor-ON time, iterations, measurements)
+import SOSmetrics           # optional HTTP endpoint with Prometheus / JSON metrics
+import SOSlogging           # leveled logging through a queue (console / file I/O off the control path)
+import SOSjournal           # crash-safe position persistence (write-ahead move journal + atomic snapshots)
+import SOScalibrate         # revolution time of the motors per duty cycle, from the periodicity of the voltage
+import SOSmotion            # motion model of the motors (dead time, coast, backlash) and corrected motor-ON times
 
 
 
@@ -39,6 +55,16 @@ from ADCDevice import *
 #####################################################################################################
 
 
+### LOGGING variables (see SOSlogging.py)
+log_level  = os.environ.get('SOS_LOG_LEVEL', 'INFO')       # DEBUG --> also function banners, every ADC read and the countdown
+log_mode   = os.environ.get('SOS_LOG_MODE', 'verbose')     # 'quiet' --> only warnings, errors and one summary line per cycle
+log_format = os.environ.get('SOS_LOG_FORMAT', 'text')      # 'text' or 'json' (one JSON object per line)
+log_file   = os.environ.get('SOS_LOG_FILE')                # also log to this (rotating) file
+log        = logging.getLogger('SOS')                      # all output of the script goes through this logger ...
+cycle_log  = logging.getLogger('SOS.cycle')                # ... and this one for the one-line cycle summaries
+logging_started = False                                    # set by start_logging()
+
+
 ###MOTOR VARIABLES
     # NOTE: motor turn direction will be determined by which pin is high, and which is low,
             #  they output to the MCC's (motor control chip's) INput pins,
@@ -56,8 +82,28 @@ pitch_motor_pin2 = 22   # this pin is for motor polarity = GpIO25
 pitch_enable_pin = 16   # this pin is for PWM signal     = GpIO23
 
 
+### HARDWARE BACKEND variables
+    # NOTE: the backend is chosen by the environment variable SOS_BACKEND ('pi' = default, 'sim' = simulated rig)
+            #  or by calling select_backend() before setup(). GPIO and the ADC classes are taken from the backend.
+backend_name = os.environ.get('SOS_BACKEND', 'pi')
+backend = None      # set by select_backend()
+GPIO = None         # RPi.GPIO (or its simulated stand-in), set by select_backend()
+clock = None        # all waiting goes through clock.sleep(), set by select_backend()
+                        # --> wall time on the Pi, discrete-event time (jumps forward) in simulation
+
+
+### RUNTIME variables
+runtime = os.environ.get('SOS_RUNTIME', 'sync')  # 'sync'  --> workflow(): optimize, then count down the rest second by second
+                                                 # 'async' --> async_workflow(): optimization, monitor, persistence and telemetry as asyncio tasks
+persist_interval_sec = 5 * 60       # the async runtime saves the position this often (seconds)
+status_interval_sec  = 10 * 60      # the async runtime prints a status line this often (seconds)
+runtime_state = {'optimizing': False, 'cycles': 0, 'last_optimization': None,
+                 'next_optimization': None, 'trigger': None, 'control': None}
+stop_requested = threading.Event()  # set on Ctrl-C in the async runtime: the control code in the worker thread stops before its next move
+
+
 ### ADC variables
-adc = ADCDevice()   # Define an ADCDevice class object
+adc = None          # ADCDevice class object, created in setup()
 V_out = 3.3         # sets conversion factor to compute voltage from ADC, should be the voltage taken from the voltage devider
 volt_generated = 0  # sets initial variable value for measured voltage at solar cell
 
@@ -73,6 +119,8 @@ pos_pitch = 0          # sets initial pitch position (mesured in time)
 yaw_dc      = 100      # sets duty cycle (dc) for yaw motor 
 pitch_dc    = 100      # sets duty cycle (dc) for pitch motor 
 
+axis_moving = {'yaw': False, 'pitch': False}    # per-axis completion tracking: True while that motor is switched on
+
 t_rev_yaw   = 18.63    # time it takes to revolve 1 time in yaw (around)
 t_rev_pitch = 127.44   # time it takes to revolve 1 time in pitch (head-over-head)
 
@@ -88,15 +136,178 @@ adj_coarse_pitch = (degree_coarse_pitch * (t_rev_pitch / 360))   # ""
 adj_fine_yaw     = (degree_fine_yaw     * (t_rev_yaw / 360))     # ""
 adj_fine_pitch   = (degree_fine_pitch   * (t_rev_pitch / 360))   # ""
 
+calibration_file         = 'calibration.json'   # measured t_rev per axis and duty cycle (see SOScalibrate.py), replaces the values above
+calibration              = None     # the CalibrationTable object, loaded in setup()
+calibrate_on_startup     = False    # True --> startup() runs calibrate() before positioning the SOS
+calibration_revolutions  = 2        # continuous revolutions per axis during a calibration
+calibration_samples_per_rev = 360   # ADC reads per revolution during a calibration
+calibration_min_correlation = 0.6   # weaker periodicity (clouds, night) --> the calibration of that axis is rejected
+calibration_search_new   = (0.7, 2.5)   # t_rev is searched between these multiples of the guess at a duty cycle that was never
+                                        # calibrated (the guess assumes speed proportional to dc, real motors are slower near the stall)
+
+use_motion_model       = True       # True --> motor-ON times are corrected for dead time, coast and backlash (see SOSmotion.py)
+motion_model_file      = 'motion_model.json'    # fitted motion model (all 0 until fit_motion_model() has run)
+motion_model           = None       # the MotionModel object, loaded in setup()
+fit_motion_on_startup  = False      # True --> startup() runs fit_motion_model() for both axes
+motion_pulses          = 16         # pulses per axis in fit_motion_model() (+ + - - + + - - ...: half of them reversals)
+motion_pulse_deg       = 10         # length of one pulse (degrees)
+motion_slope_deg       = 45         # the pulses are made this far from the optimum, where the voltage changes with the angle
+motion_sample_interval = 0.01       # time between background ADC reads during a pulse (seconds)
+motion_settle_sec      = 0.8        # reads before the next pulse (the coast has to be over)
+motion_min_r2          = 0.8        # pulses whose trace fits the model worse than this are not used
+motion_min_span        = 8          # pulses whose trace changes by fewer ADC counts than this are not used (night, clouds)
+
+use_speed_profiles     = False      # True --> moves change the duty cycle on the way (see SOSmotion.py, speed profiles):
+                                    #          long moves ramp up, cruise at full speed and make the final approach slowly,
+                                    #          short ones (fine adjustments) run slowly all the way, for precision
+speed_profiles = {                  # per axis; the speed at every duty cycle comes from the calibration (calibrate() also
+                                    # measures cruise_dc and approach_dc when use_speed_profiles is True)
+    'yaw':   {'ramp_start_dc': 40, 'ramp_sec': 0.3, 'ramp_steps': 3,    # soft start: ramp_steps steps from ramp_start_dc
+              'cruise_dc': 100,                                         # the long part of the move
+              'approach_dc': 40, 'approach_deg': 2,                     # the last approach_deg of a long move
+              'slow_deg': 6},                                           # moves up to slow_deg run at approach_dc only
+    'pitch': {'ramp_start_dc': 40, 'ramp_sec': 0.5, 'ramp_steps': 3,
+              'cruise_dc': 100,
+              'approach_dc': 40, 'approach_deg': 1,
+              'slow_deg': 6},
+}
+profile_travel_limit_deg = 90       # the travel made at other duty cycles than the axis' own is counted with the speed
+                                    # from the calibration, whose error adds up in one direction: a profiled move that
+                                    # would take the signed sum of that travel further than this runs as a plain pulse
+profile_travel = {'yaw': 0.0, 'pitch': 0.0}     # signed travel (motor seconds) made at other duty cycles than the axis' own
+
 coarse_or_fine = 'coarse' # define the adjustment grain variable as initially coarse
                               # possible values are (coarse, fine, none)
                                   # ('coarse') --> triggers adjustment by (degree_coarse)
                                   # ('fine')   --> triggers adjustment by (degree_fine)
                                   # ('none')   --> triggers loop exit or pause
 
+adj_strategy = 'hillclimb'    # how optimize() adjusts the SOS:
+                                  # ('hillclimb')  --> yaw_adj() then pitch_adj(): fixed coarse/fine steps until the direction pattern sums to 0
+                                  # ('linesearch') --> yaw_line_search() then pitch_line_search(): bracketed golden-section / parabolic search
+                                  # ('joint')      --> joint_adj(): Nelder-Mead simplex over (pos_yaw, pos_pitch), moving both axes at once
+line_search_max_evals = 14    # maximum number of measurements per axis in a line search
+golden_ratio = (1 + 5 ** 0.5) / 2
+joint_max_evals = 30          # maximum number of measurements in one joint (2D) optimization
+line_search_growth = 1.0     # factor by which each bracketing step grows (1.0 = constant coarse steps, golden_ratio = classic)
+
+feedforward = False           # True --> each optimization first pre-positions from the solar ephemeris (feedforward_position)
+                                  #          and then only runs a short fine search (fine_search) to correct the residual error
+
+use_position_cache  = False   # True --> remember every converged optimum by time of day / day of year (SOSpredict.PositionCache)
+                                  #          and start each optimization from the cached prediction with a short fine search
+position_cache_file = 'position_cache.json'     # saved in the same directory as the script is run from
+position_cache      = None    # the PositionCache object, loaded in setup() when use_position_cache is True
+
+use_kalman             = False  # True --> track the optimum and its angular velocity (SOSpredict.OptimumTracker), pre-move to the
+                                  #          predicted optimum and size the search from the prediction's uncertainty (kalman_adj)
+kalman_confirm_sigma   = 2.5    # predictions more certain than this (degrees, both axes) are only confirmed, not searched
+kalman_confirm_drop    = 0.03   # a confirmation fails if the voltage is more than this fraction below the last optimum
+kalman_window_sigmas   = 3      # search bracket = this many standard deviations of the prediction (clamped to fine..coarse)
+optimum_tracker        = None   # the OptimumTracker object, created in setup() when use_kalman (or use_slow_tracking) is True
+volt_optimum           = 0      # voltage measured at the most recent optimum (baseline for confirmations)
+
+use_slow_tracking      = False  # True --> between optimizations the SOS follows the predicted optimum (track_rest) instead of sitting
+                                  #          still, and only every track_search_sec a (short, Kalman) corrective search runs
+track_search_sec       = 15 * 60  # time between corrective optimizations while tracking (seconds)
+track_slice_sec        = 60     # the tracking re-targets the prediction at least this often (seconds)
+track_min_dc           = 20     # lowest duty cycle that turns the motors reliably: slower than its speed --> micro-pulses
+track_step_deg         = 1.0    # size of one micro-pulse (degrees), made when the prediction has moved this far
+
 rest_interval_min = 1
 rest_interval_sec = rest_interval_min * 60       #rest interval between re-adjustments, in minutes converted to seconds
 
+rest_mode         = 'fixed'     # ('fixed')    --> always rest rest_interval_sec between optimizations
+                                # ('adaptive') --> next_rest_interval() picks the rest from the drift of the optimum and the voltage trend
+rest_min_sec      = 30          # shortest adaptive rest (seconds)
+rest_max_sec      = 15 * 60     # longest adaptive rest (seconds)
+drift_budget_deg  = 2.0         # re-optimize before the optimum can have drifted further than this (degrees)
+volt_budget       = 0.05        # re-optimize before the optimum voltage can have changed by more than this fraction
+use_monitor             = False   # True --> rest with a background monitor (monitor_rest) instead of a plain countdown:
+                                  #          re-optimize early on a voltage drop, skip optimizations while still on target
+monitor_interval_sec    = 10      # time between the monitor's single ADC reads (seconds)
+monitor_drop_fraction   = 0.02    # a read more than this fraction below the post-optimization baseline counts as a drop
+monitor_confirm_reads   = 3       # consecutive low reads needed to trigger (so a passing bird does not)
+monitor_max_rest_sec    = 15 * 60 # never go longer than this without an optimization (seconds)
+skipped_cycles          = 0       # number of optimizations skipped because the monitor saw the SOS still on target
+optimum_history   = []          # (clock time, yaw°, pitch°, volt_optimum) of the most recent optimizations
+optimum_history_length = 5
+
+
+### measurement parameters (used by measure_volt)
+measure_mode           = 'adaptive' # 'fixed'    --> always take measure_max_samples reads, measure_fixed_interval apart
+                                    # 'adaptive' --> burst reads and stop as soon as the mean ADC value is known well enough
+measure_max_samples    = 10         # sample budget: maximum number of reads per measurement
+measure_min_samples    = 3          # minimum number of reads before the stopping rule is checked (adaptive mode)
+measure_fixed_interval = 0.2        # time between reads in fixed mode (seconds)
+measure_burst_interval = 0.02       # time between reads in adaptive mode (seconds)
+measure_target_ci      = 0.5        # adaptive mode stops once the 95% confidence half-width of the mean is below this (ADC counts)
+measure_filter         = 'mean'     # how the reads are combined: 'mean', 'median' or 'trimmed' (trimmed mean)
+measure_trim_fraction  = 0.2        # fraction of reads dropped at EACH end for the trimmed mean
+
+
+### site parameters (used by the solar ephemeris, see SOSsolar.py)
+latitude            = 48.21         # latitude of the SOS (degrees, north = +)
+longitude           = 16.37         # longitude of the SOS (degrees, east = +)
+yaw_origin_azimuth  = 180.0         # compass azimuth the cell faces at pos_yaw = 0 (degrees, 0 = north, 180 = south)
+pitch_origin_zenith = 0.0           # angle between the cell normal and the zenith at pos_pitch = 0 (degrees, 0 = facing straight up)
+
+
+### initial yaw scan parameters (used by yaw_scan)
+yaw_scan_mode         = 'sweep'     # 'sweep'     --> yaw_sweep_360(): one continuous revolution while sampling the ADC
+                                    # 'sample120' --> yaw_sample_120(): full measurements at 3 stationary positions
+sweep_sample_interval = 0.05        # time between background ADC reads during the sweep (seconds)
+sweep_smoothing       = 5           # number of neighbouring sweep samples averaged when looking for the peak
+sweep_profile         = []          # (pos_yaw, adc_value) samples of the most recent sweep
+
+
+### telemetry (see SOStelemetry.py)
+use_telemetry        = True         # True --> keep every ADC sample, measurement and move in fixed-size ring buffers
+telemetry_samples    = 100000       # number of ADC samples kept (the oldest are overwritten)
+telemetry_records    = 20000        # number of measurements and of moves kept
+telemetry            = None         # the Telemetry object, created in setup() when use_telemetry is True
+use_binary_log       = False        # True --> also append every measurement, move and optimization to the binary log on disk
+binary_log_dir       = 'soslog'     # directory of the binary log (one sos-YYYYMMDD.bin per day, read with SOSlog.read_range)
+binary_log           = None         # the BinaryLog object, created in setup() when use_binary_log is True
+measure_count        = 0            # number of measure_volt() calls so far (measurements per optimization)
+
+
+### per-phase instrumentation (see SOSinstrument.py)
+use_instrumentation   = True        # True --> time and count every phase (setup, measure_volt, yaw_coarse, yaw_fine, reset_pos, ...)
+instrument_window     = 200         # number of recent calls per phase kept for the rolling histograms and summaries
+instrument_report_sec = 60 * 60     # print the phase report this often (seconds, None = never)
+instrument            = None        # the Instrumentation object, created in setup() when use_instrumentation is True
+instrument_reported   = None        # clock time of the last phase report
+
+
+### metrics HTTP endpoint (see SOSmetrics.py)
+use_metrics_server    = False       # True --> serve http://<pi>:<metrics_port>/metrics (Prometheus) and /metrics.json
+metrics_host          = '0.0.0.0'   # interface the server listens on ('127.0.0.1' = only local scrapers)
+metrics_port          = int(os.environ.get('SOS_METRICS_PORT', 9105))
+metrics_server        = None        # the MetricsServer object, started in setup() when use_metrics_server is True
+optimizations_total   = 0           # number of finished optimize() calls
+last_optimization     = None        # clock time at the end of the last optimize()
+last_cycle            = {'duration': None, 'measurements': None, 'motor': None}   # the last optimize(): seconds, measure_volt calls, motor-ON seconds
+motor_on_total        = {'yaw': 0.0, 'pitch': 0.0}      # motor-ON seconds per axis since the start
+cycle_duration_hist     = SOSmetrics.Histogram((2, 5, 10, 20, 30, 45, 60, 90, 120, 300))   # seconds per optimize()
+cycle_measurements_hist = SOSmetrics.Histogram((1, 2, 3, 5, 8, 13, 21, 34))                 # measure_volt calls per optimize()
+cycle_motor_hist        = SOSmetrics.Histogram((1, 2, 5, 10, 20, 30, 60, 120))              # motor-ON seconds per optimize()
+
+
+### crash-safe position persistence (see SOSjournal.py)
+use_position_journal   = None       # None --> on the Pi only, True / False --> always / never
+position_journal_file  = 'position_journal.log'     # intent / done record of every move (same directory as position_save.txt)
+position_snapshot_file = 'position_save.txt'        # atomic snapshot, also read by get_saved_pos_val()
+snapshot_interval_sec  = 300        # a new snapshot (and a fresh journal) this often (seconds)
+journal_fsync_sec      = 2.0        # journal records are fsync'ed at most this long after they are written (0 = every record)
+position_journal       = None       # the PositionJournal object, created in setup()
+position_recovered     = False      # True --> setup() restored the position from the snapshot and journal
+recovered_position_mode = 'ask'     # what to do with a position recovered from the snapshot and journal of the last run:
+                                    # 'ask'     --> keep it, but on the Pi startup() shows it and asks (n --> the current
+                                    #               physical position becomes the origin, e.g. after a manual re-home)
+                                    # 'keep'    --> keep it without asking
+                                    # 'discard' --> ignore it: the current physical position is the origin
+
 
 
 
@@ -111,22 +322,67 @@ rest_interval_sec = rest_interval_min * 60       #rest interval between re-adjus
 #####################################################################################################
 
 
+def start_logging():          # routes the output of the script through SOSlogging (level, mode, format and file from the LOGGING variables)
+    
+    global logging_started
+    SOSlogging.configure(log_level, log_mode, log_format, log_file)
+    logging_started = True
+
+
+#====================================================================================================
+
+
+def select_backend(new_backend=None):          # chooses the hardware backend (object or name), then exposes its GPIO globally
+    
+    global backend
+    global GPIO
+    global clock
+
+    if not logging_started:
+        start_logging()
+    if new_backend is None:
+        new_backend = backend_name
+    if isinstance(new_backend, str):
+        if new_backend == 'sim':
+            new_backend = SOSbackend.make_backend('sim',
+                                                  yaw_pins=(yaw_motor_pin1, yaw_motor_pin2, yaw_enable_pin),
+                                                  pitch_pins=(pitch_motor_pin1, pitch_motor_pin2, pitch_enable_pin))
+        else:
+            new_backend = SOSbackend.make_backend(new_backend)
+    
+    backend = new_backend
+    GPIO = backend.GPIO
+    clock = backend.clock
+    log.info('Using the %s hardware backend with the %s clock', backend.name, clock.name)
+
+
+#====================================================================================================
+
 def setup():          # inial setup: checks for adc, configures GPIO pis, creates PWMs, DEFINES COMMON PARAMETERS 
         
-    print('\n','\n','\n','[setup() function has been called -- now running basic set-up] ...)','\n')
+    log.debug('[setup() function has been called -- now running basic set-up] ...)')
+
+    if backend is None:         # no backend chosen yet --> use the one named by SOS_BACKEND
+        select_backend()
+
+    global instrument
+    global instrument_reported
+    if use_instrumentation:
+        instrument = SOSinstrument.Instrumentation(clock.now, instrument_window)
+        instrument_reported = clock.now()
+    phase_begin('setup')
 
     ### ADC SET-UP
         #(ADC = analog-digital converter)
         #NOTE: we are using the ADC 'ADS7830', which is an SI-bus enabled ADC. 
         #The ADS7830 has 8-bit resolution, which means it has 2^8 = 256 levels
     global adc  #makes the adc available globally
+    adc = backend.ADCDevice()   # Define an ADCDevice class object
     if(adc.detectI2C(0x4b)):    # Detect the ADS7830 (ADC)
-        adc = ADS7830()  
-        print('The correct ADC (analog-to-digital converter) device was connencted:',adc)
+        adc = backend.ADS7830()  
+        log.info('The correct ADC (analog-to-digital converter) device was connencted: %s', adc)
     else:
-        print("Correct I2C address was not found, \n"
-            "Please use command 'i2cdetect -y 1' to check the I2C address! \n"
-            "Program Exit. \n");
+        log.error("Correct I2C address was not found, please use command 'i2cdetect -y 1' to check the I2C address! Program Exit.");
         exit(-1)
 
     ### INITIAL GPIO SET-UP
@@ -158,6 +414,47 @@ def setup():          # inial setup: checks for adc, configures GPIO pis, create
     pwm_pitch = GPIO.PWM(pitch_enable_pin,100)  # creats PWM at a frequency of 0.1 kHz (100 cycles / second)
     pwm_pitch.start(0)                          # starts PWM with an initial dc of 0
     
+    ### learned position lookup table
+    global position_cache
+    if use_position_cache:
+        position_cache = SOSpredict.PositionCache()
+        try:
+            position_cache.load(position_cache_file)
+            log.info('loaded %s cached optimum positions from %s', len(position_cache.entries), position_cache_file)
+        except (IOError, ValueError):
+            log.info('no usable %s found --> starting with an empty position cache', position_cache_file)
+
+    ### optimum trajectory predictor
+    global optimum_tracker
+    if use_kalman or use_slow_tracking:
+        optimum_tracker = SOSpredict.OptimumTracker()
+
+    ### in-memory telemetry
+    global telemetry
+    if use_telemetry:
+        telemetry = SOStelemetry.Telemetry(telemetry_samples, telemetry_records, telemetry_records)
+    global binary_log
+    if use_binary_log and (binary_log is None):
+        binary_log = SOSlog.BinaryLog(binary_log_dir)
+
+    ### revolution times: measured values from calibration.json, where there are any
+    global calibration
+    calibration = SOScalibrate.CalibrationTable()
+    try:
+        calibration.load(calibration_file)
+        log.info('loaded the motor calibration from %s', calibration_file)
+    except (IOError, ValueError):
+        log.info('no usable %s found --> using the nominal revolution times', calibration_file)
+    apply_calibration()
+    global motion_model
+    if use_motion_model:
+        motion_model = SOSmotion.MotionModel()
+        try:
+            motion_model.load(motion_model_file)
+            log.info('loaded the motion model from %s : %s', motion_model_file, motion_model.parameters)
+        except (IOError, ValueError):
+            log.info('no usable %s found --> motor-ON times are not corrected until fit_motion_model() has run', motion_model_file)
+
     ### initial setting of recurring variables
     global direction
     direction = 1
@@ -169,13 +466,94 @@ def setup():          # inial setup: checks for adc, configures GPIO pis, create
     pos_pitch = 0
     global volt_generated
     volt_generated = 0
+    
+    ### crash-safe position: replay the snapshot and journal of the last run, then start a fresh journal
+    global position_journal
+    global position_recovered
+    if use_position_journal or ((use_position_journal is None) and (backend.name == 'pi')):
+        position_journal = SOSjournal.PositionJournal(position_journal_file, position_snapshot_file, clock.now,
+                                                      snapshot_interval_sec, journal_fsync_sec)
+        recovered = position_journal.recover()
+        if (recovered is not None) and (recovered_position_mode == 'discard'):
+            log.warning('ignoring the position recovered from %s (recovered_position_mode = discard) --> the current position is the origin',
+                        recovery_source())
+        elif recovered is not None:
+            pos_yaw, pos_pitch = recovered
+            position_recovered = True
+            log.info('recovered the position of the last run from %s : pos_yaw = %s , pos_pitch = %s',
+                     recovery_source(), pos_yaw, pos_pitch)
+        position_journal.snapshot(pos_yaw, pos_pitch)
+    
+    ### metrics HTTP endpoint
+    global metrics_server
+    if use_metrics_server and (metrics_server is None):
+        try:
+            metrics_server = SOSmetrics.MetricsServer(metrics, metrics_host, metrics_port).start()
+            log.info('serving metrics on port %s (/metrics and /metrics.json)', metrics_server.port)
+        except OSError as error:                # e.g. port already in use --> run without the endpoint
+            log.warning('could not start the metrics server on port %s : %s', metrics_port, error)
+    
+    phase_end()
+
+
+#====================================================================================================
+
+def recovery_source():          # where position_journal.recover() found the position, for the log and the prompt
+    
+    baseline, records, unfinished = position_journal.recovery
+    if (baseline == 'snapshot'):
+        source = position_snapshot_file
+    else:
+        source = 'the last snapshot in ' + position_journal_file
+    if (records == 0) and (unfinished == 0):
+        return source + ' only'
+    source = '%s + %s journal records' % (source, records)
+    if (unfinished > 0):
+        source = source + ' (%s unfinished moves counted in full)' % unfinished
+    return source
+
+
+#====================================================================================================
+
+def confirm_recovered_pos():          # shows the position recovered by setup() and lets the operator reject it
+
+    log.debug('[confirm_recovered_pos() function has been called -- now asking whether to keep the recovered position] ...)')
+
+    global pos_yaw
+    global pos_pitch
+    global position_recovered
+
+    choosing = True
+    while (choosing == True):
+
+        choice = input('\n''The position of the last run was recovered from ' + recovery_source() + ': \n'
+        'YAW ' + str(round(pos_yaw * 360 / t_rev_yaw, 2)) + ' °, PITCH ' + str(round(pos_pitch * 360 / t_rev_pitch, 2)) + ' ° \n'
+        'Would you like to keep it? \n'
+        '(if No, the SOS will use its current position in yaw and pitch as origin, e.g. after re-homing it by hand) \n'
+        '(y / n ) :  ')
+
+        if (choice == 'y'):
+            print ('\n''You have chosen YES')
+            choosing = False
+        elif (choice == 'n'):
+            print ('\n''you have chosen NO --> the current position will be taken as origin')
+            choosing = False
+            pos_yaw = 0
+            pos_pitch = 0
+            position_recovered = False
+            position_journal.snapshot(pos_yaw, pos_pitch)      # a crash from here on replays from the new origin
+        else :
+            print('\n'
+                  '§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§§\n'
+                  '\n'
+                  'please answer "y" for yes, or "n" for NO ...')
 
 
 #====================================================================================================
 
 def import_pos_val_opt():
 
-    print('\n','\n','\n','[import_pos_val_opt() function has been called -- now giving option to import positional values for positional re-set] ...)','\n')
+    log.debug('[import_pos_val_opt() function has been called -- now giving option to import positional values for positional re-set] ...)')
 
     choosing = True
     while (choosing == True):
@@ -213,32 +591,203 @@ def import_pos_val_opt():
 #====================================================================================================
 
 
+def filter_adc_values(adc_values):          # combines several ADC reads into one value according to measure_filter
+    
+    if (measure_filter == 'median'):
+        ordered = sorted(adc_values)
+        middle = len(ordered) // 2
+        if (len(ordered) % 2 == 1):
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+    elif (measure_filter == 'trimmed'):
+        ordered = sorted(adc_values)
+        cut = int(len(ordered) * measure_trim_fraction)     # number of reads dropped at each end
+        kept = ordered[cut:len(ordered) - cut]
+        return sum(kept) / len(kept)
+    else:
+        return sum(adc_values) / len(adc_values)
+
+
+#====================================================================================================
+
+
+def adc_to_adc_volt(adc_value):          # converts an (average) ADC value into the voltage on the 8-bit ADC (after the voltage splitter)
+    
+    return adc_value / 255.0 * V_out
+
+
+def adc_to_volt(adc_value):          # converts an (average) ADC value into the voltage generated by the solar cell
+    
+    return adc_to_adc_volt(adc_value) * 5.6         # the conversion factor for a 10+46 k Ohm V-splitter is 5.6
+
+
+#====================================================================================================
+
+
 def measure_volt():          # measures value on adc and defines variables (avg_adc_value, volt_on_adc, volt_generated)
             
-    print('\n','\n','\n','[measure_volt() function has been called -- now measuring voltage] ...)','\n')
+    log.debug('[measure_volt() function has been called -- now measuring voltage] ...)')
+    
+    phase_begin('measure_volt')
     
-    cum_adc_value = 0                               # initially sets variable to 0
-    iterations = 10                                 # number of iterations to be averaged across
-    iteration_interval = 0.2                        # time between iterative measurements 
+    adc_values = []                                 # all reads of this measurement
+    n = 0                                           # running statistics (Welford): number of reads,
+    mean = 0.0                                      #   running mean of the reads
+    m2 = 0.0                                        #   and running sum of squared deviations from the mean
+    
+    if (measure_mode == 'adaptive'):
+        iteration_interval = measure_burst_interval
+    else:
+        iteration_interval = measure_fixed_interval
 
-    print('Averaging voltage measurements in current position...')
-    for i in range(0, iterations, 1):               # conduct 10 consecutive reads
+    log.debug('Averaging voltage measurements in current position...')
+    for i in range(0, measure_max_samples, 1):      # conduct up to measure_max_samples consecutive reads
+        if (i > 0):
+            clock.sleep(iteration_interval)         # time between measurements
         adc_value = adc.analogRead(0)               # reads the (0-255) value at adc channel 0
-        cum_adc_value = cum_adc_value + adc_value   # read and sum the ADC value of channel 0 over the iteration
-        print('measurement', i+1, ': the mesured ADC Value is', adc_value)
-        time.sleep(iteration_interval)                              # time between measurements
+        adc_values.append(adc_value)
+        log.debug('measurement %s : the mesured ADC Value is %s', i+1, adc_value)
+        if telemetry is not None:
+            telemetry.sample(clock.now(), adc_value)
+        
+        n = n + 1
+        delta = adc_value - mean
+        mean = mean + delta / n
+        m2 = m2 + delta * (adc_value - mean)
+        
+        if (measure_mode == 'adaptive') and (n >= max(measure_min_samples, 2)):     # the spread needs two reads
+            ci_half_width = 1.96 * (m2 / (n - 1) / n) ** 0.5     # 95% confidence half-width of the mean
+            if (ci_half_width <= measure_target_ci):
+                log.debug('mean is known to +/- %s ADC counts after %s reads --> stopping early', round(ci_half_width, 2), n)
+                break
     
-    avg_adc_value = cum_adc_value / iterations      # calculates the average ADC value
-    print('The average ADC value in this position is', avg_adc_value)
+    avg_adc_value = filter_adc_values(adc_values)   # calculates the (filtered) average ADC value
+    log.debug('The average ADC value in this position is %s', avg_adc_value)
     
-    volt_on_adc = avg_adc_value / 255.0 * V_out     # calculate the approximate actual voltage on the 8-bit ADC (after the voltage splitter)
+    volt_on_adc = adc_to_adc_volt(avg_adc_value)    # calculate the approximate actual voltage on the 8-bit ADC (after the voltage splitter)
     
     global volt_generated
-    volt_generated = volt_on_adc * 5.6              # calculate the approximate actual voltage generated by the solar cell (w/o the voltage splitter) 
-                                                            # the conversion factor for a 10+46 k Ohm V-splitter is 5.6)
-    print ('This computes to: \n'
-               '~', round(volt_on_adc, 2) ,'V on the ADC post V-splitter; therefore \n'
-               '~', round(volt_generated, 2), 'V is generated in this position by the solar cell')
+    volt_generated = adc_to_volt(avg_adc_value)     # calculate the approximate actual voltage generated by the solar cell (w/o the voltage splitter) 
+    log.debug('This computes to ~%s V on the ADC post V-splitter, i.e. ~%s V generated in this position by the solar cell', round(volt_on_adc, 2), round(volt_generated, 2))
+    
+    record_measurement(len(adc_values), avg_adc_value)
+    
+    phase_end()
+
+
+#====================================================================================================
+
+
+def record_measurement(reads, avg_adc_value):          # adds a measure_volt() result to the telemetry and the binary log
+    
+    global measure_count
+    measure_count = measure_count + 1
+    if instrument is not None:
+        instrument.measurement()
+    if telemetry is not None:
+        telemetry.measurement(clock.now(), reads, avg_adc_value, volt_generated)
+    if binary_log is not None:
+        binary_log.measurement(clock.datetime().timestamp(), reads, avg_adc_value, volt_generated, pos_yaw, pos_pitch)
+
+
+#====================================================================================================
+
+
+def record_move(axis, move_direction, axis_time, dc=None):          # adds a finished move of one axis to the telemetry, the binary log and the position journal
+    
+    if dc is None:                                  # the fastest duty cycle of the move (its own, unless a speed profile ran)
+        dc = yaw_dc if axis == 'yaw' else pitch_dc
+    motor_on_total[axis] = motor_on_total[axis] + axis_time
+    if instrument is not None:
+        instrument.motor(axis_time)
+    if telemetry is not None:
+        telemetry.move(clock.now(), axis, move_direction, axis_time, dc, pos_yaw, pos_pitch)
+    if binary_log is not None:
+        binary_log.move(clock.datetime().timestamp(), axis, move_direction, axis_time, dc, pos_yaw, pos_pitch)
+    if position_journal is not None:
+        position_journal.done(axis, pos_yaw, pos_pitch)
+
+
+#====================================================================================================
+
+
+def record_optimization(outcome, duration, measurements, motor):          # adds a finished optimize() to the metrics and the binary log
+    
+    global optimizations_total
+    global last_optimization
+    optimizations_total = optimizations_total + 1
+    last_optimization = clock.now()
+    last_cycle['duration'], last_cycle['measurements'], last_cycle['motor'] = duration, measurements, motor
+    cycle_duration_hist.observe(duration)
+    cycle_measurements_hist.observe(measurements)
+    cycle_motor_hist.observe(motor)
+    if binary_log is not None:
+        binary_log.optimization(clock.datetime().timestamp(), outcome, measurements, volt_optimum, duration, pos_yaw, pos_pitch)
+    yaw_deg, pitch_deg = pos_yaw * 360 / t_rev_yaw, pos_pitch * 360 / t_rev_pitch
+    cycle_log.info('cycle %d: %s in %.1f s, %d measurements, motor-ON %.1f s --> yaw %.1f°, pitch %.1f°, %.2f V',
+                   optimizations_total, outcome, duration, measurements, motor, yaw_deg, pitch_deg, volt_optimum,
+                   extra={'fields': {'cycle': optimizations_total, 'outcome': outcome, 'duration_s': round(duration, 3),
+                                     'measurements': measurements, 'motor_on_s': round(motor, 3),
+                                     'yaw_deg': round(yaw_deg, 2), 'pitch_deg': round(pitch_deg, 2),
+                                     'volt_optimum': round(volt_optimum, 3)}})
+
+
+#====================================================================================================
+
+
+def metrics():          # current metrics for the metrics server (called from its threads, so it only reads)
+    
+    Metric = SOSmetrics.Metric
+    since = None if last_optimization is None else clock.now() - last_optimization
+    return [
+        Metric('sos_position_degrees', 'gauge', 'Current position of each axis (degrees from the origin)',
+               {'yaw': pos_yaw * 360 / t_rev_yaw, 'pitch': pos_pitch * 360 / t_rev_pitch}),
+        Metric('sos_volt_generated', 'gauge', 'Voltage of the solar cell at the last measurement (V)', volt_generated),
+        Metric('sos_volt_optimum', 'gauge', 'Voltage at the last optimum (V)', volt_optimum),
+        Metric('sos_optimizing', 'gauge', '1 while an optimization is running', int(runtime_state['optimizing'])),
+        Metric('sos_optimizations_total', 'counter', 'Finished optimizations', optimizations_total),
+        Metric('sos_skipped_optimizations_total', 'counter', 'Optimizations skipped by the voltage monitor', skipped_cycles),
+        Metric('sos_seconds_since_last_optimization', 'gauge', 'Seconds since the last optimization ended', since),
+        Metric('sos_last_cycle_duration_seconds', 'gauge', 'Duration of the last optimization (s)', last_cycle['duration']),
+        Metric('sos_last_cycle_measurements', 'gauge', 'Measurements taken by the last optimization', last_cycle['measurements']),
+        Metric('sos_last_cycle_motor_on_seconds', 'gauge', 'Motor-ON seconds of the last optimization', last_cycle['motor']),
+        Metric('sos_cycle_duration_seconds', 'histogram', 'Duration of the optimizations (s)', cycle_duration_hist),
+        Metric('sos_cycle_measurements', 'histogram', 'Measurements per optimization', cycle_measurements_hist),
+        Metric('sos_cycle_motor_on_seconds', 'histogram', 'Motor-ON seconds per optimization', cycle_motor_hist),
+        Metric('sos_measurements_total', 'counter', 'measure_volt() calls since the start', measure_count),
+        Metric('sos_motor_on_seconds_total', 'counter', 'Motor-ON seconds since the start', dict(motor_on_total)),
+    ]
+
+
+#====================================================================================================
+
+
+def phase_begin(name):          # starts timing a phase (setup, measure_volt, yaw_coarse, ...), see SOSinstrument.py
+    if instrument is not None:
+        instrument.begin(name)
+
+
+def phase_end():          # stops timing the innermost running phase
+    if instrument is not None:
+        instrument.end()
+
+
+def phase_iteration():          # counts one pass of an adjustment loop for the running phases
+    if instrument is not None:
+        instrument.iteration()
+
+
+def end_cycle(**extra):          # closes the per-cycle phase summary, prints the phase report when it is due
+    
+    global instrument_reported
+    if instrument is None:
+        return None
+    summary = instrument.end_cycle(**extra)
+    if (instrument_report_sec is not None) and (clock.now() - instrument_reported >= instrument_report_sec):
+        instrument_reported = clock.now()
+        if log.isEnabledFor(logging.INFO):      # the report is only built if it is logged
+            log.info('PHASE REPORT (rolling window of the last %s calls per phase):\n%s', instrument_window, instrument.report())
+    return summary
 
 
 #====================================================================================================
@@ -248,48 +797,199 @@ def report_pos():
     global pos_deg_pitch
     global pos_deg_yaw
         
-    print('\n','\n','\n','[report_pos() function has been called] ...)','\n')
+    log.debug('[report_pos() function has been called] ...)')
 
-    print ('The SOS is currently in the following position (default origin is 0°, 0°): \n'
-            '   YAW   position (device rotation) currently is ',(round(pos_yaw, 2)),'=',(round(pos_yaw*360/t_rev_yaw, 2)),'° \n'
-            '   PITCH position (cell   rotation) currently is ',(round(pos_pitch, 2)),'=',(round(pos_pitch*360/t_rev_pitch, 2)),'°')
+    log.info('The SOS is in position YAW %s = %s °, PITCH %s = %s ° (default origin is 0°, 0°)', round(pos_yaw, 2), round(pos_yaw*360/t_rev_yaw, 2), round(pos_pitch, 2), round(pos_pitch*360/t_rev_pitch, 2))
 
 
 #====================================================================================================
 
 
-def yaw_move():          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        
-    print('\n','\n','\n','[yaw_move() function has been called -- now moving YAW] ...)','\n')
+def motor_on(axis, dc=None):          # switches on the motor of one axis ('yaw' or 'pitch') in the direction given by variable (direction)
     
-    global move_time
-    global direction
-    global pos_yaw
+    if (axis == 'yaw'):
+        pwm, axis_dc, motor_pin1, motor_pin2 = pwm_yaw, yaw_dc, yaw_motor_pin1, yaw_motor_pin2
+    else:
+        pwm, axis_dc, motor_pin1, motor_pin2 = pwm_pitch, pitch_dc, pitch_motor_pin1, pitch_motor_pin2
+    if dc is None:                                  # the duty cycle of the axis, unless a speed profile sets another one
+        dc = axis_dc
 
-    pwm_yaw.ChangeDutyCycle(yaw_dc)                 # change PMW (duty cycle)
-    print ('PWM duty cycle for Yaw motors is', yaw_dc, '%')
+    pwm.ChangeDutyCycle(dc)                         # change PMW (duty cycle)
+    log.debug('PWM duty cycle for %s motor is %s %%', axis, dc)
 
     if (direction > 0):                             # make motor turn forward if direction = 1
-        GPIO.output(yaw_motor_pin1,GPIO.HIGH)       # motoRPin1 output HIGH level
-        GPIO.output(yaw_motor_pin2,GPIO.LOW)        # motoRPin2 output LOW level
-        print ('Turning yaw forward...')
+        GPIO.output(motor_pin1,GPIO.HIGH)           # motoRPin1 output HIGH level
+        GPIO.output(motor_pin2,GPIO.LOW)            # motoRPin2 output LOW level
+        log.debug('Turning %s forward...', axis)
     elif (direction < 0):                           # make motor turn forward if direction = -1
-        GPIO.output(yaw_motor_pin1,GPIO.LOW)        # motoRPin1 output LOW level
-        GPIO.output(yaw_motor_pin2,GPIO.HIGH)       # motoRPin2 output HIGH level# make motor turn backward
-        print ('Turning yaw backward...')
+        GPIO.output(motor_pin1,GPIO.LOW)            # motoRPin1 output LOW level
+        GPIO.output(motor_pin2,GPIO.HIGH)           # motoRPin2 output HIGH level# make motor turn backward
+        log.debug('Turning %s backward...', axis)
     else :                                          # stop motor if direction = 0
-        GPIO.output(yaw_motor_pin1,GPIO.LOW)        # motoRPin1 output LOW level
-        GPIO.output(yaw_motor_pin2,GPIO.LOW)        # motoRPin2 output LOW level
-        print ('No direction -> Motor stopped...')
+        GPIO.output(motor_pin1,GPIO.LOW)            # motoRPin1 output LOW level
+        GPIO.output(motor_pin2,GPIO.LOW)            # motoRPin2 output LOW level
+        log.debug('No direction -> Motor stopped...')
+
+    axis_moving[axis] = True
+
+
+#====================================================================================================
+
+
+def motor_off(axis):          # switches off the motor of one axis ('yaw' or 'pitch')
+    
+    if (axis == 'yaw'):
+        pwm, motor_pin1, motor_pin2 = pwm_yaw, yaw_motor_pin1, yaw_motor_pin2
+    else:
+        pwm, motor_pin1, motor_pin2 = pwm_pitch, pitch_motor_pin1, pitch_motor_pin2
+
+    GPIO.output(motor_pin1,GPIO.LOW)                # motoRPin1 output LOW level
+    GPIO.output(motor_pin2,GPIO.LOW)                # motoRPin2 output LOW level    
+    
+    pwm.ChangeDutyCycle(0)                          # set duty cycle
+
+    axis_moving[axis] = False
+
+
+def motor_speed(axis, dc):          # changes the duty cycle of a running motor (the next segment of a speed profile)
+    
+    pwm = pwm_yaw if axis == 'yaw' else pwm_pitch
+    pwm.ChangeDutyCycle(dc)
+    log.debug('PWM duty cycle for %s motor is %s %%', axis, dc)
+
+
+#====================================================================================================
+
+
+def motor_on_time(axis, move_direction, travel):          # motor-ON seconds for a move of (travel) seconds of one axis
+    
+    if motion_model is None:
+        return travel
+    return motion_model.on_time(axis, move_direction, travel)
+
+
+def motor_travel(axis, move_direction, on_time):          # real travel of one axis after its motor was on for (on_time) measured seconds
+    
+    if motion_model is None:
+        return on_time
+    travel = motion_model.travel(axis, move_direction, on_time)
+    if (on_time > 0):
+        motion_model.moved(axis, move_direction)
+    return travel
+
+
+def settle_time(axis):          # seconds the axis keeps coasting after its motor is switched off
+    
+    return 0.0 if motion_model is None else motion_model.settle_time(axis)
+
+
+def speed_ratio(axis, dc):          # speed of one axis at duty cycle dc, relative to its own duty cycle (the units of pos_*)
+    
+    # NOTE: from the calibration table: interpolated between calibrated duty cycles, proportional to dc if there is only one
+    
+    axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+    t_rev_axis = t_rev_yaw if axis == 'yaw' else t_rev_pitch
+    if (dc == axis_dc):
+        return 1.0
+    if (dc <= 0):
+        return 0.0
+    if calibration is None:
+        return dc / axis_dc
+    t_rev_dc = calibration.t_rev(axis, dc, t_rev_axis, axis_dc)
+    return 0.0 if t_rev_dc is None else t_rev_axis / t_rev_dc     # None: below the stall
+
+
+def off_speed_travel(axis, segments):          # travel of the segments [(dc, seconds), ...] made at other duty cycles than the axis' own
+    
+    axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+    return sum(speed_ratio(axis, dc) * seconds for (dc, seconds) in segments if dc != axis_dc)
+
+
+def off_speed_allowed(axis, travel):          # True if (travel) more signed seconds at other duty cycles keep profile_travel within its limit
+    
+    limit = profile_travel_limit_deg * (t_rev_yaw if axis == 'yaw' else t_rev_pitch) / 360
+    after = profile_travel[axis] + travel
+    return (abs(after) <= limit) or (abs(after) < abs(profile_travel[axis]))
+
+
+def move_segments(axis, move_direction, travel):          # [(dc, motor-ON seconds), ...] for a move of (travel) seconds of one axis
+    
+    # NOTE: a single segment at the duty cycle of the axis is the plain pulse of motor_on_time();
+    #       with use_speed_profiles the move follows speed_profiles[axis] (see SOSmotion.plan_profile),
+    #       unless that would take profile_travel beyond profile_travel_limit_deg
+    
+    axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+    profile = speed_profiles.get(axis) if use_speed_profiles else None
+    if profile is not None:
+        t_rev_axis = t_rev_yaw if axis == 'yaw' else t_rev_pitch
+        losses = motion_model.losses(axis, move_direction) if motion_model is not None else (0.0, 0.0, 0.0)
+        steps = max(int(profile['ramp_steps']), 1)
+        ramp_dcs = [profile['ramp_start_dc'] + (profile['cruise_dc'] - profile['ramp_start_dc']) * i / steps for i in range(steps)]
+        segments = SOSmotion.plan_profile(travel, lambda dc: speed_ratio(axis, dc), profile['cruise_dc'], profile['approach_dc'],
+                                          profile['approach_deg'] * t_rev_axis / 360, profile['slow_deg'] * t_rev_axis / 360,
+                                          ramp_dcs, profile['ramp_sec'] / steps, *losses)
+        if segments is None:
+            log.warning('the %s speed profile uses a duty cycle that does not turn the motor --> plain move', axis)
+        elif off_speed_allowed(axis, move_direction * off_speed_travel(axis, segments)):
+            return segments
+        else:
+            log.debug('%s has travelled %s ° at other duty cycles than its own --> plain move', axis,
+                      round(profile_travel[axis] * 360 / t_rev_axis, 1))
+    return [(axis_dc, motor_on_time(axis, move_direction, travel))]
+
+
+def segments_travel(axis, move_direction, segments):          # real travel of one axis after measured segments [(dc, seconds), ...]
+    
+    axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+    if (len(segments) == 1) and (segments[0][0] == axis_dc):
+        return motor_travel(axis, move_direction, segments[0][1])
+    losses = motion_model.losses(axis, move_direction) if motion_model is not None else (0.0, 0.0, 0.0)
+    travel = SOSmotion.profile_travel(segments, lambda dc: speed_ratio(axis, dc), *losses)
+    if (motion_model is not None) and (travel > 0):
+        motion_model.moved(axis, move_direction)
+    profile_travel[axis] = profile_travel[axis] + move_direction * off_speed_travel(axis, segments)
+    return travel
+
+
+#====================================================================================================
+
+
+class StopRequested(Exception):          # raised by check_stop() once stop_requested is set
+    pass
+
+
+def check_stop():          # called before every move: ends the control code in the worker thread after Ctrl-C (async runtime)
+    
+    if stop_requested.is_set():
+        raise StopRequested('the program is ending')
+
+
+#====================================================================================================
+
+
+def yaw_move():          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+        
+    log.debug('[yaw_move() function has been called -- now moving YAW] ...)')
+    check_stop()
     
-    time.sleep(abs(move_time))                      # allows movement time
+    global move_time
+    global direction
+    global pos_yaw
+
+    if use_speed_profiles:                          # changes the duty cycle on the way: timed segment by segment in move_both
+        move_both(move_time * direction, 0)
+        return
+    if position_journal is not None:                # the intent is on disk before the motor starts
+        position_journal.intent(move_time * direction, 0)
+    on_time = motor_on_time('yaw', direction, abs(move_time))     # corrected for dead time, coast and backlash
     
-    GPIO.output(yaw_motor_pin1,GPIO.LOW)            # motoRPin1 output LOW level
-    GPIO.output(yaw_motor_pin2,GPIO.LOW)            # motoRPin2 output LOW level    
+    # motor_on sets duty cycle and polarity pins according to (direction); the pulse returns the MEASURED on-time
+    on_time = clock.pulse(lambda: motor_on('yaw'), lambda: motor_off('yaw'), on_time)
     
-    pwm_yaw.ChangeDutyCycle(0)                      # set duty cycle
+    clock.sleep(settle_time('yaw'))                 # lets the axis coast to a stop
 
-    pos_yaw = pos_yaw + (move_time * direction)     # redefines stored position by adding directional (+/-) movement time
+    pos_yaw = pos_yaw + (motor_travel('yaw', direction, on_time) * direction)   # redefines stored position by adding the directional (+/-) travel of the real on-time
+    record_move('yaw', direction, on_time)
     
 
 #====================================================================================================
@@ -297,45 +997,100 @@ def yaw_move():          # moves yaw motor by variables (direction, move_time),
 
 def pitch_move():          # moves pitch motor by variables (direction, move_time), then re-defines pos_pitch
         
-    print('\n','\n','\n','[pitch_move() function has been called -- now moving PITCH] ...)','\n')
+    log.debug('[pitch_move() function has been called -- now moving PITCH] ...)')
+    check_stop()
     
     global move_time
     global direction
     global pos_pitch
        
-    pwm_pitch.ChangeDutyCycle(pitch_dc)             # change PMW (duty cycle)
-    print ('PWM duty cycle for Pitch motor is', pitch_dc, '%')
+    if use_speed_profiles:                          # changes the duty cycle on the way: timed segment by segment in move_both
+        move_both(0, move_time * direction)
+        return
+    if position_journal is not None:                # the intent is on disk before the motor starts
+        position_journal.intent(0, move_time * direction)
+    on_time = motor_on_time('pitch', direction, abs(move_time))   # corrected for dead time, coast and backlash
 
-    if (direction > 0):                             # make motor turn forward if direction = 1
-        GPIO.output(pitch_motor_pin1,GPIO.HIGH)     # motoRPin1 output HIGH level
-        GPIO.output(pitch_motor_pin2,GPIO.LOW)      # motoRPin2 output LOW level
-        print ('Turning pitch forward...')
-    elif (direction < 0):                           # make motor turn forward if direction = -1
-        GPIO.output(pitch_motor_pin1,GPIO.LOW)      # motoRPin1 output LOW level
-        GPIO.output(pitch_motor_pin2,GPIO.HIGH)     # motoRPin2 output HIGH level# make motor turn backward
-        print ('Turning pitch backward...')
-    else :                                          # stop motor if direction = 0
-        GPIO.output(pitch_motor_pin1,GPIO.LOW)      # motoRPin1 output LOW level
-        GPIO.output(pitch_motor_pin2,GPIO.LOW)      # motoRPin2 output LOW level
-        print ('Motor stopped...')
+    # motor_on sets duty cycle and polarity pins according to (direction); the pulse returns the MEASURED on-time
+    on_time = clock.pulse(lambda: motor_on('pitch'), lambda: motor_off('pitch'), on_time)
 
-    time.sleep(abs(move_time))                      # allows movement time
+    clock.sleep(settle_time('pitch'))               # lets the axis coast to a stop
 
-    GPIO.output(pitch_motor_pin1,GPIO.LOW)          # motoRPin1 output LOW level
-    GPIO.output(pitch_motor_pin2,GPIO.LOW)          # motoRPin2 output LOW level    
+    pos_pitch = pos_pitch + (motor_travel('pitch', direction, on_time) * direction)   # redefines stored position by adding the directional (+/-) travel of the real on-time
+    record_move('pitch', direction, on_time)
     
-    pwm_pitch.ChangeDutyCycle(0)                    # set duty cycle
+   
+#====================================================================================================
 
-    pos_pitch = pos_pitch + (move_time * direction) # redefines stored position by adding directional (+/-) movement time
+
+def move_both(yaw_time, pitch_time, segments=None):          # moves yaw and pitch AT THE SAME TIME by directional (+/-) motor times
     
-   
+    # NOTE: both motors are switched on together and each one is switched off when its own time is up,
+    #       so the move takes max(|yaw_time|, |pitch_time|) instead of the sum.
+    #       axis_moving tracks which axis is still running, and pos_yaw / pos_pitch are updated
+    #       the moment the corresponding axis stops, with the travel of its MEASURED on-time.
+    #       Each axis runs through its segments [(dc, seconds), ...] (see move_segments): one for a plain move,
+    #       ramp / cruise / approach with use_speed_profiles, every duty cycle change timed like a stop.
+    #       segments = {axis: [(dc, seconds), ...]} replaces move_segments() for that axis (track_rest drives at
+    #       computed duty cycles); the travel is counted from the measured segments either way.
+    
+    log.debug('[move_both() function has been called -- now moving YAW and PITCH together] ...)')
+    check_stop()
+    
+    global direction
+    global pos_yaw
+    global pos_pitch
+
+    if (position_journal is not None) and (yaw_time != 0 or pitch_time != 0):
+        position_journal.intent(yaw_time, pitch_time)   # the intent is on disk before the motors start
+    running = []                                    # [axis, direction, segments still to run, clock.ticks() of the last switch, measured segments]
+    for axis, axis_time in (('yaw', yaw_time), ('pitch', pitch_time)):
+        if (axis_time != 0):
+            direction = 1 if axis_time > 0 else -1
+            if (segments is not None) and (axis in segments):
+                axis_segments = list(segments[axis])
+            else:
+                axis_segments = move_segments(axis, direction, abs(axis_time))  # corrected for dead time, coast and backlash
+            if not axis_segments:                   # shorter than any possible move
+                axis_segments = [(yaw_dc if axis == 'yaw' else pitch_dc, 0.0)]
+            motor_on(axis, axis_segments[0][0])
+            running.append([axis, direction, axis_segments, clock.ticks(), []])
     
+    t_settled = clock.ticks()
+    while running:
+        axis_move = min(running, key=lambda axis_move: (axis_move[3] + axis_move[2][0][1], axis_move[0]))   # the next switch
+        axis, axis_direction, axis_segments, t_switch, measured = axis_move
+        clock.sleep_until(t_switch + axis_segments[0][1])   # allows movement time until the next switch (coarse sleep + spin)
+        t = clock.ticks()
+        measured.append((axis_segments[0][0], t - t_switch))    # the MEASURED time of the segment
+        del axis_segments[0]
+        if axis_segments:                           # the next duty cycle of a speed profile
+            motor_speed(axis, axis_segments[0][0])
+            axis_move[3] = t
+            continue
+        motor_off(axis)
+        running.remove(axis_move)
+        t_settled = max(t_settled, clock.ticks() + settle_time(axis))
+        travel = axis_direction * segments_travel(axis, axis_direction, measured)
+        if (axis == 'yaw'):
+            pos_yaw = pos_yaw + travel              # redefines stored position by adding directional (+/-) travel
+        else:
+            pos_pitch = pos_pitch + travel
+        record_move(axis, axis_direction, sum(seconds for (dc, seconds) in measured), max(dc for (dc, seconds) in measured))
+    clock.sleep_until(t_settled)                    # lets both axes coast to a stop
+
+
 #====================================================================================================
 
 
+def move_to(target_yaw, target_pitch):          # moves both axes concurrently to the given (pos_yaw, pos_pitch)
+    
+    move_both(target_yaw - pos_yaw, target_pitch - pos_pitch)
+
+
 def pitch_tilt_45():            # movement of pitch by 45°
     
-    print('\n','\n','\n','[pitch_tilt_45() function has been called -- now tilting pitch by ~ +45°] ...)','\n')
+    log.debug('[pitch_tilt_45() function has been called -- now tilting pitch by ~ +45°] ...)')
     
     global direction
     direction = 1
@@ -343,7 +1098,9 @@ def pitch_tilt_45():            # movement of pitch by 45°
     global move_time
     move_time= t_rev_pitch / 8
     
+    phase_begin('pitch_tilt_45')
     pitch_move() 
+    phase_end()
     
    
 #====================================================================================================
@@ -355,7 +1112,9 @@ def yaw_sample_120():          # sample voltages at 3 locations rotated by 120°
     global move_time
     move120_in_sec = round((t_rev_yaw / 3), 2)
     
-    print('\n','\n','\n','[yaw_sample() function has been called -- now sampling data at 3 positions offset by 120°] ...)','\n')
+    log.debug('[yaw_sample() function has been called -- now sampling data at 3 positions offset by 120°] ...)')
+    
+    phase_begin('yaw_sample_120')
         
     ### voltage at origin
     measure_volt()                      # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
@@ -364,7 +1123,7 @@ def yaw_sample_120():          # sample voltages at 3 locations rotated by 120°
     ### voltage at +120°
     direction = 1
     move_time = move120_in_sec
-    print('Moving to +120° yaw...')
+    log.debug('Moving to +120° yaw...')
     yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
     measure_volt()                      # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
     volt_at_120 = volt_generated        # store voltage 120° from yaw origin
@@ -372,105 +1131,416 @@ def yaw_sample_120():          # sample voltages at 3 locations rotated by 120°
     ### voltage at -120°
     direction = -1
     move_time = 2 * move120_in_sec
-    print('Moving to -120° yaw')
+    log.debug('Moving to -120° yaw')
     yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
     measure_volt()                      # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
     volt_at_240 = volt_generated        # store voltage 240° from yaw origin
     
     ### evaluating voltages
     if (volt_at_240 > volt_at_120) and (volt_at_240 > volt_at_ori) :    # if highest voltage measured at 240
-        print('starting to optimize at yaw position -120° from origin')
+        log.info('starting to optimize at yaw position -120° from origin')
     elif (volt_at_120 > volt_at_240) and (volt_at_120 > volt_at_ori) :  # if highest voltage measured at 120
         direction = 1
         move_time = 2 * move120_in_sec
         yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        print('starting to optimize at yaw position 120° from origin')
+        log.info('starting to optimize at yaw position 120° from origin')
     elif (volt_at_ori > volt_at_240) and (volt_at_ori > volt_at_120) :  # if highest voltage measured at origin
         direction = 1
         move_time = move120_in_sec
         yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        print('starting to optimize at yaw origin')
+        log.info('starting to optimize at yaw origin')
             # the following is in case 2 voltage measurements are equal
     elif (volt_at_ori > volt_at_240) :
         direction = 1
         move_time = move120_in_sec
         yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        print('starting to optimize at yaw origin')
+        log.info('starting to optimize at yaw origin')
     elif (volt_at_120 > volt_at_240) :
         direction = 1
         move_time = 2 * move120_in_sec
         yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        print('starting to optimize at yaw position 120° from origin')
+        log.info('starting to optimize at yaw position 120° from origin')
     else:
-        print('starting to optimize at yaw position -120° from origin')
+        log.info('starting to optimize at yaw position -120° from origin')
+    
+    phase_end()
 
 
 #====================================================================================================
 
 
-def yaw_adj():
+def yaw_sweep_360():          # rotates yaw once while sampling the ADC in the background, then drives to the brightest angle
     
-    print('\n','\n','\n','[yaw_adj() function has been called -- now beginning coarse and fine YAW optimization] ...)','\n')
+    log.debug('[yaw_sweep_360() function has been called -- now sweeping yaw through 360° while sampling] ...)')
     
     global direction
     global move_time
+    global sweep_profile
+    global use_speed_profiles
     
+    phase_begin('yaw_sweep_360')
     
-    ### YAW COARSE ADJUSTMENT LOOP
-    
-    print('commencing YAW optimization (first coarse, then fine)')
-        
-    coarse_or_fine = 'coarse'
+    samples = []                                    # (time of read, adc value) taken by the background sampler
+    def sample():
+        t, adc_value = clock.now(), adc.analogRead(0)
+        samples.append((t, adc_value))
+        if telemetry is not None:
+            telemetry.sample(t, adc_value)
     
+    pos_start = pos_yaw
     direction = 1
-    dir_t_0 = direction
-    dir_t_1 = 0.3                   # 0.3 is simply a dummy-value that cannot sum to 0
-    dir_t_2 = 0.3
-    dir_t_3 = 0.3
+    move_time = t_rev_yaw                           # one full revolution
+    lag = motion_model.lag('yaw', direction) if motion_model is not None else 0.0
+    profiles, use_speed_profiles = use_speed_profiles, False     # one constant duty cycle: 1 s of pos_yaw per second
     
-    measure_volt()                  # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
-    volt_t_0 = volt_generated       # t_0 is the most recent measurement
-       
-    while (coarse_or_fine == 'coarse'):
-        move_time = abs(adj_coarse_yaw)
-        yaw_move()                      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-        
-        measure_volt()                  # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
-        
-        # the following series passes the volt_generated value backward, t_0 being the most recent measurement
-        volt_t_1 = volt_t_0             # t_1 is the measurement from 1 round ago
-        volt_t_0 = volt_generated       # t_0 is the most recent measurement
+    t_on = clock.now()                              # the motor is switched on right after this point
+    sample()
+    sampler = clock.every(sweep_sample_interval, sample)   # reads the ADC while yaw_move() sleeps
+    yaw_move()                                      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+    sampler.cancel()
+    use_speed_profiles = profiles
+    
+    # tag every sample with its estimated position: the output starts turning lag seconds after switching on
+    # (dead time, + backlash after a reversal), at 1 s of pos_yaw per second, and stops after the travel counted for the move
+    travel = pos_yaw - pos_start
+    sweep_profile = [(pos_start + min(max(t - t_on - lag, 0.0), travel), value) for (t, value) in samples]
+    log.debug('the sweep captured %s samples, i.e. one every %s °', len(sweep_profile), round(360 / max(len(sweep_profile), 1), 1))
+    
+    # find the peak of the (circularly) smoothed profile
+    n = len(sweep_profile)
+    half = sweep_smoothing // 2
+    best_index, best_value = 0, -1
+    for i in range(n):
+        window = [sweep_profile[(i + k) % n][1] for k in range(-half, half + 1)]
+        value = sum(window) / len(window)
+        if (value > best_value):
+            best_index, best_value = i, value
+    peak_offset = sweep_profile[best_index][0] - pos_start      # position of the peak within the revolution
+    log.info('the brightest yaw position is %s ° into the sweep', round(peak_offset * 360 / t_rev_yaw, 1))
+    
+    # the sweep ended one revolution forward: drive back to the peak, taken within half a revolution of the start
+    # (no cable wrap added by the scan)
+    if (peak_offset > t_rev_yaw / 2):
+        peak_offset = peak_offset - t_rev_yaw
+    target = pos_start + peak_offset
+    direction = 1 if (target > pos_yaw) else -1
+    move_time = abs(target - pos_yaw)
+    yaw_move()                                      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+    log.info('starting to optimize at the peak of the sweep')
+    
+    phase_end()
 
-        if (volt_t_0 < volt_t_1):
-            direction = direction * -1  # inverse direction parameter
-            print('voltage in new yaw position is lower --> inversing yaw adjustment direction')
-        else :
-            print('voltage in new yaw position is higher --> maintaining yaw adjustment direction')
-        
-        # the following series passes the direction value backward, t_0 being the most recent directional assignment for the next movement
-        dir_t_3 = dir_t_2               # t_3 is the directional assignment from 3rd-to-last rotation
-        dir_t_2 = dir_t_1               # t_2 is the directional assignment from 2nd-to-last rotation
-        dir_t_1 = dir_t_0               # t_1 is the directional assignment from the last rotation
-        dir_t_0 = direction
 
-        if (dir_t_0 + dir_t_1 + dir_t_2 + dir_t_3 == 0):    # the pattern of the last 3 rotational directions (+1 or -1) plus the next one 
-                                                            # summing up to 0 is expected if the next move brings the SOS back to the maximum voltage yaw position
-            yaw_move()                  # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-            print('coarse YAW optimization found a rough maximum --> proceeding to fine adjustment')
-            coarse_or_fine = 'fine'
+#====================================================================================================
 
-  
-    ### YAW FINE ADJUSTMENT LOOP
 
-    print('commencing fine YAW optimization')
-        
-    direction = 1
-    dir_t_0 = direction
-    dir_t_1 = 0.3                   # 0.3 is simply a dummy-value that cannot sum to 0
-    dir_t_2 = 0.3
-    dir_t_3 = 0.3
+def yaw_scan():          # initial yaw search, as chosen by yaw_scan_mode
+    
+    if (yaw_scan_mode == 'sweep'):
+        yaw_sweep_360()
+    else:
+        yaw_sample_120()
+
+
+#====================================================================================================
+
+
+def apply_calibration():          # t_rev of both axes at their duty cycles from the calibration, then every conversion derived from it
+
+    # NOTE: positions are kept in motor seconds at the duty cycle of the axis, i.e. what the motors really ran:
+    #       they stay as they are, only their conversion into degrees changes
+
+    global t_rev_yaw, t_rev_pitch
+    global adj_coarse_yaw, adj_coarse_pitch, adj_fine_yaw, adj_fine_pitch
+
+    if calibration is None:
+        return
+    t_rev_yaw = calibration.t_rev('yaw', yaw_dc, t_rev_yaw, yaw_dc)
+    t_rev_pitch = calibration.t_rev('pitch', pitch_dc, t_rev_pitch, pitch_dc)
+
+    adj_coarse_yaw   = (degree_coarse_yaw   * (t_rev_yaw / 360))     # move120 (yaw_sample_120), pitch_tilt_45 and all
+    adj_coarse_pitch = (degree_coarse_pitch * (t_rev_pitch / 360))   # degree <--> time conversions read t_rev_* directly
+    adj_fine_yaw     = (degree_fine_yaw     * (t_rev_yaw / 360))
+    adj_fine_pitch   = (degree_fine_pitch   * (t_rev_pitch / 360))
+    log.info('revolution times: yaw %s s at %s %% duty cycle, pitch %s s at %s %% duty cycle',
+             round(t_rev_yaw, 3), yaw_dc, round(t_rev_pitch, 3), pitch_dc)
+
+
+#====================================================================================================
+
+
+def calibrate_axis(axis, dc=None):          # measures t_rev of one axis at duty cycle dc (default: its own) from the periodicity of the voltage
+
+    # NOTE: the axis turns calibration_revolutions times forward, then just as long backward, while the ADC is read in
+    #       the background; the voltage repeats once per revolution, and SOScalibrate.revolution_time() finds that
+    #       period in each direction. Combining both (two_way_revolution_time) removes the drift of the sun.
+    #       Both turns run equally long at the same duty cycle, so the axis ends where it started, whatever t_rev is.
+
+    log.debug('[calibrate_axis() function has been called -- now calibrating the revolution time of %s] ...)', axis)
+
+    global yaw_dc, pitch_dc
+    global direction
+    global move_time
+    global use_speed_profiles
+
+    axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+    t_rev_axis = t_rev_yaw if axis == 'yaw' else t_rev_pitch
+    if dc is None:
+        dc = axis_dc
+    t_guess = calibration.t_rev(axis, dc, t_rev_axis, axis_dc)
+
+    phase_begin('calibrate_' + axis)
+
+    if (axis == 'yaw'):
+        yaw_dc = dc
+    else:
+        pitch_dc = dc
+    profiles, use_speed_profiles = use_speed_profiles, False     # one constant duty cycle all the way round
+    if (dc == axis_dc) or (dc in calibration.entries[axis]):
+        search = (0.7, 1.4)
+        turn_time = calibration_revolutions * t_guess
+    else:                                           # long enough for calibration_revolutions even at the slowest speed searched
+        search = calibration_search_new
+        turn_time = calibration_revolutions * t_guess * search[1]
+    periods = []                                    # (t_rev, correlation) or None, forward and backward
+    for turn_direction in (1, -1):
+        samples = []                                # (time since motor on, adc value) taken by the background sampler
+        def sample():
+            t, adc_value = clock.now(), adc.analogRead(0)
+            samples.append((t - t_on, adc_value))
+            if telemetry is not None:
+                telemetry.sample(t, adc_value)
+
+        direction = turn_direction
+        move_time = turn_time
+        t_on = clock.now()                          # the motor is switched on right after this point
+        sample()
+        sampler = clock.every(t_guess / calibration_samples_per_rev, sample)    # reads the ADC while the axis turns
+        if (axis == 'yaw'):
+            yaw_move()
+        else:
+            pitch_move()
+        sampler.cancel()
+        samples = [(t, value) for (t, value) in samples if t <= turn_time]     # only while the motor was on
+        periods.append(SOScalibrate.revolution_time([t for (t, value) in samples], [value for (t, value) in samples],
+                                                    t_guess, search, min_correlation=calibration_min_correlation))
+    use_speed_profiles = profiles
+    if (axis == 'yaw'):
+        yaw_dc = axis_dc
+    else:
+        pitch_dc = axis_dc
+
+    if None in periods:
+        log.warning('no clear periodicity in the voltage while %s turned (clouds? night?) --> %s calibration rejected', axis, axis)
+        result = None
+    else:
+        (t_forward, r_forward), (t_backward, r_backward) = periods
+        result = (SOScalibrate.two_way_revolution_time(t_forward, t_backward), min(r_forward, r_backward))
+        t_measured, r = result
+        calibration.set(axis, dc, round(t_measured, 4), r, clock.datetime().isoformat(timespec='seconds'))
+        calibration.save(calibration_file)
+        log.info('%s turns once in %s s at %s %% duty cycle (forward %s s, backward %s s, expected %s s, autocorrelation %s)',
+                 axis, round(t_measured, 3), dc, round(t_forward, 3), round(t_backward, 3), round(t_guess, 3), round(r, 3))
+    apply_calibration()                             # new t_rev (the position, in motor seconds, stays)
+
+    phase_end()
+    return result
+
+
+#====================================================================================================
+
+
+def fit_motion_model(axis):          # fits dead time, coast and backlash of one axis from the voltage traces of short pulses
+
+    # NOTE: the pulses switch the motor directly (not through yaw_move / pitch_move), so their on-time is exact.
+    #       Each one is counted (and journaled) with the travel of the current motion model; once the new model is
+    #       fitted, the pulses are counted again with it. A single trace is far too coarse (8-bit ADC) to count its
+    #       own pulse: the fit of each pulse only goes into the model, and only if its r² reaches motion_min_r2.
+
+    log.debug('[fit_motion_model() function has been called -- now pulsing %s to fit its motion model] ...)', axis)
+
+    global direction
+    global pos_yaw, pos_pitch
+    global motion_model
+
+    if motion_model is None:
+        motion_model = SOSmotion.MotionModel()
+    t_rev_axis = t_rev_yaw if axis == 'yaw' else t_rev_pitch
+    pulse = motion_pulse_deg * t_rev_axis / 360
+    slope = motion_slope_deg * t_rev_axis / 360
+
+    phase_begin('motion_fit_' + axis)
+    if (axis == 'yaw'):                             # onto the slope of the voltage profile
+        move_both(slope, 0)
+    else:
+        move_both(0, slope)
+
+    samples = []                                    # (time of read, adc value) taken by the background sampler
+    def sample():
+        t, adc_value = clock.now(), adc.analogRead(0)
+        samples.append((t, adc_value))
+        if telemetry is not None:
+            telemetry.sample(t, adc_value)
+
+    pulses = []                                     # (reversal, lag, coast time, r²) of every usable pulse
+    counted = []                                    # (direction, measured on-time, travel counted) of every pulse
+    first_direction = last_direction = motion_model.last_direction[axis]
+    sampler = clock.every(motion_sample_interval, sample)
+    for i in range(motion_pulses):
+        direction = 1 if (i // 2) % 2 == 0 else -1 # + + - - + + - -
+        del samples[:]
+        clock.sleep(motion_settle_sec / 2)          # reads before switching on
+        if position_journal is not None:            # the travel the position will be moved by
+            travel = direction * motion_model.travel(axis, direction, pulse)
+            position_journal.intent(travel if axis == 'yaw' else 0, travel if axis == 'pitch' else 0)
+        t_on = clock.now()
+        pulse_on = clock.pulse(lambda: motor_on(axis), lambda: motor_off(axis), pulse)     # the measured on-time
+        clock.sleep(motion_settle_sec)              # reads while the axis coasts to a stop
+        
+        fit = SOSmotion.fit_pulse([t - t_on for (t, value) in samples], [value for (t, value) in samples], pulse_on,
+                                  min_span=motion_min_span)
+        reversal = (direction != last_direction)
+        if (fit is not None) and last_direction:    # the first pulse may or may not be a reversal
+            pulses.append((reversal, fit[0], fit[1], fit[2]))
+            log.debug('%s pulse %s (%s) : lag %s s, coast %s s, r² %s', axis, i, 'reversal' if reversal else 'same direction',
+                      round(fit[0], 3), round(fit[1], 3), round(fit[2], 3))
+        travel = motion_model.travel(axis, direction, pulse_on)
+        counted.append((direction, pulse_on, travel))
+        motion_model.moved(axis, direction)
+        last_direction = direction
+        if (axis == 'yaw'):
+            pos_yaw = pos_yaw + direction * travel
+        else:
+            pos_pitch = pos_pitch + direction * travel
+        record_move(axis, direction, pulse_on)
+        phase_iteration()
+    sampler.cancel()
+
+    parameters = SOSmotion.fit_model(pulses, motion_min_r2)
+    if parameters is None:
+        log.warning('the voltage did not follow the %s pulses well enough (clouds? night?) --> %s motion model not changed', axis, axis)
+    else:
+        motion_model.parameters[axis] = parameters
+        motion_model.save(motion_model_file)
+        log.info('%s motion model: dead time %s s, coast %s s, backlash %s s', axis,
+                 round(parameters['dead_time'], 3), round(parameters['coast'], 3), round(parameters['backlash'], 3))
+        
+        # the pulses once more, with the new model
+        motion_model.last_direction[axis] = first_direction
+        correction = 0.0
+        for pulse_direction, pulse_on, travel in counted:
+            correction = correction + pulse_direction * (motion_model.travel(axis, pulse_direction, pulse_on) - travel)
+            motion_model.moved(axis, pulse_direction)
+        if (axis == 'yaw'):
+            pos_yaw = pos_yaw + correction
+        else:
+            pos_pitch = pos_pitch + correction
+        if position_journal is not None:
+            position_journal.snapshot(pos_yaw, pos_pitch)
+
+    if (axis == 'yaw'):                             # back off the slope
+        move_both(-slope, 0)
+    else:
+        move_both(0, -slope)
+    phase_end()
+    return parameters
+
+
+#====================================================================================================
+
+
+def calibrate():          # calibrates pitch, then yaw (with the cell tilted, so yaw changes the voltage), then returns to the start
+
+    # NOTE: with use_speed_profiles each axis is also calibrated at the cruise and approach duty cycles of its
+    #       profile, which turns the calibration table into the speed-vs-duty-cycle curve the profiles run on
+
+    start_yaw, start_pitch = pos_yaw, pos_pitch
+
+    for axis in ('pitch', 'yaw'):
+        if (axis == 'yaw'):
+            move_to(pos_yaw, pos_pitch - (pos_pitch % t_rev_pitch) + t_rev_pitch / 8)     # 45° tilt within the current revolution
+        calibrate_axis(axis)
+        axis_dc = yaw_dc if axis == 'yaw' else pitch_dc
+        if use_speed_profiles and (axis in speed_profiles):
+            for dc in sorted(set((speed_profiles[axis]['cruise_dc'], speed_profiles[axis]['approach_dc'])) - set((axis_dc,))):
+                calibrate_axis(axis, dc)
+    move_to(start_yaw, start_pitch)
+
+
+#====================================================================================================
+
+
+def yaw_adj():
+    
+    log.debug('[yaw_adj() function has been called -- now beginning coarse and fine YAW optimization] ...)')
+    
+    global direction
+    global move_time
+    
+    
+    ### YAW COARSE ADJUSTMENT LOOP
+    
+    log.debug('commencing YAW optimization (first coarse, then fine)')
+        
+    phase_begin('yaw_coarse')
+    
+    coarse_or_fine = 'coarse'
+    
+    direction = 1
+    dir_t_0 = direction
+    dir_t_1 = 0.3                   # 0.3 is simply a dummy-value that cannot sum to 0
+    dir_t_2 = 0.3
+    dir_t_3 = 0.3
+    
+    measure_volt()                  # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
+    volt_t_0 = volt_generated       # t_0 is the most recent measurement
+       
+    while (coarse_or_fine == 'coarse'):
+        phase_iteration()
+        move_time = abs(adj_coarse_yaw)
+        yaw_move()                      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+        
+        measure_volt()                  # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
+        
+        # the following series passes the volt_generated value backward, t_0 being the most recent measurement
+        volt_t_1 = volt_t_0             # t_1 is the measurement from 1 round ago
+        volt_t_0 = volt_generated       # t_0 is the most recent measurement
+
+        if (volt_t_0 < volt_t_1):
+            direction = direction * -1  # inverse direction parameter
+            log.debug('voltage in new yaw position is lower --> inversing yaw adjustment direction')
+        else :
+            log.debug('voltage in new yaw position is higher --> maintaining yaw adjustment direction')
+        
+        # the following series passes the direction value backward, t_0 being the most recent directional assignment for the next movement
+        dir_t_3 = dir_t_2               # t_3 is the directional assignment from 3rd-to-last rotation
+        dir_t_2 = dir_t_1               # t_2 is the directional assignment from 2nd-to-last rotation
+        dir_t_1 = dir_t_0               # t_1 is the directional assignment from the last rotation
+        dir_t_0 = direction
+
+        if (dir_t_0 + dir_t_1 + dir_t_2 + dir_t_3 == 0):    # the pattern of the last 3 rotational directions (+1 or -1) plus the next one 
+                                                            # summing up to 0 is expected if the next move brings the SOS back to the maximum voltage yaw position
+            yaw_move()                  # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+            log.info('coarse YAW optimization found a rough maximum --> proceeding to fine adjustment')
+            coarse_or_fine = 'fine'
+
+  
+    phase_end()
+    
+    ### YAW FINE ADJUSTMENT LOOP
+
+    log.debug('commencing fine YAW optimization')
+    
+    phase_begin('yaw_fine')
+        
+    direction = 1
+    dir_t_0 = direction
+    dir_t_1 = 0.3                   # 0.3 is simply a dummy-value that cannot sum to 0
+    dir_t_2 = 0.3
+    dir_t_3 = 0.3
     
     while coarse_or_fine == 'fine':
+        phase_iteration()
         move_time = abs(adj_fine_yaw)
         yaw_move()                      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
         
@@ -482,9 +1552,9 @@ def yaw_adj():
 
         if (volt_t_0 < volt_t_1):
             direction = direction * -1  # inverse direction parameter
-            print('voltage in new yaw position is lower --> inversing yaw adjustment direction')
+            log.debug('voltage in new yaw position is lower --> inversing yaw adjustment direction')
         else:
-            print('voltage in new yaw position is higher --> maintaining yaw adjustment direction')
+            log.debug('voltage in new yaw position is higher --> maintaining yaw adjustment direction')
 
         # the following series passes the direction value backward, t_0 being the most recent directional assignment for the next movement
         dir_t_3 = dir_t_2               # t_3 is the directional assignment from 3rd-to-last rotation
@@ -495,8 +1565,10 @@ def yaw_adj():
         if (dir_t_0 + dir_t_1 + dir_t_2 + dir_t_3 == 0):    # the pattern of the last 3 rotational directions (+1 or -1) plus the next one 
                                                             # summing to 0 is expected if the next move brings the SOS back to the maximum voltage yaw position
             yaw_move()                  # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
-            print('fine YAW rotation found a maximum --> proceeding to pitch adjustment')
+            log.info('fine YAW rotation found a maximum --> proceeding to pitch adjustment')
             coarse_or_fine = 'none'
+    
+    phase_end()
             
 
 #====================================================================================================
@@ -504,7 +1576,7 @@ def yaw_adj():
 
 def pitch_adj():
     
-    print('\n','\n','\n','[pitch_adj() function has been called -- now beginning coarse and fine PITCH optimization] ...)','\n')
+    log.debug('[pitch_adj() function has been called -- now beginning coarse and fine PITCH optimization] ...)')
     
     global direction
     global move_time
@@ -512,8 +1584,10 @@ def pitch_adj():
     
     ### PITCH COARSE ADJUSTMENT LOOP
     
-    print('commencing YAW optimization (first coarse, then fine)')
+    log.debug('commencing YAW optimization (first coarse, then fine)')
         
+    phase_begin('pitch_coarse')
+    
     coarse_or_fine = 'coarse'
     
     direction = 1
@@ -526,6 +1600,7 @@ def pitch_adj():
     volt_t_0 = volt_generated       # t_0 is the most recent measurement
        
     while (coarse_or_fine == 'coarse'):
+        phase_iteration()
         move_time = abs(adj_coarse_pitch)
         pitch_move()                      # moves pitch motor by variables (direction, move_time), then re-defines global pos_pitch
         
@@ -537,9 +1612,9 @@ def pitch_adj():
 
         if (volt_t_0 < volt_t_1):
             direction = direction * -1  # inverse direction parameter
-            print('voltage in new pitch position is lower --> inversing pitch adjustment direction')
+            log.debug('voltage in new pitch position is lower --> inversing pitch adjustment direction')
         else :
-            print('voltage in new pitch position is higher --> maintaining pitch adjustment direction')
+            log.debug('voltage in new pitch position is higher --> maintaining pitch adjustment direction')
         
         # the following series passes the direction value backward, t_0 being the most recent directional assignment for the next movement
         dir_t_3 = dir_t_2               # t_3 is the directional assignment from 3rd-to-last rotation
@@ -550,13 +1625,17 @@ def pitch_adj():
         if (dir_t_0 + dir_t_1 + dir_t_2 + dir_t_3 == 0):    # the pattern of the last 3 rotational directions (+1 or -1) plus the next one 
                                                             # summing up to 0 is expected if the next move brings the SOS back to the maximum voltage yaw position
             pitch_move()                  # moves pitch motor by variables (direction, move_time), then re-defines global pos_pitch
-            print('coarse PITCH optimization found a rough maximum --> proceeding to fine adjustment')
+            log.info('coarse PITCH optimization found a rough maximum --> proceeding to fine adjustment')
             coarse_or_fine = 'fine'
 
   
-    ### YAW FINE ADJUSTMENT LOOP
+    phase_end()
+    
+    ### PITCH FINE ADJUSTMENT LOOP
 
-    print('commencing fine PITCH optimization')
+    log.debug('commencing fine PITCH optimization')
+    
+    phase_begin('pitch_fine')
         
     direction = 1
     dir_t_0 = direction
@@ -565,6 +1644,7 @@ def pitch_adj():
     dir_t_3 = 0.3
     
     while coarse_or_fine == 'fine':
+        phase_iteration()
         move_time = abs(adj_fine_pitch)
         pitch_move()                      # moves pitchyaw motor by variables (direction, move_time), then re-defines global pos_pitch
         
@@ -576,9 +1656,9 @@ def pitch_adj():
 
         if (volt_t_0 < volt_t_1):
             direction = direction * -1  # inverse direction parameter
-            print('voltage in new pitch position is lower --> inversing pitch adjustment direction')
+            log.debug('voltage in new pitch position is lower --> inversing pitch adjustment direction')
         else:
-            print('voltage in new pitch position is higher --> maintaining pitch adjustment direction')
+            log.debug('voltage in new pitch position is higher --> maintaining pitch adjustment direction')
 
         # the following series passes the direction value backward, t_0 being the most recent directional assignment for the next movement
         dir_t_3 = dir_t_2               # t_3 is the directional assignment from 3rd-to-last rotation
@@ -589,54 +1669,418 @@ def pitch_adj():
         if (dir_t_0 + dir_t_1 + dir_t_2 + dir_t_3 == 0):    # the pattern of the last 3 rotational directions (+1 or -1) plus the next one 
                                                             # summing to 0 is expected if the next move brings the SOS back to the maximum voltage yaw position
             pitch_move()                  # moves pitch motor by variables (direction, move_time), then re-defines global pitch
-            print('fine pitch rotation found a maximum --> YAW and PITCH are now OPTIMIZED')
+            log.info('fine pitch rotation found a maximum --> YAW and PITCH are now OPTIMIZED')
             coarse_or_fine = 'none'
+    
+    phase_end()
             
 
 #====================================================================================================
 
 
+def move_axis_to(axis, target):          # moves one axis ('yaw' or 'pitch') to the given position (in motor time)
+    
+    global direction
+    global move_time
+    
+    if (axis == 'yaw'):
+        distance = target - pos_yaw
+    else:
+        distance = target - pos_pitch
+    if (distance == 0):
+        return
+    direction = 1 if distance > 0 else -1
+    move_time = abs(distance)
+    if (axis == 'yaw'):
+        yaw_move()                          # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
+    else:
+        pitch_move()                        # moves pitch motor by variables (direction, move_time), then re-defines global pos_pitch
+
+
+#====================================================================================================
+
+
+def line_search(axis, step=None, tolerance=None):          # maximizes the voltage along one axis by a bracketed golden-section search with parabolic steps
+    
+    # NOTE: 1) BRACKET: starting from the current position, step by the coarse adjustment (adj_coarse_*) uphill,
+    #          growing each step by line_search_growth, until the voltage drops again
+    #          --> three positions (a, b, c) with b brighter than both a and c
+    #       2) SHRINK: probe a new position inside the bracket, either at the vertex of the parabola through
+    #          a, b and c (Brent-style), or, if that is not useful, at the golden section of the larger half
+    #          --> repeat until the bracket is no wider than the fine adjustment (adj_fine_*)
+    #       3) drive to the brightest position measured
+
+    log.debug('[line_search() function has been called -- now optimizing %s by line search] ...)', axis.upper())
+    
+    # the initial bracket step defaults to the coarse adjustment, the final bracket width to the fine adjustment
+    if (axis == 'yaw'):
+        default_step, default_tolerance, max_span = adj_coarse_yaw, adj_fine_yaw, t_rev_yaw / 2
+    else:
+        default_step, default_tolerance, max_span = adj_coarse_pitch, adj_fine_pitch, t_rev_pitch / 2
+    if (step is None):
+        step = default_step
+    if (tolerance is None):
+        tolerance = default_tolerance
+    
+    phase_begin(axis + '_line_search')
+    
+    probes = {}                                     # position --> measured voltage
+    def volt_at(x):
+        phase_iteration()
+        move_axis_to(axis, x)
+        measure_volt()                              # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
+        probes[x] = volt_generated
+        return volt_generated
+    
+    ### BRACKET
+    a = pos_yaw if axis == 'yaw' else pos_pitch
+    fa = volt_at(a)
+    b = a + step
+    fb = volt_at(b)
+    if (fb < fa):                                   # downhill --> search the other way, starting from the brighter point
+        a, b, fa, fb = b, a, fb, fa
+    c = b + line_search_growth * (b - a)
+    fc = volt_at(c)
+    while (fc > fb) and (abs(c - a) < max_span):    # still climbing --> move the bracket on
+        a, b, fa, fb = b, c, fb, fc
+        c = b + line_search_growth * (b - a)
+        fc = volt_at(c)
+    log.debug('%s maximum bracketed between %s and %s', axis, round(min(a, c), 2), round(max(a, c), 2))
+    
+    ### SHRINK
+    lo, hi = min(a, c), max(a, c)
+    while (hi - lo > tolerance) and (len(probes) < line_search_max_evals):
+        f_lo, f_hi = probes[lo], probes[hi]
+        # vertex of the parabola through (lo, b, hi)
+        numerator = (b - lo) ** 2 * (fb - f_hi) - (b - hi) ** 2 * (fb - f_lo)
+        denominator = (b - lo) * (fb - f_hi) - (b - hi) * (fb - f_lo)
+        u = None
+        if (denominator != 0):
+            u = b - 0.5 * numerator / denominator
+            if not (lo + tolerance / 4 < u < hi - tolerance / 4) or (abs(u - b) < tolerance / 4) or (u in probes):
+                u = None                            # vertex outside the bracket or too close to a known point
+        if (u is None):                             # golden section of the larger half of the bracket
+            if (hi - b > b - lo):
+                u = b + (2 - golden_ratio) * (hi - b)
+            else:
+                u = b - (2 - golden_ratio) * (b - lo)
+        fu = volt_at(u)
+        if (fu >= fb):                              # u is the new best point, b becomes a bracket end
+            if (u > b):
+                lo = b
+            else:
+                hi = b
+            b, fb = u, fu
+        else:                                       # u becomes a bracket end
+            if (u > b):
+                hi = u
+            else:
+                lo = u
+    
+    global volt_optimum
+    best = max(probes, key=probes.get)
+    move_axis_to(axis, best)
+    volt_optimum = probes[best]
+    log.info('%s line search found a maximum after %s measurements', axis.upper(), len(probes))
+    
+    phase_end()
+
+
+#====================================================================================================
+
+
+def yaw_line_search():          # line search alternative to yaw_adj()
+    line_search('yaw')
+
+
+def pitch_line_search():          # line search alternative to pitch_adj()
+    line_search('pitch')
+
+
+#====================================================================================================
+
+
+def joint_adj():          # optimizes yaw and pitch together with a Nelder-Mead simplex
+    
+    # NOTE: the simplex lives in DEGREES (yaw°, pitch°), so that both axes are weighted alike although
+    #       they turn at very different speeds. Every vertex is measured after moving both axes at once (move_to).
+    #       The start simplex is the current position plus one coarse step in yaw and one in pitch,
+    #       and the search ends once every vertex is within 2 x degree_fine (yaw° + pitch°) of the best one.
+
+    log.debug('[joint_adj() function has been called -- now optimizing YAW and PITCH together] ...)')
+    
+    phase_begin('joint_adj')
+    
+    evals = [0]
+    def volt_at(point):                             # point = (yaw°, pitch°)
+        move_to(point[0] * t_rev_yaw / 360, point[1] * t_rev_pitch / 360)
+        measure_volt()                              # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
+        evals[0] = evals[0] + 1
+        return volt_generated
+    
+    def combine(p, q, factor):                      # p + factor * (q - p)
+        return (p[0] + factor * (q[0] - p[0]), p[1] + factor * (q[1] - p[1]))
+    
+    start = (pos_yaw * 360 / t_rev_yaw, pos_pitch * 360 / t_rev_pitch)
+    simplex = [start, (start[0] + degree_coarse_yaw, start[1]), (start[0], start[1] + degree_coarse_pitch)]
+    simplex = [(volt_at(p), p) for p in simplex]
+    
+    while (evals[0] < joint_max_evals):
+        phase_iteration()
+        simplex.sort(key=lambda vertex: vertex[0], reverse=True)     # best vertex first, worst last
+        (f_best, best), (f_good, good), (f_worst, worst) = simplex
+        size = max(abs(best[0] - p[0]) + abs(best[1] - p[1]) for (_, p) in simplex[1:])
+        if (size <= 2 * degree_fine):
+            break
+        
+        centroid = combine(best, good, 0.5)
+        reflected = combine(centroid, worst, -1.0)
+        f_reflected = volt_at(reflected)
+        if (f_reflected > f_best):                  # reflection is the best so far --> try going further
+            expanded = combine(centroid, worst, -2.0)
+            f_expanded = volt_at(expanded)
+            if (f_expanded > f_reflected):
+                simplex[2] = (f_expanded, expanded)
+            else:
+                simplex[2] = (f_reflected, reflected)
+        elif (f_reflected > f_good):                # reflection is better than the second worst --> accept it
+            simplex[2] = (f_reflected, reflected)
+        else:                                       # contract towards the better of worst and reflected point
+            if (f_reflected > f_worst):
+                contracted = combine(centroid, reflected, 0.5)
+            else:
+                contracted = combine(centroid, worst, 0.5)
+            f_contracted = volt_at(contracted)
+            if (f_contracted > max(f_worst, f_reflected)):
+                simplex[2] = (f_contracted, contracted)
+            else:                                   # shrink everything towards the best vertex
+                simplex[1] = (volt_at(combine(best, good, 0.5)), combine(best, good, 0.5))
+                simplex[2] = (volt_at(combine(best, worst, 0.5)), combine(best, worst, 0.5))
+    
+    global volt_optimum
+    f_best, best = max(simplex, key=lambda vertex: vertex[0])
+    move_to(best[0] * t_rev_yaw / 360, best[1] * t_rev_pitch / 360)
+    volt_optimum = f_best
+    log.info('joint YAW and PITCH optimization found a maximum after %s measurements', evals[0])
+    
+    phase_end()
+
+
+#====================================================================================================
+
+
+def sun_target():          # predicted (pos_yaw, pos_pitch) at which the cell faces the sun, and the sun's elevation
+    
+    azimuth, elevation = SOSsolar.sun_position(clock.datetime(), latitude, longitude)
+    
+    # yaw: the equivalent angle (+/- n x 360°) closest to the current yaw position, so the SOS never winds up
+    yaw_deg = azimuth - yaw_origin_azimuth
+    pos_yaw_deg = pos_yaw * 360 / t_rev_yaw
+    yaw_deg = yaw_deg + 360 * round((pos_yaw_deg - yaw_deg) / 360)
+    # pitch: the cell normal has to point (90° - elevation) away from the zenith
+    pitch_deg = (90 - elevation) - pitch_origin_zenith
+    
+    return yaw_deg * t_rev_yaw / 360, pitch_deg * t_rev_pitch / 360, elevation
+
+
+#====================================================================================================
+
+
+def feedforward_position():          # moves yaw and pitch (concurrently) open-loop to where the ephemeris says the sun is
+    
+    log.debug('[feedforward_position() function has been called -- now pre-positioning from the solar ephemeris] ...)')
+    
+    target_yaw, target_pitch, elevation = sun_target()
+    if (elevation <= 0):
+        log.info('the sun is below the horizon (elevation %s °) --> not moving', round(elevation, 1))
+        return False
+    
+    log.info('the sun is expected at yaw %s °, pitch %s °', round(target_yaw * 360 / t_rev_yaw, 1), round(target_pitch * 360 / t_rev_pitch, 1))
+    phase_begin('preposition')
+    move_to(target_yaw, target_pitch)
+    phase_end()
+    return True
+
+
+#====================================================================================================
+
+
+def fine_search():          # short line search on both axes, bracketing with the fine adjustment only
+    
+    line_search('yaw', step=adj_fine_yaw)
+    line_search('pitch', step=adj_fine_pitch)
+
+
+#====================================================================================================
+
+
+def cached_position():          # moves yaw and pitch (concurrently) to the optimum predicted by the position cache
+    
+    if (position_cache is None):
+        return False
+    prediction = position_cache.predict(clock.datetime())
+    if (prediction is None):
+        log.info('the position cache has no optimum close to this time of day and season')
+        return False
+    
+    # yaw: the equivalent angle (+/- n x 360°) closest to the current yaw position, so the SOS never winds up
+    yaw_deg = SOSpredict.nearest_equivalent(prediction[0], pos_yaw * 360 / t_rev_yaw)
+    pitch_deg = prediction[1]
+    log.info('the position cache predicts the optimum at yaw %s °, pitch %s °', round(yaw_deg, 1), round(pitch_deg, 1))
+    phase_begin('preposition')
+    move_to(yaw_deg * t_rev_yaw / 360, pitch_deg * t_rev_pitch / 360)
+    phase_end()
+    return True
+
+
+#====================================================================================================
+
+
+def cache_optimum():          # records the current (converged) position in the position cache (in degrees) and saves it
+    
+    if (position_cache is None):
+        return
+    now = clock.datetime()
+    position_cache.record(now, pos_yaw * 360 / t_rev_yaw, pos_pitch * 360 / t_rev_pitch)
+    evicted = position_cache.evict(now)
+    if evicted:
+        log.debug('evicted %s stale entries from the position cache', evicted)
+    position_cache.save(position_cache_file)
+
+
+#====================================================================================================
+
+
+def preposition():          # moves to the best available prediction of the optimum, returns True if it did
+    
+    if cached_position():                           # learned from earlier optimizations at this time of day and season
+        return True
+    if feedforward:                                 # computed from the solar ephemeris
+        return feedforward_position()
+    return False
+
+
+#====================================================================================================
+
+
+def kalman_adj():          # pre-moves to the predicted optimum, then confirms it or searches a window sized by its uncertainty
+    
+    # returns None if the tracker cannot predict yet, 'confirmed' if one measurement confirmed the prediction,
+    # or 'searched' if a line search around the prediction was needed
+    
+    if (optimum_tracker is None) or not optimum_tracker.ready():
+        return None
+    
+    log.debug('[kalman_adj() function has been called -- now moving to the predicted optimum] ...)')
+    
+    phase_begin('kalman_adj')
+    
+    yaw_deg, pitch_deg, sigma_yaw, sigma_pitch = optimum_tracker.predict(clock.now())
+    log.info('the optimum is predicted at yaw %s +/- %s °, pitch %s +/- %s °', round(yaw_deg, 1), round(sigma_yaw, 1), round(pitch_deg, 1), round(sigma_pitch, 1))
+    move_to(yaw_deg * t_rev_yaw / 360, pitch_deg * t_rev_pitch / 360)
+    
+    if (max(sigma_yaw, sigma_pitch) <= kalman_confirm_sigma) and (volt_optimum > 0):
+        measure_volt()                              # measures value on adc and defines variables (avg_adc_value, volt_on_adc, global volt_generated)
+        if (volt_generated >= (1 - kalman_confirm_drop) * volt_optimum):
+            log.info('the prediction is confirmed --> no search needed')
+            phase_end()
+            return 'confirmed'
+        log.info('the voltage dropped below the last optimum --> searching around the prediction')
+    
+    # search window: a few standard deviations, but at least the fine and at most the coarse adjustment
+    step_yaw = min(max(kalman_window_sigmas * sigma_yaw * t_rev_yaw / 360, adj_fine_yaw), adj_coarse_yaw)
+    step_pitch = min(max(kalman_window_sigmas * sigma_pitch * t_rev_pitch / 360, adj_fine_pitch), adj_coarse_pitch)
+    line_search('yaw', step=step_yaw)
+    line_search('pitch', step=step_pitch)
+    phase_end()
+    return 'searched'
+
+
+#====================================================================================================
+
+
+def optimize():          # one full yaw and pitch optimization, using the strategy chosen by adj_strategy
+    
+    global volt_optimum
+    
+    check_stop()
+    t_start = clock.now()
+    measure_start = measure_count
+    motor_start = motor_on_total['yaw'] + motor_on_total['pitch']
+    runtime_state['optimizing'] = True
+    if instrument is not None:
+        instrument.start_cycle()
+    
+    outcome = 'error'                               # unless the optimization gets to its end
+    try:
+        result = kalman_adj()
+        if (result is None):
+            if preposition():                       # pre-positioned from a prediction --> only correct the residual error
+                fine_search()
+            elif (adj_strategy == 'linesearch'):
+                yaw_line_search()
+                pitch_line_search()
+            elif (adj_strategy == 'joint'):
+                joint_adj()
+            else:
+                yaw_adj()
+                pitch_adj()
+                volt_optimum = volt_generated       # the hill-climb ends next to its last measurement
+    
+        if (optimum_tracker is not None) and (result != 'confirmed'):     # a confirmed prediction adds no new information
+            optimum_tracker.update(clock.now(), pos_yaw * 360 / t_rev_yaw, pos_pitch * 360 / t_rev_pitch)
+    
+        optimum_history.append((clock.now(), pos_yaw * 360 / t_rev_yaw, pos_pitch * 360 / t_rev_pitch, volt_optimum))
+        del optimum_history[:-optimum_history_length]
+    
+        cache_optimum()
+    
+        record_optimization(result or 'search', clock.now() - t_start, measure_count - measure_start,
+                            motor_on_total['yaw'] + motor_on_total['pitch'] - motor_start)
+        if position_journal is not None:
+            position_journal.sync()                 # the moves of this cycle survive a power cut during the rest
+        outcome = result or 'search'
+    finally:                                        # also after an exception: no stale flag, no phase left open (see end_cycle)
+        runtime_state['optimizing'] = False
+        end_cycle(kind='optimize', outcome=outcome)
+
+
+#====================================================================================================
+
+
 def reset_pos():          # returns SOS to default origin
             
-    print('\n','\n','\n','[reset_pos() function has been called -- now resetting to origin] ...)','\n')
+    log.debug('[reset_pos() function has been called -- now resetting to origin] ...)')
     
     global direction
     global move_time
     global pos_yaw
     global pos_pitch
 
-    # return yaw to origin
+    # report which way each axis returns to origin
     if (pos_yaw > 0):
-        direction = -1
-        print('going backward to return SOS to yaw origin...')
+        log.debug('going backward to return SOS to yaw origin...')
     elif (pos_yaw < 0):
-        direction = 1
-        print('going forward to return SOS to yaw origin...')
+        log.debug('going forward to return SOS to yaw origin...')
     else :
-        print('SOS is already at yaw origin - no yaw movement required.')
+        log.debug('SOS is already at yaw origin - no yaw movement required.')
 
-    move_time = abs(pos_yaw)
-    
-    yaw_move()
-    
-    pos_yaw = 0
-    
-    
-    # return pitch to origin
     if (pos_pitch > 0):
-        direction = -1
-        print('going backward to return SOS to pitch origin...')
+        log.debug('going backward to return SOS to pitch origin...')
     elif (pos_pitch < 0):
-        direction = 1
-        print('going forward to return SOS to pitch origin...')
+        log.debug('going forward to return SOS to pitch origin...')
     else :
-        print('SOS is already at pitch origin - no pitch movement required.')
+        log.debug('SOS is already at pitch origin - no pitch movement required.')
 
-    move_time = abs(pos_pitch)
-    
-    pitch_move()
+    # return yaw and pitch to origin at the same time
+    phase_begin('reset_pos')
+    move_both(-pos_yaw, -pos_pitch)
+    phase_end()
     
+    pos_yaw = 0
     pos_pitch = 0
+    if position_journal is not None:            # the journal replays to the origin too, not to the residue of the move
+        position_journal.snapshot(pos_yaw, pos_pitch)
     
 
 #====================================================================================================
@@ -644,20 +2088,15 @@ def reset_pos():          # returns SOS to default origin
 
 def save_pos_val():          # save positional values to file
     
-    print('\n','\n','\n','[save_pos_val() function has been called -- now initiating saving positional values to file] ...)','\n')
+    log.debug('[save_pos_val() function has been called -- now initiating saving positional values to file] ...)')
     
     report_pos()
     
-    position_save_file = open("position_save.txt", "w")
-    position_save_file.write(
-        "pos_yaw = " + "\n"
-        + str(pos_yaw) + "\n"
-        + "pos_pitch = " + "\n"
-        + str(pos_pitch) + "\n")
-    position_save_file.close()
-    print('The current positional values (pos_yaw, pos_pitch) have been saved to file. /n'
-            '   Note: The save directory is the same as where the script is saved. /n'
-            '         The filename is "position_save.txt".')
+    if position_journal is not None:            # snapshot + fresh journal
+        position_journal.snapshot(pos_yaw, pos_pitch)
+    else:                                       # temp file + rename: a crash never leaves a half-written file
+        SOSjournal.write_snapshot(position_snapshot_file, pos_yaw, pos_pitch)
+    log.info('The current positional values (pos_yaw, pos_pitch) have been saved to "%s" (in the directory the script is run from)', position_snapshot_file)
 
     
 #====================================================================================================
@@ -665,22 +2104,18 @@ def save_pos_val():          # save positional values to file
 
 def get_saved_pos_val():           # get positional values saved to file
     
-    print('positional values BEFORE value retrieval:')
+    log.debug('positional values BEFORE value retrieval:')
     report_pos()
 
-    saved_positions = open('position_save.txt', 'r')
-    line1 = saved_positions.readline()
-    line2 = saved_positions.readline()
-    line3 = saved_positions.readline()
-    line4 = saved_positions.readline()
     global pos_yaw
-    pos_yaw = float(line2)
     global pos_pitch
-    pos_pitch = float(line4)
-    print('pos_yaw set to save yaw position: pos_yaw =', pos_yaw)
-    print('pos_pitch set to save pitch position: pos_pitch =', pos_pitch)
+    pos_yaw, pos_pitch = SOSjournal.read_snapshot(position_snapshot_file)
+    if position_journal is not None:            # the imported position is the new baseline of the journal
+        position_journal.snapshot(pos_yaw, pos_pitch)
+    log.debug('pos_yaw set to save yaw position: pos_yaw = %s', pos_yaw)
+    log.debug('pos_pitch set to save pitch position: pos_pitch = %s', pos_pitch)
     
-    print('positional values AFTER value retrieval:')
+    log.debug('positional values AFTER value retrieval:')
 
     report_pos()
 
@@ -691,11 +2126,18 @@ def get_saved_pos_val():           # get positional values saved to file
 
 def destroy():
         
-    print('\n','\n','\n','[destroy() function has been called -- now initiating clean-up] ...)','\n')
+    log.debug('[destroy() function has been called -- now initiating clean-up] ...)')
     
     save_pos_val()     
+    
+    if position_journal is not None:
+        position_journal.close()
+    if binary_log is not None:
+        binary_log.close()                      # writes the records still buffered in memory
+    if metrics_server is not None:
+        metrics_server.stop()
    
-    GPIOIO.output(yaw_motor_pin1,GPIO.LOW)		# motoRPin1 output LOW level
+    GPIO.output(yaw_motor_pin1,GPIO.LOW)		# motoRPin1 output LOW level
     GPIO.output(yaw_motor_pin2,GPIO.LOW)        # motoRPin2 output LOW level
     GPIO.output(pitch_motor_pin1,GPIO.LOW)		# motoRPin1 output LOW level
     GPIO.output(pitch_motor_pin2,GPIO.LOW)		# motoRPin2 output LOW level
@@ -704,80 +2146,534 @@ def destroy():
     pwm_pitch.stop()							# stopping pitch PWM
     GPIO.cleanup()								# Release all GPIO assignments
 
-    print('...\n','...\n','PROGRAM HAS ENDED!','\n','\n')
+    log.info('PROGRAM HAS ENDED!')
 
 
 #====================================================================================================
 
 
-def workflow():
+def next_rest_interval():          # seconds to rest before the next optimization (see rest_mode)
+    
+    if (rest_mode != 'adaptive') or (len(optimum_history) < 2):
+        return rest_interval_sec
+    
+    (t_0, yaw_0, pitch_0, volt_0), (t_1, yaw_1, pitch_1, volt_1) = optimum_history[0], optimum_history[-1]
+    elapsed = t_1 - t_0
+    if (elapsed <= 0):
+        return rest_interval_sec
+    
+    # angular drift rate of the optimum: from the Kalman tracker if there is one, else from the recent optima
+    if (optimum_tracker is not None) and optimum_tracker.ready():
+        yaw_rate, pitch_rate = optimum_tracker.velocity()
+    else:
+        yaw_rate, pitch_rate = (yaw_1 - yaw_0) / elapsed, (pitch_1 - pitch_0) / elapsed
+    # a change in yaw moves the cell normal less the closer the cell faces the zenith
+    yaw_rate = yaw_rate * abs(math.sin(math.radians(pitch_1 + pitch_origin_zenith)))
+    drift_rate = math.hypot(yaw_rate, pitch_rate)                  # degrees per second
+    
+    # relative voltage trend
+    volt_rate = abs(volt_1 - volt_0) / max(volt_0, volt_1, 1e-9) / elapsed   # fraction per second
+    
+    interval = rest_max_sec
+    if (drift_rate > 0):
+        interval = min(interval, drift_budget_deg / drift_rate)
+    if (volt_rate > 0):
+        interval = min(interval, volt_budget / volt_rate)
+    interval = max(rest_min_sec, interval)
+    log.info('optimum drifts %s °/min, voltage changes %s %%/min --> resting %s sec.', round(drift_rate * 60, 3), round(volt_rate * 6000, 2), round(interval))
+    return interval
+
+
+#====================================================================================================
+
+
+def rest_countdown(rest_sec=None):          # waits rest_sec (default rest_interval_sec) between optimizations, printing a countdown
+    
+    if (rest_sec is None):
+        rest_sec = rest_interval_sec
+    
+    log.info('(((interval between solar cell optimaization is %s minutes ...)))', round(rest_sec / 60, 2))
+    
+    for t in range (int(round(rest_sec)), 0, -1):
+        if (t>10):
+            if ( ( t % 10 ) == 0 ):
+                log.debug('time to next measurement = %s sec.', t)
+            clock.sleep(1)
+        else:
+            log.debug('time to next measurement = %s sec.', t)
+            clock.sleep(1)
+
+
+#====================================================================================================
+
+
+def monitor_volt():          # one monitor read of adc channel 0 (added to the telemetry), as the generated voltage
+    
+    adc_value = adc.analogRead(0)                   # reads the (0-255) value at adc channel 0
+    if telemetry is not None:
+        telemetry.sample(clock.now(), adc_value)
+    return adc_to_volt(adc_value)
+
+
+def monitor_rest(rest_sec):          # rests while a background monitor watches the voltage; returns early on a drop
+    
+    # NOTE: every monitor_interval_sec the monitor takes ONE read of adc channel 0 and compares it to the
+    #       voltage at the last optimum (volt_optimum). After monitor_confirm_reads consecutive reads more than
+    #       monitor_drop_fraction below it, the rest ends early. If the rest runs out without a drop, the SOS is
+    #       still on target and the optimization is skipped (the rest starts over), up to monitor_max_rest_sec.
+    
+    global skipped_cycles
+    
+    baseline = volt_optimum
+    if (baseline <= 0):                             # no optimum voltage known yet --> plain rest
+        rest_countdown(rest_sec)
+        return
+    
+    log.info('(((resting up to %s minutes, re-optimizing early if the voltage drops below %s V ...)))', round(rest_sec / 60, 2), round((1 - monitor_drop_fraction) * baseline, 2))
+    
+    triggered = threading.Event()
+    low_reads = [0]
+    def check():
+        volt = monitor_volt()
+        if (volt < (1 - monitor_drop_fraction) * baseline):
+            low_reads[0] = low_reads[0] + 1
+            if (low_reads[0] >= monitor_confirm_reads):
+                triggered.set()
+        else:
+            low_reads[0] = 0
+    
+    monitor = clock.every(monitor_interval_sec, check)
+    rested = 0
+    while True:
+        if clock.wait(triggered, rest_sec):
+            log.info('the voltage dropped by more than %s %% --> re-optimizing early', int(monitor_drop_fraction * 100))
+            break
+        rested = rested + rest_sec
+        if (rested + rest_sec > monitor_max_rest_sec):
+            break
+        skipped_cycles = skipped_cycles + 1
+        log.info('the SOS is still on target --> skipping this optimization')
+    monitor.cancel()
+
+
+#====================================================================================================
+
+
+def track_dc(axis, ratio):          # duty cycle at which one axis turns at (ratio) times its own speed, or None if no reliable one does
+    
+    if (ratio <= 0):
+        return None
+    low, high = track_min_dc, 100
+    if not (0 < speed_ratio(axis, low) <= ratio <= speed_ratio(axis, high)):
+        return None
+    for i in range(20):                             # bisection: the speed grows with the duty cycle
+        dc = (low + high) / 2
+        if (speed_ratio(axis, dc) < ratio):
+            low = dc
+        else:
+            high = dc
+    return high
+
+
+def tracking():          # True if the rest is spent following the predicted optimum (track_rest)
+    
+    return use_slow_tracking and (optimum_tracker is not None) and optimum_tracker.ready()
+
+
+def track_rest(rest_sec):          # follows the predicted optimum for rest_sec: slow continuous drive, or micro-pulses
+    
+    # NOTE: the rest is cut into slices (at most track_slice_sec). In every slice each axis either
+    #         - turns all the way through at track_dc(): the duty cycle whose speed reaches the prediction for
+    #           the end of the slice (when the optimum moves at least as fast as the axis at track_min_dc), or
+    #         - makes one micro-pulse to where the prediction will be in the middle of the slice, the slices being
+    #           as long as the optimum takes to move track_step_deg (a DC motor below its stall does not turn at all,
+    #           and the sun moves far slower than any reliable duty cycle: this is the usual case).
+    #       Both are counted from their measured segments by move_both(). No measurements are taken:
+    #       the next optimization (kalman_adj) confirms the prediction or corrects it with a short search.
+    
+    log.debug('[track_rest() function has been called -- now following the predicted optimum] ...)')
+    
+    yaw_rate, pitch_rate = optimum_tracker.velocity()  # °/s
+    log.info('(((following the optimum at yaw %s °/min, pitch %s °/min for %s minutes ...)))',
+             round(yaw_rate * 60, 3), round(pitch_rate * 60, 3), round(rest_sec / 60, 2))
+    
+    phase_begin('slow_tracking')
+    t_end = clock.now() + rest_sec
+    while (t_end - clock.now() > 1e-6):
+        t = clock.now()
+        slice_sec = min(track_slice_sec, t_end - t)
+        ratios = {}                                 # speed the optimum needs per axis (relative to the axis' own duty cycle)
+        for axis, rate, t_rev_axis in (('yaw', yaw_rate, t_rev_yaw), ('pitch', pitch_rate, t_rev_pitch)):
+            ratios[axis] = abs(rate) * t_rev_axis / 360
+            if (rate != 0) and (track_dc(axis, ratios[axis]) is None):
+                slice_sec = min(slice_sec, max(track_step_deg / abs(rate), 1.0))   # micro-pulses: one step per slice
+        
+        segments = {}
+        travel = {}
+        for axis, t_rev_axis, position in (('yaw', t_rev_yaw, pos_yaw), ('pitch', t_rev_pitch, pos_pitch)):
+            dc = track_dc(axis, ratios[axis])
+            target_deg = optimum_tracker.predict(t + (slice_sec if dc is not None else slice_sec / 2))[0 if axis == 'yaw' else 1]
+            travel[axis] = target_deg * t_rev_axis / 360 - position
+            if dc is not None:
+                dc = track_dc(axis, abs(travel[axis]) / slice_sec)     # closes the remaining error within the slice
+            if (dc is not None) and off_speed_allowed(axis, travel[axis]):
+                segments[axis] = [(dc, slice_sec)]
+        move_both(travel['yaw'], travel['pitch'], segments)
+        clock.wait(stop_requested, t + slice_sec - clock.now())    # the rest of the slice (ends early on Ctrl-C)
+        phase_iteration()
+    phase_end()
+
+
+#====================================================================================================
+
+
+def rest(rest_sec):          # rests between optimizations: tracking (use_slow_tracking), or with or without the background monitor (use_monitor)
+    
+    if tracking():                                  # the rest between the corrective optimizations is track_search_sec
+        track_rest(track_search_sec)
+    elif use_monitor:
+        monitor_rest(rest_sec)
+    else:
+        rest_countdown(rest_sec)
+
+
+#====================================================================================================
+
+
+def startup():          # first steps after setup(): optional position import, test measurements, initial positioning
+    
+    if (backend.name == 'pi') and not position_recovered:      # the simulated rig always starts at its origin, nothing to import;
+        import_pos_val_opt()                                    # a position recovered from the journal needs no import either,
+    elif (backend.name == 'pi') and (recovered_position_mode == 'ask'):     # but the operator may reject it
+        confirm_recovered_pos()
+
+    log.info('Taking 2 consecutive voltage test measurement sets (alter light conditions on solar cell (e.g. shade) to see if measurements change) ...')  
+    measure_volt()
+    clock.sleep(5)
+    measure_volt()
+    
+    if calibrate_on_startup:        # the revolution times of today, before any degrees are converted into motor time
+        calibrate()
+    
+    if not preposition():           # without a prediction: tilt pitch and search yaw from scratch
+        pitch_tilt_45()
+        yaw_scan()
+
+    if fit_motion_on_startup:       # next to the optimum now, tilted: the voltage follows both axes
+        fit_motion_model('pitch')
+        fit_motion_model('yaw')
+    
+    report_pos()
+    
+    end_cycle(kind='startup')       # setup() and the steps above as one cycle of the phase instrumentation
+
+
+#====================================================================================================
+
+
+def workflow(run_seconds=None):          # run_seconds = None runs forever, otherwise stops after that many (clock) seconds
 
     # available functions:
 
+	# start_logging()     # configures the leveled, queue-backed logging (SOSlogging.py)
+	# select_backend()    # chooses the hardware backend ('pi' or 'sim') before setup()
 	# setup()             # inial setup: checks for adc, configures GPIO pis, creates PWMs, DEFINES COMMON PARAMETERS
         # import_pos_val_opt()# allows for import of saved positional values from file
+	# confirm_recovered_pos() # shows the position recovered from the journal, lets the operator reject it (recovered_position_mode)
 	# save_pos_val()      # save positional values to file
 	# get_saved_pos_val() # get positional values saved to file
+	#                     # (setup() replays position_save.txt + position_journal.log of the last run, see SOSjournal.py)
 	# measure_volt()      # measures value on adc and defines variables (avg_adc_value, volt_on_adc, volt_generated)
+	# record_measurement()	      # adds a measure_volt() result to the telemetry and the binary log
+	# record_move()		      # adds a finished move to the telemetry and the binary log
+	# record_optimization()	      # adds a finished optimization to the metrics and the binary log
+	# metrics()		      # current metrics for the metrics server (SOSmetrics.py)
+	# phase_begin()		      # starts timing a phase (phase_end, phase_iteration, end_cycle: see SOSinstrument.py)
 	# report_pos()		      # reports currently recorded position
+	# check_stop()		      # ends the control code in the worker thread before its next move after Ctrl-C (async runtime)
 	# yaw_move()		      # moves yaw motor by variables (direction, move_time), then re-defines global pos_yaw
 	# pitch_move()	    	  # moves pitch motor by variables (direction, move_time), then re-defines pos_pitch
+	# move_both()		      # moves yaw and pitch at the same time by directional motor times
+	# move_to()		      # moves yaw and pitch at the same time to a target (pos_yaw, pos_pitch)
 	# pitch_tilt_45()		   # movement of pitch by 45°
+	# apply_calibration()	   # t_rev_yaw / t_rev_pitch (and adj_*) from the calibration at the current duty cycles
+	# calibrate_axis()	   # measures t_rev of one axis from the periodicity of the voltage while it turns
+	# calibrate()		   # calibrate_axis() for pitch and yaw, saved to calibration.json
+	# motor_on_time()	   # motor-ON time for a move, corrected for dead time, coast and backlash
+	# motor_travel()	   # real travel of an axis from its measured motor-ON time
+	# speed_ratio()	   # speed of an axis at a duty cycle, relative to its own, from the calibration
+	# off_speed_allowed()   # True while the travel at other duty cycles than the axis' own stays within profile_travel_limit_deg
+	# move_segments()	   # duty cycle segments of a move: a plain pulse, or ramp / cruise / approach (use_speed_profiles)
+	# segments_travel()	   # real travel of an axis from its measured segments
+	# fit_motion_model()	   # fits dead time, coast and backlash of one axis from pulse traces, saved to motion_model.json
 	# yaw_sample_120()	   # sample voltages at 3 locations rotated by 120°
+	# yaw_sweep_360()	   # samples while rotating 360° in yaw, then drives to the brightest angle
+	# yaw_scan()		      # yaw_sweep_360() or yaw_sample_120(), as chosen by yaw_scan_mode
 	# yaw_adj()		      # coarse and then fine adjust for YAW
 	# pitch_adj()		      # coarse and then fine adjust for PITCH
+	# line_search()		      # golden-section / parabolic line search along one axis (yaw_line_search, pitch_line_search)
+	# joint_adj()		      # Nelder-Mead optimization of yaw and pitch together
+	# sun_target()		      # (pos_yaw, pos_pitch) facing the sun according to the solar ephemeris
+	# feedforward_position()  # moves open-loop to the sun_target()
+	# fine_search()	      # short line search on both axes with fine steps
+	# cached_position()	      # moves to the optimum predicted by the learned position cache
+	# cache_optimum()	      # records the converged position in the position cache
+	# preposition()	      # cached_position() or feedforward_position(), whichever is available
+	# kalman_adj()		      # moves to the Kalman-predicted optimum, then confirms or searches around it
+	# optimize()		      # yaw and pitch optimization with the strategy chosen by adj_strategy
 	# reset_pos()		      # returns SOS to default origin
+	# next_rest_interval()    # rest before the next optimization, fixed or from the drift of the optimum (rest_mode)
+	# rest_countdown()	      # waits between optimizations
+	# monitor_volt()	      # one read of the voltage monitor
+	# monitor_rest()	      # waits between optimizations while watching for a voltage drop
+	# track_dc()		      # duty cycle that turns an axis at a given (slow) speed, if a reliable one does
+	# track_rest()	      # follows the predicted optimum between optimizations (slow drive or micro-pulses)
+	# rest()		      # track_rest(), rest_countdown() or monitor_rest(), as chosen by use_slow_tracking and use_monitor
 	# destroy()		      # report_pos, reset_pos, report_pos, GPIO cleanup, stop PWMs
+	# startup()		      # position import, test measurements and initial positioning after setup()
+	# run_workflow()	      # workflow() or the event-driven run_async(), as chosen by runtime
+	# simulate()		      # runs the workflow on the simulated rig for a number of simulated hours
 
     setup()
+    t_start = clock.now()
     
-    import_pos_val_opt()
+    startup()
+        
+    log.info('ENTERING ADJUSTMENT LOOP ...')
+    loop_count = 1
 
-    print('\n','Taking and printing 2 consecutive voltage test measurment sets \n'
-             '(alter light conditions on solar cell (e.g. shade) to see if measurements change) ...')  
-    measure_volt()
-    time.sleep(5)
-    measure_volt()
+    while (run_seconds is None) or (clock.now() - t_start < run_seconds):
+        log.debug('commencing adjustment loop iteration %s', loop_count)
+        
+        optimize()
     
+        loop_count = loop_count + 1
+
+        rest(next_rest_interval())
+
+    return loop_count - 1           # number of completed adjustment cycles
+
+
+#====================================================================================================
+
+
+def run_workflow(run_seconds=None):          # workflow() or run_async(), as chosen by runtime
     
-    pitch_tilt_45()
-        
-    yaw_sample_120()
+    if (runtime == 'async'):
+        return run_async(run_seconds)
+    return workflow(run_seconds)
 
-    report_pos()
-        
-    print('ENTERING ADJUSTMENT LOOP ...')
-    loop_count = 1
 
+#====================================================================================================
+
+
+def simulate(hours=24, sun=None, quiet=True, **rig):          # runs workflow() on the simulated rig for (hours) of simulated time
+    
+    # rig: further options of the simulated rig (SOSbackend.SimBackend), e.g. yaw_motion=(dead_time, coast_time, backlash)
+    
+    # default sun: crosses 180° of azimuth in 12 hours at a fixed elevation of 40°
+    if sun is None:
+        sun = SOSbackend.SunModel(azimuth=-90, elevation=40, azimuth_rate=180.0 / (12 * 3600))
+    select_backend(SOSbackend.make_backend('sim', sun=sun,
+                                           yaw_pins=(yaw_motor_pin1, yaw_motor_pin2, yaw_enable_pin),
+                                           pitch_pins=(pitch_motor_pin1, pitch_motor_pin2, pitch_enable_pin),
+                                           **dict(dict(t_rev_yaw=t_rev_yaw, t_rev_pitch=t_rev_pitch), **rig)))
+    
+    wall_start = time.perf_counter()
+    if quiet:                       # the log of a whole simulated day is not worth printing, only warnings and errors
+        with SOSlogging.silenced():
+            cycles = run_workflow(run_seconds=hours * 3600)
+    else:
+        cycles = run_workflow(run_seconds=hours * 3600)
+    if binary_log is not None:
+        binary_log.close()
+    wall_time = time.perf_counter() - wall_start
+    
+    log.info('simulated %s hours ( %s adjustment cycles ) in %s seconds of wall time', hours, cycles, round(wall_time, 3))
+    return cycles
+
+
+#====================================================================================================
+#==============================                                        ==============================
+#==============================        EVENT-DRIVEN (ASYNCIO) RUNTIME  ==============================
+#==============================                                        ==============================
+#====================================================================================================
+
+    # NOTE: async_workflow() does the same as workflow(), but as cooperating asyncio tasks on one event loop:
+    #         optimization_task()  --> optimize(), then rest until the next optimization is due (one timer, no 1 s ticks)
+    #         monitor_task()       --> the low-frequency voltage monitor (only with use_monitor), wakes the optimization
+    #                                  task early; its reads run like the moves (runtime_state['control'], run_blocking)
+    #         persistence_task()   --> saves the position (position_save.txt) every persist_interval_sec, between
+    #                                  optimization cycles (runtime_state['control'] is held for a whole optimize()),
+    #                                  so a snapshot may wait for the cycle to end; the position journal (SOSjournal.py)
+    #                                  records every move in the meantime
+    #         telemetry_task()     --> prints a one-line status every status_interval_sec
+    #       On the Pi, blocking work (motor moves, measurements) runs in a worker thread, so the other tasks keep
+    #       running while the motors move. On the simulated clock it runs directly on the loop, whose timers
+    #       jump forward with the simulated time. status() can be queried at any time (on the Pi also by SIGUSR1).
+    #       Ctrl-C sets stop_requested: the worker thread finishes the move it is in (positions stay exact) and
+    #       raises StopRequested at its next check_stop(). run_async() joins it before destroy() releases the GPIO.
+
+
+def status():          # snapshot of the tracker state (for status queries and telemetry)
+    
+    return {
+        'pos_yaw_deg': round(pos_yaw * 360 / t_rev_yaw, 2),
+        'pos_pitch_deg': round(pos_pitch * 360 / t_rev_pitch, 2),
+        'volt_generated': round(volt_generated, 3),
+        'volt_optimum': round(volt_optimum, 3),
+        'optimizing': runtime_state['optimizing'],
+        'cycles': runtime_state['cycles'],
+        'skipped_cycles': skipped_cycles,
+        'next_optimization_in_s': (round(runtime_state['next_optimization'] - clock.now(), 1)
+                                   if runtime_state['next_optimization'] is not None else None),
+    }
+
+
+def print_status():          # logs status() on one line
+    log.info('STATUS: %s', ', '.join('%s=%s' % item for item in status().items()))
+
+
+async def run_blocking(fn, *args):          # runs blocking control code without stalling the event loop (see clock.threaded)
+    
+    if clock.threaded:
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+    return fn(*args)
+
+
+async def optimization_task():
+    
+    global skipped_cycles
+    
     while True:
-        print('commencing adjustment loop iteration', loop_count)
+        async with runtime_state['control']:
+            await run_blocking(optimize)            # sets runtime_state['optimizing'] while it runs
+        runtime_state['cycles'] = runtime_state['cycles'] + 1
+        runtime_state['last_optimization'] = clock.now()
         
-        yaw_adj()
- 
-        pitch_adj()
+        if tracking():                              # follows the predicted optimum until the next corrective optimization
+            runtime_state['next_optimization'] = clock.now() + track_search_sec
+            async with runtime_state['control']:
+                await run_blocking(track_rest, track_search_sec)
+            runtime_state['next_optimization'] = None
+            await asyncio.sleep(0)                  # lets the other tasks run (on the simulated clock track_rest ran on the loop)
+            continue
+        rest_sec = next_rest_interval()
+        trigger = runtime_state['trigger']
+        trigger.clear()
+        rested = 0
+        while True:
+            runtime_state['next_optimization'] = clock.now() + rest_sec
+            try:
+                await asyncio.wait_for(trigger.wait(), rest_sec)
+                log.info('the voltage dropped by more than %s %% --> re-optimizing early', int(monitor_drop_fraction * 100))
+                break
+            except asyncio.TimeoutError:
+                pass
+            rested = rested + rest_sec
+            if not use_monitor or (rested + rest_sec > monitor_max_rest_sec):
+                break
+            skipped_cycles = skipped_cycles + 1
+            log.info('the SOS is still on target --> skipping this optimization')
+        runtime_state['next_optimization'] = None
+
+
+async def monitor_task():
     
-        loop_count = loop_count + 1
+    low_reads = 0
+    while True:
+        await asyncio.sleep(monitor_interval_sec)
+        if runtime_state['optimizing'] or (volt_optimum <= 0):
+            low_reads = 0
+            continue
+        async with runtime_state['control']:        # the ADC is shared with the control code in the executor
+            volt = await run_blocking(monitor_volt)
+        if (volt < (1 - monitor_drop_fraction) * volt_optimum):
+            low_reads = low_reads + 1
+            if (low_reads >= monitor_confirm_reads):
+                runtime_state['trigger'].set()
+        else:
+            low_reads = 0
 
-        print('\n','\n','(((interval between solar cell optimaization is',rest_interval_min,'minutes ...)))')
-        
-        for t in range (int(round(rest_interval_sec)), 0, -1):
-            if (t>10):
-                if ( ( t % 10 ) == 0 ):
-                    print('time to next measurement =',t,'sec.')
-                time.sleep(1)
-            else:
-                print('time to next measurement =',t,'sec.')
-                time.sleep(1)
 
+async def persistence_task():          # the position cache already saves itself after every optimization
+    
+    while True:
+        await asyncio.sleep(persist_interval_sec)
+        if (backend.name == 'pi'):      # the simulated rig has nothing to restore on the next start
+            async with runtime_state['control']:    # between optimization cycles (optimize() holds the lock for the whole
+                await run_blocking(save_pos_val)    # cycle): the journal already covers every move of a long cycle
 
-#==================================================================================================== 
-if __name__ == '__main__':     # Program entrance
-    print ('PROGRAM IS STARTING ... ')
+
+async def telemetry_task():
+    
+    while True:
+        await asyncio.sleep(status_interval_sec)
+        print_status()
+
+
+async def async_workflow(run_seconds=None):          # event-driven version of workflow()
+    
+    await run_blocking(setup)
+    await run_blocking(startup)
+    
+    runtime_state['trigger'] = asyncio.Event()
+    runtime_state['control'] = asyncio.Lock()       # held by the task running control code (moves) in the executor
+    runtime_state['cycles'] = 0
+    loop = asyncio.get_running_loop()
+    if clock.threaded:
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, print_status)      # 'kill -USR1 <pid>' prints the status
+        except (NotImplementedError, AttributeError):
+            pass
+    
+    log.info('ENTERING EVENT-DRIVEN ADJUSTMENT LOOP ...')
+    tasks = [asyncio.ensure_future(task()) for task in
+             (optimization_task, persistence_task, telemetry_task)]
+    if use_monitor:
+        tasks.append(asyncio.ensure_future(monitor_task()))
     try:
-        workflow()
-    except KeyboardInterrupt:  # Press ctrl-c to end the program.
-        destroy()
+        if (run_seconds is None):
+            await asyncio.gather(*tasks)
+        else:
+            await asyncio.sleep(run_seconds)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return runtime_state['cycles']
 
 
+def run_async(run_seconds=None):          # runs async_workflow() on an event loop of the backend's clock
+    
+    if backend is None:
+        select_backend()
+    stop_requested.clear()
+    loop = clock.new_event_loop()
+    executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='SOS-control')
+    loop.set_default_executor(executor)         # run_blocking() --> this executor, so it can be joined below
+    try:
+        return loop.run_until_complete(async_workflow(run_seconds))
+    except KeyboardInterrupt:
+        stop_requested.set()                    # the worker thread stops before its next move
+        tasks = asyncio.all_tasks(loop)
+        for task in tasks:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)   # no motor moves any more when destroy() runs
+        loop.close()
 
 
+#==================================================================================================== 
+if __name__ == '__main__':     # Program entrance
+    start_logging()
+    log.info('PROGRAM IS STARTING ...')
+    if (backend_name == 'sim'):     # SOS_BACKEND=sim --> simulate SOS_SIM_HOURS (default 24) hours and exit
+        simulate(hours=float(os.environ.get('SOS_SIM_HOURS', 24)))
+    else:
+        try:
+            run_workflow()
+        except KeyboardInterrupt:  # Press ctrl-c to end the program.
+            destroy()
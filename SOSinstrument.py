@@ -0,0 +1,166 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSinstrument.py
+# Description   :   Per-phase timing and counters of the SOS control loop
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: the control script marks phases (setup, measure_volt, yaw_coarse, yaw_fine, reset_pos, ...) with
+#        instrument.begin('name') ... instrument.end()        (or: with instrument.phase('name'): ...)
+#      and reports events while a phase is open:
+#        instrument.iteration()        --> one pass of an adjustment loop
+#        instrument.measurement()      --> one measure_volt()
+#        instrument.motor(seconds)     --> one finished move (motor-ON seconds of one axis)
+#      Phases can be nested (measure_volt inside yaw_coarse); an event counts for every open phase.
+#      Every finished phase adds one PhaseRecord (wall seconds, motor-ON seconds, iterations, measurements):
+#        - to the running totals of its name                            --> totals()
+#        - to a rolling window of the last `window` records of its name  --> histogram(), summary()
+#        - to the current cycle (start_cycle() ... end_cycle(), e.g. one optimize())  --> cycles, last_cycle()
+#      report() formats summary() as a table for the console.
+
+#####################################################################################################
+#####################################################################################################
+
+import collections
+import contextlib
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================          PHASE INSTRUMENTATION         ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+FIELDS = ('wall', 'motor', 'iterations', 'measurements')
+
+
+class PhaseRecord:          # one finished phase (or the sum of several)
+
+    __slots__ = ('name', 'start', 'wall', 'motor', 'iterations', 'measurements')
+
+    def __init__(self, name, start=0.0):
+        self.name = name
+        self.start = start                      # clock time at begin()
+        self.wall = 0.0                         # seconds from begin() to end()
+        self.motor = 0.0                        # motor-ON seconds (both axes added up)
+        self.iterations = 0
+        self.measurements = 0
+
+    def add(self, other):
+        self.wall = self.wall + other.wall
+        self.motor = self.motor + other.motor
+        self.iterations = self.iterations + other.iterations
+        self.measurements = self.measurements + other.measurements
+
+    def as_dict(self):
+        return {'wall': round(self.wall, 4), 'motor': round(self.motor, 4),
+                'iterations': self.iterations, 'measurements': self.measurements}
+
+
+class Instrumentation:          # phase records of the control loop, per cycle and as rolling windows
+
+    def __init__(self, now, window=200, cycle_history=100):
+        self.now = now                          # clock function (clock.now of the control script)
+        self.window = window                    # records per phase name kept for histograms and summaries
+        self.open = []                          # stack of running phases
+        self.recent = {}                        # name --> deque of the last `window` PhaseRecords
+        self.total = {}                         # name --> [calls, PhaseRecord with the sums]
+        self.cycle = {}                         # name --> PhaseRecord with the sums of the running cycle
+        self.cycle_start = now()
+        self.cycles = collections.deque(maxlen=cycle_history)   # summaries of the finished cycles, oldest first
+
+    def begin(self, name):
+        self.open.append(PhaseRecord(name, self.now()))
+
+    def end(self):          # closes the innermost phase and returns its record
+        record = self.open.pop()
+        record.wall = self.now() - record.start
+        name = record.name
+        if name not in self.recent:
+            self.recent[name] = collections.deque(maxlen=self.window)
+            self.total[name] = [0, PhaseRecord(name)]
+        self.recent[name].append(record)
+        total = self.total[name]
+        total[0] = total[0] + 1
+        total[1].add(record)
+        if name not in self.cycle:
+            self.cycle[name] = PhaseRecord(name)
+        self.cycle[name].add(record)
+        return record
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def iteration(self):
+        for record in self.open:
+            record.iterations = record.iterations + 1
+
+    def measurement(self):
+        for record in self.open:
+            record.measurements = record.measurements + 1
+
+    def motor(self, seconds):
+        for record in self.open:
+            record.motor = record.motor + seconds
+
+    def start_cycle(self):          # phases finished before this do not count for the new cycle
+        self.cycle = {}
+        self.cycle_start = self.now()
+
+    def end_cycle(self, **extra):          # closes the running cycle, returns its summary (extra items are added to it)
+        t = self.now()
+        summary = {'start': self.cycle_start, 'wall': round(t - self.cycle_start, 4),
+                   'phases': {name: record.as_dict() for name, record in self.cycle.items()}}
+        summary.update(extra)
+        self.cycles.append(summary)
+        self.cycle = {}
+        self.cycle_start = t
+        del self.open[:]                        # a phase left open by an exception does not leak into the next cycle
+        return summary
+
+    def last_cycle(self):
+        return self.cycles[-1] if self.cycles else None
+
+    def totals(self):          # name --> calls and summed fields since the start
+        return {name: dict(calls=calls, **record.as_dict()) for name, (calls, record) in self.total.items()}
+
+    def values(self, name, field='wall'):          # the field of the last `window` records of a phase
+        return [getattr(record, field) for record in self.recent.get(name, ())]
+
+    def histogram(self, name, field='wall', bins=10):          # [(low, high, count), ...] over the rolling window
+        values = self.values(name, field)
+        if not values:
+            return []
+        low, high = min(values), max(values)
+        width = (high - low) / bins or 1.0
+        counts = [0] * bins
+        for value in values:
+            counts[min(int((value - low) / width), bins - 1)] += 1
+        return [(low + i * width, low + (i + 1) * width, counts[i]) for i in range(bins)]
+
+    def summary(self):          # name --> mean and 95th percentile of every field over the rolling window
+        result = {}
+        for name in self.recent:
+            stats = {'calls': self.total[name][0]}
+            for field in FIELDS:
+                values = sorted(self.values(name, field))
+                stats[field + '_mean'] = sum(values) / len(values)
+                stats[field + '_p95'] = values[min(int(0.95 * len(values)), len(values) - 1)]
+            result[name] = stats
+        return result
+
+    def report(self):          # summary() as a console table
+        lines = ['%-18s%8s' % ('phase', 'calls') + ''.join('%20s%10s' % (field + ' mean', 'p95') for field in FIELDS)]
+        for name, stats in sorted(self.summary().items()):
+            lines.append('%-18s%8d' % (name, stats['calls'])
+                         + ''.join('%20.3f%10.3f' % (stats[field + '_mean'], stats[field + '_p95']) for field in FIELDS))
+        return '\n'.join(lines)
@@ -0,0 +1,212 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSjournal.py
+# Description   :   Crash-safe persistence of the SOS position (write-ahead move journal + atomic snapshots)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: the position of the SOS is only known by adding up motor times, so it has to survive a power cut,
+#      an exception or a kill at ANY moment, including in the middle of a move.
+#
+#      journal file (text, one record per line, appended and flushed before / after every move):
+#        S <seq> <pos_yaw> <pos_pitch>            baseline position (first line after every snapshot)
+#        I <seq> <yaw_time> <pitch_time>          intent: a move by these directional motor times is about to start
+#        D <seq> <axis> <pos_yaw> <pos_pitch>     done: <axis> of move <seq> has stopped, positions afterwards
+#
+#      snapshot file (position_save.txt, the same 4-line format save_pos_val() always wrote):
+#        written to a temp file, fsync'ed and renamed over the old file, so it is never half written.
+#        After a snapshot the journal is replaced (also atomically) by a single S line, followed by the intent
+#        of a move that is still running (its axes without a D record yet), so a crash after it still
+#        counts that move. done() never takes a periodic snapshot while an axis of the move is still moving.
+#
+#      recover(): baseline from the journal's S line (or the snapshot file), then every D record.
+#        `recovery` tells afterwards where the position came from (baseline, D records, unfinished moves).
+#        An axis whose intent has no D record was moving when the SOS went down: it is counted as the full
+#        move (the motor was already switched on, and most moves are far shorter than the restart) and
+#        a warning is logged.
+#
+#      Records are flushed to the OS at once (safe against crashes and kills). fsync (safe against power
+#      cuts) is batched: at most every fsync_interval seconds, and whenever sync() is called (end of a cycle).
+#      Every method holds the journal's (reentrant) lock: in the asyncio runtime save_pos_val() snapshots from
+#      another executor thread than the one moving the motors, and no record may go to a closed or replaced file.
+
+#####################################################################################################
+#####################################################################################################
+
+import logging
+import os
+import threading
+
+log = logging.getLogger('SOS')
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================          ATOMIC SNAPSHOTS              ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def atomic_write(path, text):          # temp file + fsync + rename (+ fsync of the directory)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as temp_file:
+        temp_file.write(text)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+    try:                                        # makes the rename itself durable (not possible on every OS)
+        directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+    except OSError:
+        pass
+
+
+def write_snapshot(path, pos_yaw, pos_pitch):          # position_save.txt, in the format of save_pos_val()
+    atomic_write(path, 'pos_yaw = \n' + str(pos_yaw) + '\n' + 'pos_pitch = \n' + str(pos_pitch) + '\n')
+
+
+def read_snapshot(path):          # (pos_yaw, pos_pitch) from position_save.txt
+    with open(path) as snapshot_file:
+        lines = snapshot_file.readlines()
+    return float(lines[1]), float(lines[3])
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================         WRITE-AHEAD JOURNAL            ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class PositionJournal:          # intent / done records of every move, with periodic snapshots
+
+    def __init__(self, journal_path, snapshot_path, now, snapshot_interval=300, fsync_interval=2.0):
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.now = now                          # clock function (clock.now of the control script)
+        self.snapshot_interval = snapshot_interval      # seconds between snapshots
+        self.fsync_interval = fsync_interval            # seconds between fsyncs of the journal (0 = every record)
+        self.file = None
+        self.seq = 0                            # number of the current move
+        self.pos_yaw = 0.0                      # latest journaled positions
+        self.pos_pitch = 0.0
+        self.last_fsync = now()
+        self.last_snapshot = now()
+        self.dirty = False                      # records written since the last fsync
+        self.pending = {}                       # axis --> directional motor time of the current move, until its D record
+        self.recovery = None                    # after recover(): (baseline, D records replayed, unfinished moves counted in full)
+        self.lock = threading.RLock()           # reentrant: done() snapshots while holding it
+
+    ### writing
+
+    def write(self, line):
+        with self.lock:
+            self.file.write(line + '\n')
+            self.file.flush()                       # in the OS now --> survives a crash or kill of the script
+            self.dirty = True
+            if self.now() - self.last_fsync >= self.fsync_interval:
+                self.sync()
+
+    def sync(self):          # makes all records so far durable (survive a power cut)
+        with self.lock:
+            if self.dirty and (self.file is not None):
+                os.fsync(self.file.fileno())
+                self.dirty = False
+            self.last_fsync = self.now()
+
+    def intent(self, yaw_time, pitch_time):          # before a move: directional motor times of both axes
+        with self.lock:
+            self.seq = self.seq + 1
+            self.pending = {axis: axis_time for axis, axis_time in (('yaw', yaw_time), ('pitch', pitch_time)) if axis_time != 0}
+            self.write('I %d %r %r' % (self.seq, yaw_time, pitch_time))
+
+    def done(self, axis, pos_yaw, pos_pitch):          # after one axis of the current move has stopped
+        with self.lock:
+            self.pos_yaw, self.pos_pitch = pos_yaw, pos_pitch
+            self.pending.pop(axis, None)
+            self.write('D %d %s %r %r' % (self.seq, axis, pos_yaw, pos_pitch))
+            if (not self.pending) and (self.now() - self.last_snapshot >= self.snapshot_interval):
+                self.snapshot(pos_yaw, pos_pitch)   # only between moves: the other axis may still be running
+
+    def snapshot(self, pos_yaw, pos_pitch):          # atomic position_save.txt, then a fresh journal starting from it
+        with self.lock:
+            self.pos_yaw, self.pos_pitch = pos_yaw, pos_pitch
+            write_snapshot(self.snapshot_path, pos_yaw, pos_pitch)
+            if self.file is not None:
+                self.file.close()
+            text = 'S %d %r %r\n' % (self.seq, pos_yaw, pos_pitch)
+            if self.pending:                        # a move still running: its intent has to survive the new journal
+                text = text + 'I %d %r %r\n' % (self.seq, self.pending.get('yaw', 0), self.pending.get('pitch', 0))
+            atomic_write(self.journal_path, text)
+            self.file = open(self.journal_path, 'a')
+            self.dirty = False
+            self.last_snapshot = self.last_fsync = self.now()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.sync()
+                self.file.close()
+                self.file = None
+
+    ### recovery
+
+    def recover(self):          # (pos_yaw, pos_pitch) replayed from the snapshot and the journal, or None
+        with self.lock:
+            position = None
+            baseline = None                         # where the position replay starts: 'snapshot' file or 'journal' S line
+            try:
+                position = list(read_snapshot(self.snapshot_path))
+                baseline = 'snapshot'
+            except (IOError, ValueError, IndexError):
+                pass
+            try:
+                with open(self.journal_path) as journal_file:
+                    lines = journal_file.read().split('\n')
+            except IOError:
+                lines = []
+
+            pending = {}                            # axis --> directional motor time of a move without its D record
+            records = 0                             # D records replayed after the baseline
+            for line in lines:
+                fields = line.split()
+                try:
+                    if fields[0] == 'S':
+                        position = [float(fields[2]), float(fields[3])]
+                        baseline = 'journal'
+                        records = 0
+                        self.seq = int(fields[1])
+                        pending = {}
+                    elif fields[0] == 'I':
+                        for axis, value in (('yaw', fields[2]), ('pitch', fields[3])):
+                            if float(value) != 0:
+                                pending[axis] = float(value)
+                        self.seq = int(fields[1])
+                    elif fields[0] == 'D':
+                        position = [float(fields[3]), float(fields[4])]
+                        records = records + 1
+                        pending.pop(fields[2], None)
+                except (IndexError, ValueError):    # empty line, or a record torn by the crash
+                    continue
+
+            if position is None:
+                return None
+            for axis, axis_time in pending.items():
+                log.warning('the SOS went down while moving %s by %.3f s --> counting it as the full move', axis, axis_time)
+                if axis == 'yaw':
+                    position[0] = position[0] + axis_time
+                else:
+                    position[1] = position[1] + axis_time
+            self.pos_yaw, self.pos_pitch = position
+            self.recovery = (baseline, records, len(pending))
+            return position[0], position[1]
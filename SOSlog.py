@@ -0,0 +1,234 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSlog.py
+# Description   :   Append-only binary log of the SOS (measurements, moves, optimizations), one file per day
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: every event is one fixed-size little-endian record (RECORD, 28 bytes):
+#
+#        time       float64   unix time (seconds, UTC)
+#        kind       uint8     MEASUREMENT, MOVE or OPTIMIZATION
+#        axis       uint8     MOVE: 0 = yaw, 1 = pitch             OPTIMIZATION: outcome (OUTCOMES)
+#        n          int16     MEASUREMENT: number of ADC reads     MOVE: direction (+1 / -1)
+#                             OPTIMIZATION: number of measurements it took
+#        a          float32   MEASUREMENT: average ADC value       MOVE: move_time (s)     OPTIMIZATION: volt_optimum
+#        b          float32   MEASUREMENT: volt_generated          MOVE: duty cycle (%)    OPTIMIZATION: duration (s)
+#        pos_yaw    float32   pos_yaw after the event   (motor seconds, degrees = pos_yaw * 360 / t_rev_yaw)
+#        pos_pitch  float32   pos_pitch after the event (motor seconds)
+#
+#      Records are appended to <directory>/sos-YYYYMMDD.bin (UTC day of the record), behind a 16 byte header.
+#      A new file is started at midnight. <directory>/index.json keeps [first time, last time, records]
+#      of every file, so a time range query only opens the files that overlap it.
+#      A crash can at most lose the records still buffered in memory (flush_records) and leave a torn
+#      last record, which the readers ignore.
+#
+#      Reading: read_range(directory, t_start, t_end) memory-maps the files with numpy (if installed) and
+#      returns one structured array view per file, without copying or parsing anything. Without numpy
+#      it falls back to a list of record tuples.
+
+#####################################################################################################
+#####################################################################################################
+
+import json
+import os
+import struct
+import time
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            RECORD FORMAT               ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+MAGIC = b'SOSLOG\x00\x01'                       # format name and version
+HEADER = struct.Struct('<8sII')                 # magic, record size, reserved
+RECORD = struct.Struct('<dBBhffff')
+FIELDS = ('time', 'kind', 'axis', 'n', 'a', 'b', 'pos_yaw', 'pos_pitch')
+
+MEASUREMENT, MOVE, OPTIMIZATION = 0, 1, 2       # values of kind
+AXES = ('yaw', 'pitch')                         # values of axis for MOVE records
+OUTCOMES = ('search', 'confirmed', 'searched')  # values of axis for OPTIMIZATION records:
+                                                # full search, Kalman prediction confirmed, Kalman window searched
+
+INDEX_FILE = 'index.json'
+
+
+def file_name(day):          # log file of a day (days since 1970-01-01, UTC)
+    return time.strftime('sos-%Y%m%d.bin', time.gmtime(day * 86400))
+
+
+def numpy_dtype():          # numpy structured dtype of one record (numpy is only imported here)
+    import numpy
+    return numpy.dtype([('time', '<f8'), ('kind', 'u1'), ('axis', 'u1'), ('n', '<i2'),
+                        ('a', '<f4'), ('b', '<f4'), ('pos_yaw', '<f4'), ('pos_pitch', '<f4')])
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================               WRITER                   ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class BinaryLog:          # appends records to the day's file, buffering flush_records of them in memory
+
+    def __init__(self, directory, flush_records=64):
+        self.directory = directory
+        self.flush_records = flush_records
+        self.buffer = bytearray(RECORD.size * flush_records)
+        self.buffered = 0                       # records in the buffer
+        self.day = None                         # day of the open file
+        self.name = None                        # name of the open file
+        self.file = None
+        self.index = {}                         # file name --> [first time, last time, records]
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(os.path.join(directory, INDEX_FILE)) as index_file:
+                self.index = json.load(index_file)
+        except (IOError, ValueError):
+            self.index = {}
+
+    def append(self, t, kind, axis, n, a, b, pos_yaw, pos_pitch):          # one record, t in unix seconds
+        day = int(t // 86400)
+        if day != self.day:
+            self.rotate(day, t)
+        RECORD.pack_into(self.buffer, self.buffered * RECORD.size, t, kind, axis, n, a, b, pos_yaw, pos_pitch)
+        self.buffered = self.buffered + 1
+        entry = self.index[self.name]
+        entry[1] = t
+        entry[2] = entry[2] + 1
+        if self.buffered == self.flush_records:
+            self.flush()
+
+    def measurement(self, t, reads, avg_adc_value, volt, pos_yaw, pos_pitch):
+        self.append(t, MEASUREMENT, 0, reads, avg_adc_value, volt, pos_yaw, pos_pitch)
+
+    def move(self, t, axis, direction, move_time, dc, pos_yaw, pos_pitch):
+        self.append(t, MOVE, AXES.index(axis), direction, move_time, dc, pos_yaw, pos_pitch)
+
+    def optimization(self, t, outcome, measurements, volt_optimum, duration, pos_yaw, pos_pitch):
+        self.append(t, OPTIMIZATION, OUTCOMES.index(outcome), measurements, volt_optimum, duration, pos_yaw, pos_pitch)
+
+    def rotate(self, day, t):          # closes the current file and opens (or continues) the file of day
+        self.close()
+        self.day = day
+        self.name = file_name(day)
+        path = os.path.join(self.directory, self.name)
+        self.file = open(path, 'ab')
+        size = self.file.tell()
+        if size < HEADER.size:                  # new (or empty) file
+            self.file.truncate(0)
+            self.file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+            self.index[self.name] = [t, t, 0]
+        else:                                   # continuing after a restart: drop a torn last record
+            records = (size - HEADER.size) // RECORD.size
+            self.file.truncate(HEADER.size + records * RECORD.size)
+            self.index.setdefault(self.name, [t, t, 0])[2] = records
+
+    def flush(self):          # writes the buffered records and the index
+        if self.file is None:
+            return
+        if self.buffered:
+            self.file.write(memoryview(self.buffer)[:self.buffered * RECORD.size])
+            self.buffered = 0
+        self.file.flush()
+        self.save_index()
+
+    def save_index(self):          # temp file + rename, never half written
+        path = os.path.join(self.directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as index_file:
+            json.dump(self.index, index_file)
+        os.replace(path + '.tmp', path)
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================               READERS                  ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def files_in_range(directory, t_start=None, t_end=None):          # log files (paths, in time order) that overlap the range
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as index_file:
+            index = json.load(index_file)
+    except (IOError, ValueError):           # no index: every log file, by name
+        index = {name: [None, None, None] for name in os.listdir(directory)
+                 if name.startswith('sos-') and name.endswith('.bin')}
+    paths = []
+    for name in sorted(index):
+        first, last, _ = index[name]
+        if (t_end is not None) and (first is not None) and (first > t_end):
+            continue
+        if (t_start is not None) and (last is not None) and (last < t_start):
+            continue
+        paths.append(os.path.join(directory, name))
+    return paths
+
+
+def read_file(path):          # all records of one file as a read-only memory-mapped numpy array (no copy)
+    import numpy
+    with open(path, 'rb') as log_file:
+        magic, record_size, _ = HEADER.unpack(log_file.read(HEADER.size))
+    if (magic != MAGIC) or (record_size != RECORD.size):
+        raise ValueError(path + ' is not an SOS binary log of this version')
+    records = (os.path.getsize(path) - HEADER.size) // RECORD.size
+    if records == 0:
+        return numpy.zeros(0, dtype=numpy_dtype())
+    return numpy.memmap(path, dtype=numpy_dtype(), mode='r', offset=HEADER.size, shape=(records,))
+
+
+def read_range(directory, t_start=None, t_end=None, kind=None):          # records with t_start <= time <= t_end
+    # returns one numpy array per file (views into the memory map, sliced by binary search on time);
+    # filtering by kind needs a boolean mask and therefore copies. Without numpy: a list of record tuples.
+    try:
+        import numpy
+    except ImportError:
+        return read_range_tuples(directory, t_start, t_end, kind)
+    parts = []
+    for path in files_in_range(directory, t_start, t_end):
+        records = read_file(path)
+        times = records['time']
+        first = 0 if t_start is None else int(numpy.searchsorted(times, t_start, 'left'))
+        last = len(records) if t_end is None else int(numpy.searchsorted(times, t_end, 'right'))
+        part = records[first:last]
+        if kind is not None:
+            part = part[part['kind'] == kind]
+        if len(part):
+            parts.append(part)
+    return parts
+
+
+def read_range_tuples(directory, t_start=None, t_end=None, kind=None):          # pure python version of read_range()
+    rows = []
+    for path in files_in_range(directory, t_start, t_end):
+        with open(path, 'rb') as log_file:
+            data = log_file.read()
+        magic, record_size, _ = HEADER.unpack_from(data)
+        if (magic != MAGIC) or (record_size != RECORD.size):
+            raise ValueError(path + ' is not an SOS binary log of this version')
+        end = HEADER.size + (len(data) - HEADER.size) // RECORD.size * RECORD.size
+        for row in RECORD.iter_unpack(memoryview(data)[HEADER.size:end]):
+            if (t_start is not None and row[0] < t_start) or (t_end is not None and row[0] > t_end):
+                continue
+            if (kind is None) or (row[1] == kind):
+                rows.append(row)
+    return rows
@@ -0,0 +1,148 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSlogging.py
+# Description   :   Leveled, queue-backed logging for the SOS (console and/or file, text or JSON lines)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: the control script logs through logging.getLogger('SOS') (and 'SOS.cycle' for the per-cycle summary)
+#      with lazy %-style arguments, e.g. log.debug('measurement %s : the ADC value is %s', i, adc_value):
+#      a message below the active level is never formatted.
+#      configure() puts a QueueHandler on the 'SOS' logger: the control loop only appends the record to a queue,
+#      and a QueueListener thread does the formatting and the (slow) console / file I/O.
+#
+#        levels   DEBUG   --> function banners, every single ADC read, countdowns
+#                 INFO    --> results (maxima found, positions, voltages), one summary line per cycle
+#                 WARNING --> problems the SOS recovers from
+#        modes    'verbose' --> everything at or above the level
+#                 'quiet'   --> only warnings, errors and the one-line cycle summaries (production)
+#        formats  'text'    --> time level message
+#                 'json'    --> one JSON object per line, including the structured fields of the record
+
+#####################################################################################################
+#####################################################################################################
+
+import atexit
+import contextlib
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOGGER = 'SOS'
+CYCLE_LOGGER = 'SOS.cycle'
+
+_listener = None                                # the running QueueListener
+_handler = None                                 # its QueueHandler on the 'SOS' logger
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================        FORMATTERS AND HANDLERS         ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class JsonFormatter(logging.Formatter):          # one JSON object per record: time, level, logger, message and fields
+
+    def format(self, record):
+        data = {'time': round(record.created, 3), 'level': record.levelname, 'logger': record.name,
+                'message': record.getMessage()}
+        fields = getattr(record, 'fields', None)        # logger.info(..., extra={'fields': {...}})
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data)
+
+
+class StdoutHandler(logging.StreamHandler):          # writes to the current sys.stdout (follows redirections)
+
+    def __init__(self):
+        logging.StreamHandler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):                    # StreamHandler.__init__ assigns sys.stderr, which is ignored
+        pass
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            CONFIGURATION               ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def configure(level='INFO', mode='verbose', log_format='text', log_file=None, console=True):          # (re)configures the 'SOS' logger
+    global _listener, _handler
+    stop()
+
+    if log_format == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s %(levelname)-7s %(message)s', '%Y-%m-%d %H:%M:%S')
+    handlers = []
+    if console:
+        handlers.append(StdoutHandler())
+    if log_file:                                # 5 x 1 MB, so months of running cannot fill the SD card
+        handlers.append(logging.handlers.RotatingFileHandler(log_file, maxBytes=1000000, backupCount=5))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _handler = logging.handlers.QueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+
+    logger = logging.getLogger(LOGGER)
+    logger.addHandler(_handler)
+    logger.propagate = False                    # no second copy through the root logger
+    if mode == 'quiet':
+        logger.setLevel(logging.WARNING)
+        logging.getLogger(CYCLE_LOGGER).setLevel(logging.INFO)
+    else:
+        logger.setLevel(level)
+        logging.getLogger(CYCLE_LOGGER).setLevel(logging.NOTSET)   # follows the 'SOS' level
+    return logger
+
+
+def stop():          # writes out the queued records and removes the handler
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()                        # processes everything still in the queue
+        logging.getLogger(LOGGER).removeHandler(_handler)
+        _listener, _handler = None, None
+
+
+def flush():          # waits until the listener has written every queued record
+    if _listener is not None:
+        _listener.stop()
+        _listener.start()
+
+
+atexit.register(stop)
+
+
+@contextlib.contextmanager
+def silenced(level=logging.WARNING):          # temporarily only logs records at or above level (e.g. for simulations)
+    loggers = [logging.getLogger(LOGGER), logging.getLogger(CYCLE_LOGGER)]
+    levels = [logger.level for logger in loggers]
+    for logger in loggers:
+        logger.setLevel(level)
+    try:
+        yield
+    finally:
+        for logger, old_level in zip(loggers, levels):
+            logger.setLevel(old_level)
@@ -0,0 +1,183 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSmetrics.py
+# Description   :   Embedded HTTP server with the SOS metrics (Prometheus text format and JSON)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: stdlib only. MetricsServer serves, from its own daemon threads:
+#        /metrics        --> Prometheus text format (version 0.0.4), for the fleet scraper
+#        /metrics.json   --> the same metrics as one JSON object
+#      Every request calls collect(), a function of the control script that returns a list of Metric objects
+#      built from its current state. The control loop never waits for the server: collect() only reads
+#      variables, and a slow or hanging client only holds up its own request thread.
+#
+#        Metric(name, 'gauge' | 'counter' | 'histogram', help, value)
+#          value = a number, a Histogram, or a dict {label value: number or Histogram} (label name: Metric.label)
+
+#####################################################################################################
+#####################################################################################################
+
+import http.server
+import json
+import math
+import threading
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            METRIC TYPES                ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class Histogram:          # cumulative-bucket histogram (Prometheus style): counts of observations <= each bound
+
+    def __init__(self, bounds):
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)     # the last one is the +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] = self.counts[i] + 1
+        self.count = self.count + 1
+        self.sum = self.sum + value
+
+    def cumulative(self):          # [(upper bound, observations <= bound), ...] ending with +Inf
+        result, running = [], 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            running = running + count
+            result.append((bound, running))
+        return result
+
+
+class Metric:          # one metric family, as returned by the collect() function of the control script
+
+    __slots__ = ('name', 'kind', 'help', 'value', 'label')
+
+    def __init__(self, name, kind, help, value, label='axis'):
+        self.name = name
+        self.kind = kind                        # 'gauge', 'counter' or 'histogram'
+        self.help = help
+        self.value = value
+        self.label = label                      # label name, if value is a dict
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================             RENDERING                  ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def format_number(value):
+    if value is None:
+        return 'NaN'
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def prometheus_text(metrics):          # Prometheus text exposition format
+    lines = []
+    for metric in metrics:
+        lines.append('# HELP %s %s' % (metric.name, metric.help))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        values = metric.value if isinstance(metric.value, dict) else {None: metric.value}
+        for label_value, value in values.items():
+            label = '' if label_value is None else '%s="%s"' % (metric.label, label_value)
+            if isinstance(value, Histogram):
+                for bound, count in value.cumulative():
+                    bucket_labels = ','.join(part for part in (label, 'le="%s"' % format_number(bound)) if part)
+                    lines.append('%s_bucket{%s} %d' % (metric.name, bucket_labels, count))
+                braces = '{%s}' % label if label else ''
+                lines.append('%s_sum%s %s' % (metric.name, braces, format_number(value.sum)))
+                lines.append('%s_count%s %d' % (metric.name, braces, value.count))
+            else:
+                braces = '{%s}' % label if label else ''
+                lines.append('%s%s %s' % (metric.name, braces, format_number(value)))
+    return '\n'.join(lines) + '\n'
+
+
+def json_value(value):
+    if isinstance(value, Histogram):
+        return {'count': value.count, 'sum': value.sum,
+                'buckets': {format_number(bound): count for bound, count in value.cumulative()}}
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def json_text(metrics):          # {name: value}, {name: {label value: value}} or {name: {count, sum, buckets}}
+    data = {}
+    for metric in metrics:
+        if isinstance(metric.value, dict):
+            data[metric.name] = {str(key): json_value(value) for key, value in metric.value.items()}
+        else:
+            data[metric.name] = json_value(metric.value)
+    return json.dumps(data, indent=1) + '\n'
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================             HTTP SERVER                ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class MetricsServer:          # serves collect() on /metrics and /metrics.json from background threads
+
+    def __init__(self, collect, host='0.0.0.0', port=9105):
+        self.collect = collect
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics':
+                    body, content_type = prometheus_text(server.collect()), 'text/plain; version=0.0.4; charset=utf-8'
+                elif path == '/metrics.json':
+                    body, content_type = json_text(server.collect()), 'application/json'
+                else:
+                    self.send_error(404, 'try /metrics or /metrics.json')
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):          # no console line per scrape
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]        # the actual port (port=0 picks a free one)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
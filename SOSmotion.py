@@ -0,0 +1,254 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSmotion.py
+# Description   :   Motion model of the SOS motors (dead time, coast, backlash) and its fit from pulse traces
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: the control script counts every move as move_time seconds of travel, but a real DC motor
+#        - starts moving dead_time seconds after its pins are switched on           (travel lost)
+#        - keeps coasting after its pins are switched off, adding `coast` seconds   (travel gained)
+#        - turns through the slack of the gears after every reversal, `backlash` seconds without output (travel lost)
+#      all three in motor seconds of the axis (the units of pos_yaw / pos_pitch).
+#
+#      MotionModel.on_time(axis, direction, travel) returns how long the motor has to be switched on
+#      for the axis to really travel that far:   travel + dead_time - coast (+ backlash after a reversal)
+#      and travel(axis, direction, on_time) the travel a pulse really makes (moves shorter than the coast
+#      cannot be made exactly). settle_time() is how long the axis keeps coasting after switching off.
+#
+#      fit_pulse() measures one pulse: while the axis is switched on for T seconds (starting on a slope of the
+#      voltage profile, so that the voltage follows the angle) the ADC is read in the background, and the
+#      trace is fitted with   volt = a + b * travel(t) + c * travel(t)²   where travel(t) is
+#        0                              before the output starts moving at t = lag
+#        t - lag                        until the pins go LOW at t = T
+#        (T - lag) + u - u² / (2 c)     coasting to a stop over c seconds, u = t - T
+#      lag is dead_time for a pulse in the direction of the previous one, dead_time + backlash after a reversal,
+#      and the coast adds c / 2 seconds of travel. The model is saved as JSON (motion_model.json).
+#
+#      Speed profiles: a move can also be made of segments [(dc, seconds), ...] with the pins on throughout and
+#      only the duty cycle changing: a soft-start ramp, a cruise at full speed and a slow final approach.
+#      speed(dc) is the speed at dc relative to the duty cycle the positions are counted in (from the calibration,
+#      see SOScalibrate.py). The output starts dead_time + backlash / speed(first dc) seconds after switching on
+#      (the slack is the same angle at any speed) and coasts coast * speed(last dc) seconds of travel further.
+#      plan_profile() returns the segments for a wanted travel, profile_travel() the travel of measured segments.
+
+#####################################################################################################
+#####################################################################################################
+
+import json
+import os
+
+AXES = ('yaw', 'pitch')
+PARAMETERS = ('dead_time', 'coast', 'backlash')
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            MOTION MODEL                ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class MotionModel:          # dead time, coast and backlash per axis, and the corrected motor-ON times
+
+    def __init__(self):
+        self.parameters = {axis: {name: 0.0 for name in PARAMETERS} for axis in AXES}
+        self.last_direction = {axis: 0 for axis in AXES}        # direction of the last move (0 = unknown)
+
+    def lag(self, axis, direction):          # seconds from switching on until the output moves (dead time, + backlash after a reversal)
+        parameters = self.parameters[axis]
+        if self.last_direction[axis] and (direction != self.last_direction[axis]):
+            return parameters['dead_time'] + parameters['backlash']
+        return parameters['dead_time']
+
+    def on_time(self, axis, direction, travel):          # motor-ON seconds for (travel) seconds of real travel
+        if travel <= 0:
+            return 0.0
+        lag, coast = self.lag(axis, direction), self.parameters[axis]['coast']
+        if travel < coast:                      # the shortest possible move is the coast itself: switch on for lag, or not at all
+            return lag if travel >= coast / 2 else 0.0
+        return travel + lag - coast
+
+    def travel(self, axis, direction, on_time):          # real travel of a pulse of on_time seconds (the inverse of on_time)
+        lag = self.lag(axis, direction)
+        if (on_time <= 0) or (on_time < lag - 1e-6):   # (a measured pulse of exactly lag may come out a few µs short)
+            return 0.0
+        return on_time - lag + self.parameters[axis]['coast']
+
+    def losses(self, axis, direction):          # (dead_time, backlash (0 without a reversal), coast) of a move, for the speed profiles
+        parameters = self.parameters[axis]
+        reversal = self.last_direction[axis] and (direction != self.last_direction[axis])
+        return parameters['dead_time'], parameters['backlash'] if reversal else 0.0, parameters['coast']
+
+    def moved(self, axis, direction):          # remembers the direction of a move (for the backlash of the next one)
+        self.last_direction[axis] = direction
+
+    def settle_time(self, axis):          # seconds after switching off until the axis has surely stopped
+        # the coast time is 2 * coast (linear slow-down), + 50 %: a move started while the axis still coasts skips the dead time
+        return 3 * self.parameters[axis]['coast']
+
+    def save(self, path):          # temp file + rename, never half written
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as model_file:
+            json.dump(self.parameters, model_file, indent=1)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        with open(path) as model_file:
+            data = json.load(model_file)
+        for axis in AXES:
+            for name in PARAMETERS:
+                self.parameters[axis][name] = float(data.get(axis, {}).get(name, 0.0))
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================           PULSE EXPERIMENTS            ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def pulse_travel(t, on_time, lag, coast_time):          # travel (motor seconds) of the output at t seconds after switching on
+    if t < lag:
+        return 0.0
+    if t < on_time:
+        return t - lag
+    u = t - on_time
+    if u < coast_time:
+        return (on_time - lag) + u - u * u / (2 * coast_time)
+    return (on_time - lag) + coast_time / 2
+
+
+def quadratic_fit(x, y):          # least squares y = a + b * x + c * x², returns the sum of squared residuals
+    # (the voltage is a cosine of the angle, so over a pulse of several degrees it is not quite linear)
+    n = len(x)
+    mean_x = sum(x) / n
+    x = [u - mean_x for u in x]                 # centred, for a well-conditioned system
+    s1, s2 = sum(x), sum(u * u for u in x)
+    s3, s4 = sum(u ** 3 for u in x), sum(u ** 4 for u in x)
+    rows = [[n, s1, s2, sum(y)],
+            [s1, s2, s3, sum(u * v for u, v in zip(x, y))],
+            [s2, s3, s4, sum(u * u * v for u, v in zip(x, y))]]
+    for i in range(3):                          # Gauss-Jordan elimination with partial pivoting
+        pivot = max(range(i, 3), key=lambda r: abs(rows[r][i]))
+        rows[i], rows[pivot] = rows[pivot], rows[i]
+        if rows[i][i] == 0:                     # x constant (the axis never moved): only the mean fits
+            mean_y = sum(y) / n
+            return sum((v - mean_y) ** 2 for v in y)
+        for r in range(3):
+            if r != i:
+                factor = rows[r][i] / rows[i][i]
+                rows[r] = [u - factor * v for u, v in zip(rows[r], rows[i])]
+    a, b, c = (rows[i][3] / rows[i][i] for i in range(3))
+    return sum((v - a - b * u - c * u * u) ** 2 for u, v in zip(x, y))
+
+
+def fit_pulse(times, values, on_time, max_lag=0.5, max_coast=0.5, step=0.005, min_span=8):
+    # (lag, coast time, r²) of one pulse trace (times relative to switching on), or None without usable signal
+    # lag is fitted on the samples before the pins go LOW (the coast does not matter there), then the coast on all samples.
+    # Both are searched down to -max_lag / -max_coast: an estimate clipped at 0 would make an ideal motor look slow.
+    # A trace that changes by fewer than min_span ADC counts cannot place the start of the motion (night, clouds).
+    if (max_lag >= on_time) or (len(times) < 10) or (max(values) - min(values) < min_span):
+        return None
+    before = [(t, value) for (t, value) in zip(times, values) if t < on_time]
+    best = None
+    for i in range(-int(max_lag / step), int(max_lag / step) + 1):
+        lag = i * step
+        residual = quadratic_fit([pulse_travel(t, on_time, lag, 0.0) for (t, value) in before],
+                                 [value for (t, value) in before])
+        if (best is None) or (residual < best[1]):
+            best = (lag, residual)
+    lag = best[0]
+    best = None
+    for i in range(-int(max_coast / step), int(max_coast / step) + 1):
+        coast_time = i * step
+        residual = quadratic_fit([pulse_travel(t, on_time, lag, coast_time) for t in times], values)
+        if (best is None) or (residual < best[1]):
+            best = (coast_time, residual)
+    coast_time, residual = best
+    mean = sum(values) / len(values)
+    total = sum((value - mean) ** 2 for value in values)
+    return lag, coast_time, 1 - residual / total
+
+
+def fit_model(pulses, min_r2=0.8):          # {'dead_time', 'coast', 'backlash'} from [(reversal, lag, coast time, r²), ...]
+    # returns None unless there are good pulses both in the same direction and after reversals
+    same = [pulse for pulse in pulses if (not pulse[0]) and (pulse[3] >= min_r2)]
+    reversed_ = [pulse for pulse in pulses if pulse[0] and (pulse[3] >= min_r2)]
+    if not (same and reversed_):
+        return None
+    dead_time = sum(pulse[1] for pulse in same) / len(same)
+    backlash = sum(pulse[1] for pulse in reversed_) / len(reversed_) - dead_time
+    good = same + reversed_
+    coast = sum(pulse[2] for pulse in good) / len(good) / 2
+    return {'dead_time': max(dead_time, 0.0), 'coast': max(coast, 0.0), 'backlash': max(backlash, 0.0)}
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            SPEED PROFILES              ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def profile_lag(segments, speed, dead_time=0.0, backlash=0.0):
+    # seconds from switching on until the output moves: segments below the stall only delay the start
+    t = 0.0
+    for dc, seconds in segments:
+        if speed(dc) > 0:
+            return t + dead_time + backlash / speed(dc)
+        t = t + seconds
+    return float('inf')
+
+
+def profile_travel(segments, speed, dead_time=0.0, backlash=0.0, coast=0.0):
+    # real travel (motor seconds at speed 1) of a move made of segments [(dc, seconds), ...]
+    lag = profile_lag(segments, speed, dead_time, backlash)
+    travel, t = 0.0, 0.0
+    for dc, seconds in segments:
+        travel = travel + speed(dc) * max(min(seconds, t + seconds - lag), 0.0)    # the part of the segment after the lag
+        t = t + seconds
+    if (t <= 0) or (t < lag - 1e-6):           # switched off before the output moved: no coast either
+        return 0.0
+    return travel + speed(segments[-1][0]) * coast
+
+
+def plan_profile(travel, speed, cruise_dc, approach_dc, approach, slow=0.0, ramp_dcs=(), ramp_step=0.0,
+                 dead_time=0.0, backlash=0.0, coast=0.0):
+    # segments [(dc, seconds), ...] for a move of (travel) motor seconds at speed 1, or None if cruise_dc or approach_dc
+    # does not turn the motor
+    #   moves up to max(slow, approach + its coast) are made entirely at approach_dc (fine adjustments: slow and precise)
+    #   longer ones ramp up through ramp_dcs (ramp_step seconds each), cruise at cruise_dc and make the last (approach) slowly
+    speed_approach, speed_cruise = speed(approach_dc), speed(cruise_dc)
+    if (speed_approach <= 0) or (speed_cruise <= 0):
+        return None
+    if travel <= 0:
+        return []
+    coast_approach = speed_approach * coast
+    if travel <= max(slow, approach + coast_approach):
+        lag = dead_time + backlash / speed_approach
+        if travel < coast_approach:             # the shortest possible move is the coast itself: switch on for lag, or not at all
+            return [(approach_dc, lag)] if travel >= coast_approach / 2 else []
+        return [(approach_dc, lag + (travel - coast_approach) / speed_approach)]
+    ramp = [(dc, ramp_step) for dc in ramp_dcs] if ramp_step > 0 else []
+    approach_segment = (approach_dc, approach / speed_approach)
+    for ramp in (ramp, []):                     # a move too short for the ramp goes without it
+        lag = profile_lag(ramp + [(cruise_dc, 1.0)], speed, dead_time, backlash)
+        cruise_min = max(lag - len(ramp) * ramp_step, 0.0)      # the lag is over before the approach starts
+        fixed = profile_travel(ramp + [(cruise_dc, cruise_min), approach_segment], speed, dead_time, backlash, coast)
+        cruise = cruise_min + (travel - fixed) / speed_cruise
+        if cruise >= cruise_min:
+            return ramp + [(cruise_dc, cruise), approach_segment]
+    # never a negative cruise: a move the cruise + approach cannot make is made entirely at approach_dc
+    lag = dead_time + backlash / speed_approach
+    return [(approach_dc, lag + (travel - coast_approach) / speed_approach)]
@@ -0,0 +1,191 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSpredict.py
+# Description   :   Predicting where the optimum (pos_yaw, pos_pitch) of the SOS will be
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: PositionCache remembers the converged positions of past optimizations, bucketed by
+#      time of day and day of year, and predicts the optimum for a new date/time from its
+#      nearest buckets. It is saved as a small JSON file, so it survives restarts.
+#      Its positions are in degrees (like OptimumTracker), so they stay valid when the motor times of a
+#      revolution (t_rev_yaw, t_rev_pitch) are re-calibrated. Yaw is compared and averaged modulo 360°.
+#      OptimumTracker follows the optimum from one optimization to the next with a Kalman filter
+#      and predicts where it will be at the next optimization, together with an uncertainty.
+
+#####################################################################################################
+#####################################################################################################
+
+import json
+import os
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================     LEARNED POSITION LOOKUP TABLE      ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+def nearest_equivalent(yaw_deg, reference_deg):          # the yaw angle (+/- n x 360°) closest to reference_deg
+    return yaw_deg + 360 * round((reference_deg - yaw_deg) / 360)
+
+
+class PositionCache:          # converged (yaw°, pitch°) by time-of-day and day-of-year bucket
+
+    def __init__(self, tod_bucket_min=10, doy_bucket_days=7,
+                 neighbours=4, max_distance=3.0, max_age_days=60, smoothing=0.5):
+        self.tod_bucket_min = tod_bucket_min    # width of a time-of-day bucket (minutes)
+        self.doy_bucket_days = doy_bucket_days  # width of a day-of-year bucket (days)
+        self.neighbours = neighbours            # number of nearest buckets interpolated in predict()
+        self.max_distance = max_distance        # buckets further away than this (in bucket widths) are not used
+        self.max_age_days = max_age_days        # entries not updated for this many days are evicted
+        self.smoothing = smoothing              # weight of a new optimum when it lands in an existing bucket
+        self.entries = {}                       # (doy bucket, tod bucket) --> [yaw°, pitch°, count, last update (unix time)]
+
+    def bucket(self, when):          # (day-of-year bucket, time-of-day bucket) of a datetime, as floats
+        doy = when.timetuple().tm_yday - 1
+        tod = when.hour * 60 + when.minute + when.second / 60.0
+        return doy / self.doy_bucket_days, tod / self.tod_bucket_min
+
+    def key(self, when):
+        doy, tod = self.bucket(when)
+        return int(doy), int(tod)
+
+    def record(self, when, yaw_deg, pitch_deg):          # stores a converged optimum (degrees)
+        key = self.key(when)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = [yaw_deg, pitch_deg, 1, when.timestamp()]
+        else:                                   # exponential smoothing, so the bucket follows slow drifts
+            entry[0] = entry[0] + self.smoothing * (nearest_equivalent(yaw_deg, entry[0]) - entry[0])
+            entry[1] = entry[1] + self.smoothing * (pitch_deg - entry[1])
+            entry[2] = entry[2] + 1
+            entry[3] = when.timestamp()
+
+    def predict(self, when):          # interpolated (yaw°, pitch°) for a datetime, or None if nothing is close enough
+        doy, tod = self.bucket(when)
+        doy_buckets = 366.0 / self.doy_bucket_days
+        candidates = []
+        for (key_doy, key_tod), entry in self.entries.items():
+            d_doy = abs(key_doy + 0.5 - doy)
+            d_doy = min(d_doy, doy_buckets - d_doy)     # the year wraps around
+            d_tod = key_tod + 0.5 - tod                 # the day does not (no optimizations at midnight)
+            distance = (d_doy * d_doy + d_tod * d_tod) ** 0.5
+            if distance <= self.max_distance:
+                candidates.append((distance, entry))
+        if not candidates:
+            return None
+        candidates.sort(key=lambda candidate: candidate[0])
+        # inverse-distance weighting of the nearest buckets
+        weights = [(1.0 / max(distance, 0.05), entry) for (distance, entry) in candidates[:self.neighbours]]
+        total = sum(weight for (weight, _) in weights)
+        reference = weights[0][1][0]            # yaw of the nearest bucket: the others are averaged around it
+        yaw_deg = sum(weight * nearest_equivalent(entry[0], reference) for (weight, entry) in weights) / total
+        pitch_deg = sum(weight * entry[1] for (weight, entry) in weights) / total
+        return yaw_deg, pitch_deg
+
+    def evict(self, when):          # removes entries that have not been updated for max_age_days, returns how many
+        oldest = when.timestamp() - self.max_age_days * 86400
+        stale = [key for key, entry in self.entries.items() if entry[3] < oldest]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+    def save(self, path):          # writes the cache to a JSON file (temp file + rename, never half written)
+        data = {'units': 'degrees', 'tod_bucket_min': self.tod_bucket_min, 'doy_bucket_days': self.doy_bucket_days,
+                'entries': [[key[0], key[1]] + entry for key, entry in sorted(self.entries.items())]}
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as cache_file:
+            json.dump(data, cache_file)
+        os.replace(temp_path, path)
+
+    def load(self, path):          # reads a cache written by save(), entries with other bucket sizes (or in motor seconds) are dropped
+        with open(path) as cache_file:
+            data = json.load(cache_file)
+        if (data.get('units') != 'degrees'):    # written by an older version, in motor seconds
+            return
+        if (data.get('tod_bucket_min') != self.tod_bucket_min) or (data.get('doy_bucket_days') != self.doy_bucket_days):
+            return
+        self.entries = {(row[0], row[1]): list(row[2:]) for row in data['entries']}
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================     KALMAN TRAJECTORY PREDICTOR        ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+# NOTE: the optimum moves smoothly across the sky, so each axis is modelled as
+#         position(t + dt) = position(t) + velocity(t) * dt      (constant velocity)
+#       with a small random acceleration (process_noise). Every converged optimization is a noisy
+#       measurement of the position (measurement_noise). The filter then gives, for any later time,
+#       the predicted position AND its standard deviation, which grows with the time since the last update.
+
+
+class AxisKalman:          # constant-velocity Kalman filter for one axis (units: degrees and seconds)
+
+    def __init__(self, process_noise, measurement_noise):
+        self.q = process_noise                  # spectral density of the random acceleration (deg^2 / s^3)
+        self.r = measurement_noise              # variance of a converged position (deg^2)
+        self.x = None                           # state: [position, velocity]
+        self.p = None                           # covariance: [[p00, p01], [p01, p11]]
+        self.t = None                           # time of the state
+
+    def propagate(self, dt):          # predicted state and covariance dt seconds after self.t
+        pos, vel = self.x
+        p00, p01, p11 = self.p[0][0], self.p[0][1], self.p[1][1]
+        q = self.q
+        return ([pos + vel * dt, vel],
+                [[p00 + 2 * dt * p01 + dt * dt * p11 + q * dt ** 3 / 3, p01 + dt * p11 + q * dt * dt / 2],
+                 [p01 + dt * p11 + q * dt * dt / 2,                       p11 + q * dt]])
+
+    def update(self, t, position):          # adds a measured (converged) position at time t
+        if self.x is None:                      # first measurement: position known, velocity not at all
+            self.x = [position, 0.0]
+            self.p = [[self.r, 0.0], [0.0, 1.0]]
+            self.t = t
+            return
+        x, p = self.propagate(t - self.t)
+        innovation = position - x[0]
+        s = p[0][0] + self.r
+        k0, k1 = p[0][0] / s, p[1][0] / s       # Kalman gain
+        self.x = [x[0] + k0 * innovation, x[1] + k1 * innovation]
+        self.p = [[(1 - k0) * p[0][0],     (1 - k0) * p[0][1]],
+                  [(1 - k0) * p[0][1],     p[1][1] - k1 * p[0][1]]]
+        self.t = t
+
+    def predict(self, t):          # (position, standard deviation) at time t
+        x, p = self.propagate(t - self.t)
+        return x[0], max(p[0][0], 0.0) ** 0.5
+
+
+class OptimumTracker:          # predicts the optimum (yaw°, pitch°) and its uncertainty from the history of converged positions
+
+    def __init__(self, process_noise=1e-8, measurement_noise=4.0):
+        self.yaw = AxisKalman(process_noise, measurement_noise)
+        self.pitch = AxisKalman(process_noise, measurement_noise)
+        self.updates = 0
+
+    def update(self, t, yaw_deg, pitch_deg):          # adds a converged optimum at time t (seconds)
+        self.yaw.update(t, yaw_deg)
+        self.pitch.update(t, pitch_deg)
+        self.updates = self.updates + 1
+
+    def ready(self):          # the velocity is only known after two updates
+        return self.updates >= 2
+
+    def predict(self, t):          # (yaw°, pitch°, sigma yaw°, sigma pitch°) at time t
+        yaw_deg, sigma_yaw = self.yaw.predict(t)
+        pitch_deg, sigma_pitch = self.pitch.predict(t)
+        return yaw_deg, pitch_deg, sigma_yaw, sigma_pitch
+
+    def velocity(self):          # estimated angular velocity of the optimum (yaw°/s, pitch°/s)
+        return self.yaw.x[1], self.pitch.x[1]
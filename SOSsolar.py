@@ -0,0 +1,76 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOSsolar.py
+# Description   :   Solar position (azimuth, elevation) from date, time, latitude and longitude
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: pure python, no network. The equations are the NOAA solar calculator equations
+#      (after Jean Meeus, "Astronomical Algorithms"), accurate to well below 1° between 1950 and 2050,
+#      which is far finer than the 5° fine adjustment of the SOS.
+#        azimuth   = compass direction of the sun in degrees (0° = north, 90° = east, 180° = south)
+#        elevation = angle of the sun above the horizon in degrees (no refraction correction)
+
+#####################################################################################################
+#####################################################################################################
+
+import datetime
+import math
+
+
+
+def julian_day(when):          # julian day of a UTC datetime (naive datetimes are taken as UTC)
+    if when.tzinfo is not None:
+        when = when.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    delta = when - datetime.datetime(2000, 1, 1, 12)
+    return 2451545.0 + delta.days + delta.seconds / 86400.0 + delta.microseconds / 86400e6
+
+
+def sun_position(when, latitude, longitude):          # returns (azimuth, elevation) in degrees
+
+    t = (julian_day(when) - 2451545.0) / 36525.0        # julian centuries since J2000.0
+
+    # sun's geometric mean longitude and anomaly, and the eccentricity of earth's orbit
+    mean_long = (280.46646 + t * (36000.76983 + t * 0.0003032)) % 360
+    mean_anom = 357.52911 + t * (35999.05029 - 0.0001537 * t)
+    eccent = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+    m = math.radians(mean_anom)
+
+    # equation of center --> apparent longitude of the sun
+    center = (math.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+              + math.sin(2 * m) * (0.019993 - 0.000101 * t)
+              + math.sin(3 * m) * 0.000289)
+    omega = math.radians(125.04 - 1934.136 * t)
+    app_long = math.radians(mean_long + center - 0.00569 - 0.00478 * math.sin(omega))
+
+    # obliquity of the ecliptic --> declination of the sun
+    obliq = 23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+    obliq = math.radians(obliq + 0.00256 * math.cos(omega))
+    decl = math.asin(math.sin(obliq) * math.sin(app_long))
+
+    # equation of time (minutes)
+    y = math.tan(obliq / 2) ** 2
+    l0 = math.radians(mean_long)
+    eq_time = 4 * math.degrees(y * math.sin(2 * l0)
+                               - 2 * eccent * math.sin(m)
+                               + 4 * eccent * y * math.sin(m) * math.cos(2 * l0)
+                               - 0.5 * y * y * math.sin(4 * l0)
+                               - 1.25 * eccent * eccent * math.sin(2 * m))
+
+    # true solar time --> hour angle
+    if when.tzinfo is not None:
+        when = when.astimezone(datetime.timezone.utc)
+    minutes = when.hour * 60 + when.minute + when.second / 60.0 + when.microsecond / 60e6
+    solar_minutes = (minutes + eq_time + 4 * longitude) % 1440
+    hour_angle = math.radians(solar_minutes / 4 - 180)
+
+    # horizontal coordinates
+    lat = math.radians(latitude)
+    cos_zenith = math.sin(lat) * math.sin(decl) + math.cos(lat) * math.cos(decl) * math.cos(hour_angle)
+    elevation = 90 - math.degrees(math.acos(max(-1.0, min(1.0, cos_zenith))))
+    azimuth = math.degrees(math.atan2(math.sin(hour_angle),
+                                      math.cos(hour_angle) * math.sin(lat) - math.tan(decl) * math.cos(lat)))
+    azimuth = (azimuth + 180) % 360
+
+    return azimuth, elevation
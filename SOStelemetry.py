@@ -0,0 +1,115 @@
+#written and tested for python3
+
+#####################################################################################################
+# Filename      :   SOStelemetry.py
+# Description   :   Compact in-memory telemetry of the SOS (ADC samples, measurements, moves)
+# Author        :   Zinzen
+#####################################################################################################
+
+#NOTE: every stream is a RingBuffer: one preallocated array.array per column and a write index that
+#      wraps around. Memory is fixed at creation (capacity x bytes per record) and never grows, however
+#      long the SOS runs; once full, each new record overwrites the oldest one. Recording one event is a
+#      handful of array item assignments (a few microseconds on a Pi), no objects are created per event.
+#
+#        telemetry.samples       --> time, adc_value                       (every single ADC read)
+#        telemetry.measurements  --> time, reads, avg_adc_value, volt      (every measure_volt() result)
+#        telemetry.moves         --> time, axis, direction, move_time, dc, pos_yaw, pos_pitch after the move
+#
+#      axis is stored as a number: AXES.index(name) --> 0 = yaw, 1 = pitch
+
+#####################################################################################################
+#####################################################################################################
+
+import array
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================           FIXED-SIZE RING BUFFER       ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+
+class RingBuffer:          # fixed number of records in preallocated array columns, the oldest record is overwritten
+
+    __slots__ = ('fields', 'columns', 'capacity', 'index', 'count')
+
+    def __init__(self, fields, capacity):          # fields = ((name, array typecode), ...)
+        self.fields = tuple(name for (name, _) in fields)
+        self.columns = tuple(array.array(typecode, bytes(array.array(typecode).itemsize * capacity))
+                             for (_, typecode) in fields)
+        self.capacity = capacity
+        self.index = 0                          # position of the next write
+        self.count = 0                          # number of valid records (<= capacity)
+
+    def append(self, *values):          # one value per field, in the order of fields
+        i = self.index
+        for column, value in zip(self.columns, values):
+            column[i] = value
+        i = i + 1
+        self.index = 0 if i == self.capacity else i
+        if self.count < self.capacity:
+            self.count = self.count + 1
+
+    def __len__(self):
+        return self.count
+
+    def records(self, last=None):          # the (last) records as tuples, oldest first
+        n = self.count if last is None else min(last, self.count)
+        start = (self.index - n) % self.capacity
+        return [tuple(column[(start + k) % self.capacity] for column in self.columns) for k in range(n)]
+
+    def column(self, name, last=None):          # the (last) values of one field as a list, oldest first
+        values = self.columns[self.fields.index(name)]
+        n = self.count if last is None else min(last, self.count)
+        start = (self.index - n) % self.capacity
+        if start + n <= self.capacity:
+            return values[start:start + n].tolist()
+        return values[start:].tolist() + values[:start + n - self.capacity].tolist()
+
+    def clear(self):
+        self.index = 0
+        self.count = 0
+
+    def nbytes(self):          # memory held by the columns
+        return sum(column.itemsize * len(column) for column in self.columns)
+
+
+
+#####################################################################################################
+#====================================================================================================
+#==============================                                        ==============================
+#==============================            SOS TELEMETRY               ==============================
+#==============================                                        ==============================
+#====================================================================================================
+#####################################################################################################
+
+AXES = ('yaw', 'pitch')
+
+
+class Telemetry:          # the three telemetry streams of the control script
+
+    __slots__ = ('samples', 'measurements', 'moves')
+
+    def __init__(self, sample_capacity=100000, measurement_capacity=20000, move_capacity=20000):
+        # default size: ~1 MB for the samples, ~0.36 MB for the measurements, ~0.52 MB for the moves
+        self.samples = RingBuffer((('time', 'd'), ('adc_value', 'H')), sample_capacity)
+        self.measurements = RingBuffer((('time', 'd'), ('reads', 'H'), ('avg_adc_value', 'f'), ('volt', 'f')),
+                                       measurement_capacity)
+        self.moves = RingBuffer((('time', 'd'), ('axis', 'B'), ('direction', 'b'), ('move_time', 'f'),
+                                 ('dc', 'f'), ('pos_yaw', 'f'), ('pos_pitch', 'f')), move_capacity)
+
+    def sample(self, t, adc_value):          # one ADC read
+        self.samples.append(t, adc_value)
+
+    def measurement(self, t, reads, avg_adc_value, volt):          # one measure_volt() result
+        self.measurements.append(t, reads, avg_adc_value, volt)
+
+    def move(self, t, axis, direction, move_time, dc, pos_yaw, pos_pitch):          # one finished move of one axis
+        self.moves.append(t, AXES.index(axis), direction, move_time, dc, pos_yaw, pos_pitch)
+
+    def nbytes(self):
+        return self.samples.nbytes() + self.measurements.nbytes() + self.moves.nbytes()
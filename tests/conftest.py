@@ -0,0 +1,37 @@
+# the SOS modules live next to the control script, one directory up
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import SOSbackend
+import SOSbenchmark
+
+
+@pytest.fixture
+def sim_rig(tmp_path, monkeypatch):          # make(**rig) --> (fresh control script on a simulated rig, the rig)
+    # the control script writes calibration.json, motion_model.json, ... into the current directory
+    monkeypatch.chdir(tmp_path)
+
+    def make(sun=None, **rig):
+        ctl = SOSbenchmark.load_controller()
+        ctl.log_level = 'WARNING'
+        ctl.start_logging()
+        if sun is None:
+            sun = SOSbackend.SunModel(azimuth=60.0, elevation=40.0)
+        sim = SOSbackend.make_backend('sim', sun=sun,
+                                      yaw_pins=(ctl.yaw_motor_pin1, ctl.yaw_motor_pin2, ctl.yaw_enable_pin),
+                                      pitch_pins=(ctl.pitch_motor_pin1, ctl.pitch_motor_pin2, ctl.pitch_enable_pin),
+                                      **rig)
+        ctl.select_backend(sim)
+        ctl.setup()
+        return ctl, sim
+
+    return make
+
+
+def position_error(ctl, sim):          # (yaw, pitch) dead-reckoned position minus the true angle of the rig, in degrees
+    return (ctl.pos_yaw * 360 / ctl.t_rev_yaw - sim.yaw.angle_now(),
+            ctl.pos_pitch * 360 / ctl.t_rev_pitch - sim.pitch.angle_now())
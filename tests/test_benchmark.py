@@ -0,0 +1,27 @@
+# the benchmark reference is the best reachable orientation, so no run can beat it
+
+import pytest
+
+import SOSbackend
+import SOSbenchmark
+
+
+@pytest.mark.parametrize('scenario', sorted(SOSbenchmark.SCENARIOS))
+def test_yield_never_exceeds_the_reference(scenario):
+    for strategy in SOSbenchmark.STRATEGIES:
+        for seed, (yaw_offset, pitch_offset) in enumerate(((40.0, 20.0), (-55.0, -25.0), (10.0, 5.0))):
+            run = SOSbenchmark.run_once(scenario, strategy, seed, yaw_offset, pitch_offset)
+            assert run['yield_fraction'] <= 1
+
+
+def test_reference_tilts_towards_the_zenith_under_diffuse_light():
+    sun = SOSbackend.SunModel(azimuth=60.0, elevation=40.0, **SOSbenchmark.SCENARIOS['diffuse'])
+    yaw, pitch = SOSbenchmark.best_orientation(sun, 0)
+    assert sun.irradiance(yaw, pitch, 0) > sun.irradiance(*sun.optimum(0), t=0)
+    assert pitch < 90.0 - 40.0
+
+
+@pytest.mark.parametrize('measure_mode', (None, 'fixed'))
+def test_runs_report_their_measure_mode(measure_mode):
+    run = SOSbenchmark.run_once('noise', 'hillclimb', 1, 10.0, 5.0, measure_mode=measure_mode)
+    assert run['measure_mode'] == (measure_mode or 'adaptive')
@@ -0,0 +1,47 @@
+# the revolution times measured by calibrate() match the simulated motors, and the calibration keeps the position
+
+import datetime
+
+import pytest
+
+import SOSbackend
+import SOSclock
+from conftest import position_error
+
+
+def moving_sun():          # the default sun of simulate(): 180° of azimuth in 12 hours
+    return SOSbackend.SunModel(azimuth=-90.0, elevation=40.0, azimuth_rate=180.0 / (12 * 3600))
+
+
+def ephemeris_rig(sim_rig, hour, **rig):          # the real path of the sun on 21 June, starting at hour (UTC)
+    clock = SOSclock.SimClock(epoch=datetime.datetime(2021, 6, 21, hour, tzinfo=datetime.timezone.utc))
+    return sim_rig(sun=SOSbackend.EphemerisSunModel(), clock=clock, **rig)
+
+
+@pytest.mark.parametrize('sun', ('static', 'moving', 'ephemeris'))
+def test_revolution_times_of_a_noise_free_rig(sim_rig, sun):
+    if sun == 'ephemeris':
+        ctl, sim = ephemeris_rig(sim_rig, 5)
+    else:
+        ctl, sim = sim_rig(sun=moving_sun() if sun == 'moving' else None)
+    ctl.move_both(10.0, 20.0)                   # not at the origin: the position has to survive the calibration
+    ctl.calibrate()
+    assert ctl.t_rev_yaw == pytest.approx(sim.yaw.t_rev, rel=0.0005)
+    assert ctl.t_rev_pitch == pytest.approx(sim.pitch.t_rev, rel=0.0005)
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 0.05
+    assert abs(pitch_error) < 0.05
+
+
+@pytest.mark.parametrize('stall_dc', (0.0, 20.0))
+def test_new_duty_cycle_is_not_taken_for_a_multiple(sim_rig, stall_dc):
+    # never calibrated at 40 %: the search spans 0.7 - 2.5 times the guess, which contains twice the guess
+    ctl, sim = sim_rig(sun=moving_sun(), yaw_stall_dc=stall_dc, pitch_stall_dc=stall_dc)
+    ctl.use_speed_profiles = True
+    ctl.calibrate()
+    for axis, motor in (('yaw', sim.yaw), ('pitch', sim.pitch)):
+        t_rev = motor.t_rev * (100 - stall_dc) / (40 - stall_dc)
+        assert ctl.calibration.t_rev(axis, 40) == pytest.approx(t_rev, rel=0.002), axis
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 0.05
+    assert abs(pitch_error) < 0.05
@@ -0,0 +1,77 @@
+# recovery of the position from SOSjournal after a crash at the awkward moments of a move
+
+import SOSjournal
+
+
+def make_journal(tmp_path, snapshot_interval):
+    journal = SOSjournal.PositionJournal(str(tmp_path / 'position_journal.log'), str(tmp_path / 'position_save.txt'),
+                                         lambda: 0.0, snapshot_interval=snapshot_interval, fsync_interval=0)
+    journal.snapshot(0.0, 0.0)
+    return journal
+
+
+def recover(tmp_path):          # what a fresh start after the crash sees
+    journal = SOSjournal.PositionJournal(str(tmp_path / 'position_journal.log'), str(tmp_path / 'position_save.txt'),
+                                         lambda: 0.0)
+    return journal.recover()
+
+
+def test_crash_after_first_axis_of_concurrent_move(tmp_path):
+    # move_both(2.0, 60.0): yaw stops first, a snapshot is due, the SOS goes down while pitch still turns
+    journal = make_journal(tmp_path, snapshot_interval=0)
+    journal.intent(2.0, 60.0)
+    journal.done('yaw', 2.0, 0.0)
+    assert recover(tmp_path) == (2.0, 60.0)
+
+
+def test_crash_after_snapshot_during_move(tmp_path):
+    # an explicit snapshot (save_pos_val) while pitch is still moving keeps its intent
+    journal = make_journal(tmp_path, snapshot_interval=300)
+    journal.intent(2.0, 60.0)
+    journal.done('yaw', 2.0, 0.0)
+    journal.snapshot(2.0, 0.0)
+    assert recover(tmp_path) == (2.0, 60.0)
+
+
+def test_finished_move_is_not_counted_twice(tmp_path):
+    journal = make_journal(tmp_path, snapshot_interval=0)
+    journal.intent(2.0, 60.0)
+    journal.done('yaw', 2.0, 0.0)
+    journal.done('pitch', 2.0, 60.0)
+    assert recover(tmp_path) == (2.0, 60.0)
+    assert open(str(tmp_path / 'position_journal.log')).read().split('\n')[0].startswith('S ')
+
+
+def test_snapshots_from_another_thread(tmp_path):
+    # asyncio runtime: save_pos_val() snapshots in an executor thread while the control thread journals moves
+    import threading
+    journal = make_journal(tmp_path, snapshot_interval=300)
+    stop = threading.Event()
+
+    def snapshots():
+        while not stop.is_set():
+            with journal.lock:                  # reads the position and snapshots it in one step
+                journal.snapshot(journal.pos_yaw, journal.pos_pitch)
+
+    thread = threading.Thread(target=snapshots)
+    thread.start()
+    try:
+        for step in range(1, 501):
+            journal.intent(1.0, 1.0)
+            journal.done('yaw', float(step), float(step - 1))
+            journal.done('pitch', float(step), float(step))
+    finally:
+        stop.set()
+        thread.join()
+    journal.close()
+    assert recover(tmp_path) == (500.0, 500.0)
+
+
+def test_recovery_reports_its_source(tmp_path):
+    journal = make_journal(tmp_path, snapshot_interval=300)
+    journal.intent(2.0, 60.0)
+    journal.done('yaw', 2.0, 0.0)               # pitch still turning when the SOS goes down
+    recovered = SOSjournal.PositionJournal(str(tmp_path / 'position_journal.log'), str(tmp_path / 'position_save.txt'),
+                                           lambda: 0.0)
+    assert recovered.recover() == (2.0, 60.0)
+    assert recovered.recovery == ('journal', 1, 1)
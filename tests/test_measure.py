@@ -0,0 +1,27 @@
+# measure_volt() in its fixed and adaptive modes
+
+import SOSbackend
+
+
+def test_adaptive_mode_is_the_default(sim_rig):
+    ctl, sim = sim_rig()
+    assert ctl.measure_mode == 'adaptive'
+
+
+def test_fixed_mode_takes_every_read(sim_rig):
+    ctl, sim = sim_rig()
+    ctl.measure_mode = 'fixed'
+    reads = sim.adc_reads
+    ctl.measure_volt()
+    assert sim.adc_reads - reads == ctl.measure_max_samples
+
+
+def test_adaptive_mode_with_a_single_minimum_read(sim_rig):
+    # the stopping rule needs the spread of at least two reads, whatever measure_min_samples says
+    ctl, sim = sim_rig(sun=SOSbackend.SunModel(azimuth=60.0, elevation=40.0, noise=0.0))
+    ctl.measure_mode = 'adaptive'
+    ctl.measure_min_samples = 1
+    reads = sim.adc_reads
+    ctl.measure_volt()
+    assert sim.adc_reads - reads == 2
+    assert ctl.volt_generated > 0
@@ -0,0 +1,50 @@
+# the motion model fitted from pulse traces matches the simulated motors, and the pulses keep the position
+
+import pytest
+
+import SOSbackend
+from conftest import position_error
+
+
+def fit_both(ctl):          # tilted next to the optimum (as in startup()), then both axes pulsed
+    ctl.pitch_tilt_45()
+    ctl.yaw_scan()
+    ctl.fit_motion_model('pitch')
+    ctl.fit_motion_model('yaw')
+
+
+def degrees(ctl, axis, seconds):          # motor seconds of an axis as an angle
+    return seconds * 360 / (ctl.t_rev_yaw if axis == 'yaw' else ctl.t_rev_pitch)
+
+
+@pytest.mark.parametrize('azimuth, elevation', ((60.0, 40.0), (0.0, 30.0), (-100.0, 20.0)))
+def test_ideal_motors_fit_no_losses_and_keep_the_position(sim_rig, azimuth, elevation):
+    ctl, sim = sim_rig(sun=SOSbackend.SunModel(azimuth=azimuth, elevation=elevation))
+    fit_both(ctl)
+    for axis in ('yaw', 'pitch'):
+        for name, value in ctl.motion_model.parameters[axis].items():
+            assert degrees(ctl, axis, value) < 0.25, (axis, name)
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 0.3
+    assert abs(pitch_error) < 0.3
+
+
+def test_fitted_parameters_match_the_motors(sim_rig):
+    # SimMotor: (dead time s, coast time s, backlash °) --> model: dead time, coast travel = coast time / 2, backlash in s
+    ctl, sim = sim_rig(yaw_motion=(0.05, 0.1, 2.0), pitch_motion=(0.1, 0.2, 1.0))
+    fit_both(ctl)
+    for axis, motor in (('yaw', sim.yaw), ('pitch', sim.pitch)):
+        parameters = ctl.motion_model.parameters[axis]
+        assert degrees(ctl, axis, parameters['dead_time'] - motor.dead_time) == pytest.approx(0, abs=0.25), axis
+        assert degrees(ctl, axis, parameters['coast'] - motor.coast_time / 2) == pytest.approx(0, abs=0.25), axis
+        assert degrees(ctl, axis, parameters['backlash']) == pytest.approx(motor.backlash, abs=0.25), axis
+
+
+def test_pulses_at_night_leave_model_and_position_alone(sim_rig):
+    ctl, sim = sim_rig(sun=SOSbackend.SunModel(azimuth=60.0, elevation=-10.0))
+    fit_both(ctl)
+    for axis in ('yaw', 'pitch'):
+        assert all(value == 0.0 for value in ctl.motion_model.parameters[axis].values())
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 1e-6
+    assert abs(pitch_error) < 1e-6
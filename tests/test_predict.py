@@ -0,0 +1,31 @@
+# the position cache works in degrees and averages yaw across the +/-180° seam
+
+import datetime
+import json
+
+import SOSpredict
+
+
+def test_yaw_is_averaged_across_the_seam():
+    cache = SOSpredict.PositionCache()
+    when = datetime.datetime(2026, 6, 21, 12, 0)
+    cache.record(when, 179.0, 40.0)
+    cache.record(when, -179.0, 40.0)                # the same direction, one turn further
+    yaw_deg, pitch_deg = cache.predict(when)
+    assert abs(SOSpredict.nearest_equivalent(yaw_deg, 180.0) - 180.0) < 1e-9
+    assert pitch_deg == 40.0
+
+
+def test_cache_in_motor_seconds_is_not_loaded(tmp_path):
+    path = str(tmp_path / 'position_cache.json')
+    with open(path, 'w') as cache_file:               # written before the cache stored degrees
+        json.dump({'tod_bucket_min': 10, 'doy_bucket_days': 7, 'entries': [[24, 72, 31.5, 20.0, 3, 0.0]]}, cache_file)
+    cache = SOSpredict.PositionCache()
+    cache.load(path)
+    assert cache.entries == {}
+    
+    cache.record(datetime.datetime(2026, 6, 21, 12, 0), 60.0, 50.0)
+    cache.save(path)
+    reloaded = SOSpredict.PositionCache()
+    reloaded.load(path)
+    assert reloaded.entries == cache.entries
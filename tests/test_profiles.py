@@ -0,0 +1,39 @@
+# profiled moves (ramp / cruise / approach) keep the dead-reckoned position on the true angle of the rig
+
+import datetime
+import random
+
+import pytest
+
+import SOSbackend
+import SOSclock
+import SOSmotion
+from conftest import position_error
+
+
+@pytest.mark.parametrize('stall_dc', (0.0, 20.0))
+def test_profiled_moves_track_the_true_angle(sim_rig, stall_dc):
+    # calibrated on the real path of the sun at 05:00 UTC on 21 June: the speed at 40 % comes out about 0.1 % off
+    clock = SOSclock.SimClock(epoch=datetime.datetime(2021, 6, 21, 5, tzinfo=datetime.timezone.utc))
+    ctl, sim = sim_rig(sun=SOSbackend.EphemerisSunModel(), clock=clock, yaw_stall_dc=stall_dc, pitch_stall_dc=stall_dc)
+    ctl.use_speed_profiles = True
+    ctl.calibrate()
+    moves = random.Random(1)
+    for _ in range(400):                        # mostly forward: the error of the speed at 40 % adds up in one direction
+        ctl.move_both(moves.uniform(-0.3, 1) * moves.choice((0.05, 0.3, 1)),
+                      moves.uniform(-1, 3) * moves.choice((0.1, 1, 3)))
+    assert abs(ctl.profile_travel['pitch']) * 360 / ctl.t_rev_pitch <= ctl.profile_travel_limit_deg + 1
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 0.1
+    assert abs(pitch_error) < 0.15
+
+
+@pytest.mark.parametrize('losses', ((0.0, 0.0, 0.0), (0.1, 0.2, 0.3), (0.3, 1.0, 0.05)))
+def test_planned_profiles_make_the_wanted_travel(losses):
+    speed = {100: 1.0, 70: 0.75, 40: 0.4}.get
+    for i in range(1, 400):
+        travel = i * 0.01
+        segments = SOSmotion.plan_profile(travel, speed, 100, 40, 0.2, 0.5, [40, 70], 0.15, *losses)
+        assert all(seconds >= 0 for _, seconds in segments), travel
+        if travel >= speed(40) * losses[2]:     # shorter moves than the coast at approach speed cannot be made exactly
+            assert SOSmotion.profile_travel(segments, speed, *losses) == pytest.approx(travel, abs=1e-9), travel
@@ -0,0 +1,47 @@
+# the position recovered from the journal of the last run, and the operator's ways to reject it
+
+import builtins
+
+import pytest
+
+
+def journaled(sim_rig, **settings):          # a control script that journals its moves (in the directory of the test)
+    ctl, sim = sim_rig()
+    ctl.use_position_journal = True
+    for name, value in settings.items():
+        setattr(ctl, name, value)
+    ctl.setup()
+    return ctl, sim
+
+
+def test_reset_pos_is_replayed_to_the_origin(sim_rig):
+    ctl, sim = journaled(sim_rig)
+    ctl.motion_model.parameters['yaw'].update(dead_time=0.05, coast=0.2)
+    ctl.move_both(5.0, 7.0)
+    ctl.move_both(-4.95, -7.0)                  # 0.05 s from the origin: shorter than the coast, the reset cannot make it
+    ctl.reset_pos()
+    assert (ctl.pos_yaw, ctl.pos_pitch) == (0, 0)
+    restarted, _ = journaled(sim_rig)
+    assert (restarted.pos_yaw, restarted.pos_pitch) == (0.0, 0.0)
+
+
+def test_discarded_recovery_starts_at_the_origin(sim_rig):
+    ctl, sim = journaled(sim_rig)
+    ctl.move_both(5.0, 7.0)
+    restarted, _ = journaled(sim_rig, recovered_position_mode='discard')
+    assert (restarted.pos_yaw, restarted.pos_pitch) == (0, 0)
+    assert not restarted.position_recovered
+
+
+@pytest.mark.parametrize('answer', ('y', 'n'))
+def test_operator_can_reject_the_recovered_position(sim_rig, monkeypatch, answer):
+    ctl, sim = journaled(sim_rig)
+    ctl.move_both(5.0, 7.0)
+    restarted, _ = journaled(sim_rig)
+    assert restarted.position_recovered
+    monkeypatch.setattr(builtins, 'input', lambda prompt: answer)
+    restarted.confirm_recovered_pos()
+    expected = (5.0, 7.0) if answer == 'y' else (0.0, 0.0)
+    assert (restarted.pos_yaw, restarted.pos_pitch) == pytest.approx(expected)
+    again, _ = journaled(sim_rig)               # the answer survives the next restart
+    assert (again.pos_yaw, again.pos_pitch) == pytest.approx(expected)
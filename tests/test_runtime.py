@@ -0,0 +1,36 @@
+# the runtime state of the control script stays consistent when the control code fails
+
+import pytest
+
+
+def test_failed_optimization_leaves_no_stale_state(sim_rig, monkeypatch):
+    ctl, sim = sim_rig()
+
+    def yaw_adj():                              # fails in the middle of a phase
+        ctl.phase_begin('yaw_coarse')
+        raise RuntimeError('ADC gone')
+    monkeypatch.setattr(ctl, 'yaw_adj', yaw_adj)
+
+    with pytest.raises(RuntimeError):
+        ctl.optimize()
+    assert ctl.runtime_state['optimizing'] is False
+    assert ctl.instrument.open == []
+    assert ctl.instrument.last_cycle()['outcome'] == 'error'
+
+
+@pytest.mark.parametrize('use_monitor', (False, True))
+def test_monitor_reads_only_with_use_monitor_and_between_moves(sim_rig, monkeypatch, use_monitor):
+    ctl, sim = sim_rig()
+    ctl.use_monitor = use_monitor
+    reads = []                                  # (yaw speed, pitch speed, control lock held) at every monitor read
+    monitor_volt = ctl.monitor_volt
+    def read():
+        reads.append((sim.yaw.rate, sim.pitch.rate, ctl.runtime_state['control'].locked()))
+        return monitor_volt()
+    monkeypatch.setattr(ctl, 'monitor_volt', read)
+
+    ctl.run_async(run_seconds=2 * 3600)
+    if use_monitor:
+        assert set(reads) == {(0, 0, True)}         # never while a motor runs, always holding the control lock
+    else:
+        assert reads == []
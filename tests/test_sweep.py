@@ -0,0 +1,37 @@
+# the samples of yaw_sweep_360() are tagged with the position the rig really had when they were read
+
+import pytest
+
+import SOSbackend
+
+
+@pytest.mark.parametrize('use_speed_profiles', (False, True))
+def test_sweep_tags_follow_the_true_angle(sim_rig, monkeypatch, use_speed_profiles):
+    ctl, sim = sim_rig(yaw_motion=(0.3, 0.2, 2.0))
+    ctl.motion_model.parameters['yaw'].update(dead_time=0.3, coast=0.1, backlash=2.0 * ctl.t_rev_yaw / 360)
+    ctl.use_speed_profiles = use_speed_profiles
+    ctl.move_both(-1.0, 0.0)                    # the sweep turns forward: a reversal, through the backlash
+    ctl.pitch_tilt_45()
+
+    angles = []                                 # true yaw angle at every ADC read of the sweep
+    analog_read = ctl.adc.analogRead
+    def read(channel):
+        angles.append(sim.yaw.angle_now())
+        return analog_read(channel)
+    monkeypatch.setattr(ctl.adc, 'analogRead', read)
+
+    offset = ctl.pos_yaw * 360 / ctl.t_rev_yaw - sim.yaw.angle_now()     # position error before the sweep
+    ctl.yaw_sweep_360()
+    assert len(angles) == len(ctl.sweep_profile)
+    for angle, (position, value) in zip(angles, ctl.sweep_profile):
+        assert position * 360 / ctl.t_rev_yaw - angle == pytest.approx(offset, abs=1.0)
+
+
+@pytest.mark.parametrize('azimuth', (60.0, -100.0))        # the peak in the first / second half of the revolution
+def test_sweep_ends_within_half_a_revolution_of_its_start(sim_rig, azimuth):
+    ctl, sim = sim_rig(sun=SOSbackend.SunModel(azimuth=azimuth, elevation=40.0))
+    ctl.pitch_tilt_45()
+    pos_start = ctl.pos_yaw
+    ctl.yaw_sweep_360()
+    assert abs(ctl.pos_yaw - pos_start) <= ctl.t_rev_yaw / 2
+    assert ctl.pos_yaw * 360 / ctl.t_rev_yaw == pytest.approx(azimuth, abs=10)
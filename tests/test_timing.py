@@ -0,0 +1,39 @@
+# the position counts the measured on-time of every pulse, not the requested one
+
+import random
+
+import pytest
+
+import SOSclock
+from conftest import position_error
+
+
+class LateClock(SOSclock.SimClock):          # wakes up `late` seconds after every sleep, like a preempted Pi
+    def __init__(self, late):
+        super().__init__()
+        self.late = late
+
+    def sleep(self, seconds):                   # (sleep_until() and pulse() sleep through here)
+        if seconds > 0:
+            super().sleep(seconds + self.late)
+
+    def pulse(self, on, off, seconds):          # the measured on-time, late wake-up included
+        t_on = self.now()
+        super().pulse(on, off, seconds)
+        return self.now() - t_on
+
+
+@pytest.mark.parametrize('use_speed_profiles', (False, True))
+def test_late_pulses_keep_the_position(sim_rig, use_speed_profiles):
+    ctl, sim = sim_rig(clock=LateClock(0.02))
+    ctl.use_speed_profiles = use_speed_profiles
+    moves = random.Random(1)
+    for _ in range(40):
+        ctl.direction, ctl.move_time = moves.choice((1, -1)), moves.uniform(0.1, 2)
+        ctl.yaw_move()
+        ctl.direction, ctl.move_time = moves.choice((1, -1)), moves.uniform(0.1, 5)
+        ctl.pitch_move()
+        ctl.move_both(moves.uniform(-2, 2), moves.uniform(-5, 5))
+    yaw_error, pitch_error = position_error(ctl, sim)
+    assert abs(yaw_error) < 0.01
+    assert abs(pitch_error) < 0.01